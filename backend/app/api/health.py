@@ -1,8 +1,15 @@
 from fastapi import APIRouter
 
+from app.core import metrics
+
 router = APIRouter()
 
 
 @router.get("/health")
 async def health_check() -> dict:
     return {"status": "ok"}
+
+
+@router.get("/metrics")
+async def metrics_snapshot() -> dict:
+    return metrics.snapshot()
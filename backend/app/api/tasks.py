@@ -37,7 +37,7 @@ def _simulate_task_lifecycle(task_id: str) -> None:
 
 
 @router.post("")
-async def create_task(
+def create_task(
     background_tasks: BackgroundTasks,
     payload: Dict[str, Any] = Body(default_factory=dict),
 ) -> Dict[str, Any]:
@@ -67,12 +67,12 @@ async def create_task(
 
 
 @router.get("")
-async def list_tasks() -> List[Dict[str, Any]]:
+def list_tasks() -> List[Dict[str, Any]]:
     return list(TASKS.values())
 
 
 @router.get("/{task_id}")
-async def get_task(task_id: str) -> Dict[str, Any]:
+def get_task(task_id: str) -> Dict[str, Any]:
     task = TASKS.get(task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
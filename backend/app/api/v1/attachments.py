@@ -128,7 +128,7 @@ def _get_project(db: Session, project_id: str) -> Optional[dict]:
 
 
 @router.get("/{project_id}/attachments")
-async def list_attachments(project_id: str, db: Session = Depends(get_db)) -> Dict[str, Any]:
+def list_attachments(project_id: str, db: Session = Depends(get_db)) -> Dict[str, Any]:
     if not project_id.strip():
         raise HTTPException(status_code=400, detail="project_id required")
     try:
@@ -144,7 +144,7 @@ async def list_attachments(project_id: str, db: Session = Depends(get_db)) -> Di
 
 
 @router.post("/{project_id}/attachments")
-async def upload_attachment(
+def upload_attachment(
     project_id: str,
     file: UploadFile = File(...),
     label: str = Form(""),
@@ -218,7 +218,7 @@ async def upload_attachment(
 
 
 @router.patch("/{project_id}/attachments/{attachment_id}")
-async def update_attachment(
+def update_attachment(
     project_id: str,
     attachment_id: str,
     payload: Dict[str, Any],
@@ -259,7 +259,7 @@ async def update_attachment(
 
 
 @router.get("/{project_id}/attachments/{attachment_id}/file")
-async def download_attachment(
+def download_attachment(
     project_id: str,
     attachment_id: str,
     db: Session = Depends(get_db),
@@ -6,13 +6,14 @@ from fastapi import APIRouter, Body, Depends, HTTPException
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
-from app.api.v1.deps import require_platform_admin
+from app.api.v1.deps import get_session_token, require_platform_admin
 from app.api.v1.response import ok
 from app.db.models import to_user_account_dict
 from app.db.session import get_db
 from app.repositories import companies as company_repo
 from app.repositories import users as user_repo
-from app.store import SESSIONS, new_id, utc_now
+from app.services.session_store import get_session_store
+from app.store import utc_now
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -45,7 +46,7 @@ def _build_user_response(user: dict) -> Dict[str, Any]:
 
 
 @router.post("/login")
-async def login(
+def login(
     payload: Dict[str, Any] = Body(default_factory=dict),
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
@@ -87,8 +88,6 @@ async def login(
     if _hash_password(password, user.password_salt) != user.password_hash:
         raise HTTPException(status_code=401, detail="invalid credentials")
 
-    session_token = new_id()
-    refresh_token = new_id()
     space_name = "Personal Space"
     space_id = None
     if user.company_id:
@@ -102,13 +101,10 @@ async def login(
         "space_name": space_name,
     }
 
-    SESSIONS[session_token] = {
-        "session_token": session_token,
-        "refresh_token": refresh_token,
-        "user_id": user.id,
-        "current_space": current_space,
-        "created_at": utc_now(),
-    }
+    try:
+        session = get_session_store().create(user.id, current_space)
+    except SQLAlchemyError:
+        raise HTTPException(status_code=500, detail="Database error")
 
     user_payload = _build_user_response(to_user_account_dict(user))
     user_payload["llm_api_base"] = user.llm_api_base or ""
@@ -116,16 +112,48 @@ async def login(
     return ok(
         {
             "user": user_payload,
-            "session_token": session_token,
-            "refresh_token": refresh_token,
+            "session_token": session["session_token"],
+            "refresh_token": session["refresh_token"],
+            "expires_at": session["expires_at"].isoformat(),
             "current_space": current_space,
             "authenticated": True,
         }
     )
 
 
+@router.post("/refresh")
+def refresh(payload: Dict[str, Any] = Body(default_factory=dict)) -> Dict[str, Any]:
+    refresh_token = payload.get("refresh_token")
+    if not isinstance(refresh_token, str) or not refresh_token.strip():
+        raise HTTPException(status_code=400, detail="refresh_token required")
+    try:
+        session = get_session_store().refresh(refresh_token.strip())
+    except SQLAlchemyError:
+        raise HTTPException(status_code=500, detail="Database error")
+    if not session:
+        raise HTTPException(status_code=401, detail="invalid refresh token")
+    return ok(
+        {
+            "session_token": session["session_token"],
+            "refresh_token": session["refresh_token"],
+            "expires_at": session["expires_at"].isoformat(),
+            "current_space": session["current_space"],
+        }
+    )
+
+
+@router.post("/logout")
+def logout(token: str | None = Depends(get_session_token)) -> Dict[str, Any]:
+    if token:
+        try:
+            get_session_store().revoke(token)
+        except SQLAlchemyError:
+            raise HTTPException(status_code=500, detail="Database error")
+    return ok({"authenticated": False})
+
+
 @router.get("/users")
-async def list_users(
+def list_users(
     db: Session = Depends(get_db),
     current_user: object = Depends(require_platform_admin),
 ) -> Dict[str, Any]:
@@ -138,7 +166,7 @@ async def list_users(
 
 
 @router.post("/users")
-async def create_user(
+def create_user(
     payload: Dict[str, Any] = Body(default_factory=dict),
     db: Session = Depends(get_db),
     current_user: object = Depends(require_platform_admin),
@@ -203,7 +231,7 @@ async def create_user(
 
 
 @router.put("/users/{user_id}/password")
-async def update_user_password(
+def update_user_password(
     user_id: str,
     payload: Dict[str, Any] = Body(default_factory=dict),
     db: Session = Depends(get_db),
@@ -228,7 +256,7 @@ async def update_user_password(
 
 
 @router.get("/companies")
-async def list_companies(
+def list_companies(
     db: Session = Depends(get_db),
     current_user: object = Depends(require_platform_admin),
 ) -> Dict[str, Any]:
@@ -241,7 +269,7 @@ async def list_companies(
 
 
 @router.post("/companies")
-async def create_company(
+def create_company(
     payload: Dict[str, Any] = Body(default_factory=dict),
     db: Session = Depends(get_db),
     current_user: object = Depends(require_platform_admin),
@@ -259,7 +287,7 @@ async def create_company(
 
 
 @router.put("/companies/{company_id}/invite")
-async def reset_company_invite(
+def reset_company_invite(
     company_id: str,
     db: Session = Depends(get_db),
     current_user: object = Depends(require_platform_admin),
@@ -1,9 +1,12 @@
 from fastapi import Depends, Header, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.db.session import get_db
+from app.db.request_cache import cached, cached_async
+from app.db.session import get_async_db, get_db
 from app.repositories import users as user_repo
-from app.store import SESSIONS
+from app.services.session_store import get_session_store
 
 
 def _extract_token(authorization: str | None, session_token: str | None) -> str | None:
@@ -14,19 +17,49 @@ def _extract_token(authorization: str | None, session_token: str | None) -> str
     return None
 
 
-def get_current_user(
-    db: Session = Depends(get_db),
+def get_session_token(
     authorization: str | None = Header(default=None),
     session_token: str | None = Header(default=None, alias="X-Session-Token"),
     session_token_query: str | None = Query(default=None, alias="session_token"),
+) -> str | None:
+    return _extract_token(authorization, session_token) or session_token_query
+
+
+def get_current_user(
+    db: Session = Depends(get_db),
+    token: str | None = Depends(get_session_token),
+) -> object:
+    if not token:
+        raise HTTPException(status_code=401, detail="unauthorized")
+    session = get_session_store().get(token)
+    if not session:
+        raise HTTPException(status_code=401, detail="invalid session")
+    user_id = session.get("user_id")
+    user = cached(db, ("user", user_id), lambda: user_repo.get_user(db, user_id))
+    if not user:
+        raise HTTPException(status_code=401, detail="invalid user")
+    # Handlers run on a different threadpool hop than this dependency; ending
+    # the read transaction here keeps a pooled connection from being held
+    # while the request waits for its next thread.
+    if user in db:
+        db.expunge(user)
+    db.rollback()
+    return user
+
+
+async def get_current_user_async(
+    db: AsyncSession = Depends(get_async_db),
+    token: str | None = Depends(get_session_token),
 ) -> object:
-    token = _extract_token(authorization, session_token) or session_token_query
+    """``get_current_user`` for ``async def`` handlers using ``get_async_db``."""
     if not token:
         raise HTTPException(status_code=401, detail="unauthorized")
-    session = SESSIONS.get(token)
+    # Cache misses read the session table through the sync engine.
+    session = await run_in_threadpool(get_session_store().get, token)
     if not session:
         raise HTTPException(status_code=401, detail="invalid session")
-    user = user_repo.get_user(db, session.get("user_id"))
+    user_id = session.get("user_id")
+    user = await cached_async(db, ("user", user_id), lambda: user_repo.get_user_async(db, user_id))
     if not user:
         raise HTTPException(status_code=401, detail="invalid user")
     return user
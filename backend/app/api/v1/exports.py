@@ -9,7 +9,8 @@ from sqlalchemy.orm import Session
 from app.api.v1.response import ok
 from app.db.session import SessionLocal, get_db
 from app.repositories import projects as project_repo
-from app.store import EXPORT_FILES, EXPORT_TASKS, new_id, utc_now
+from app.repositories import tasks as task_repo
+from app.services.job_queue import dispatch_job, job_will_retry
 
 router = APIRouter(tags=["exports"])
 logger = logging.getLogger(__name__)
@@ -29,54 +30,44 @@ def _estimate_minutes(resolution: str) -> int:
 
 
 def _simulate_export_task(task_id: str, project_id: str) -> None:
-    task = EXPORT_TASKS.get(task_id)
-    if not task:
-        return
-    task["status"] = "running"
-    task["updated_at"] = utc_now()
-    task["progress"] = 10
-    time.sleep(2)
-    task["progress"] = 60
-    task["updated_at"] = utc_now()
-    time.sleep(2)
-    task["progress"] = 90
-    task["updated_at"] = utc_now()
-    time.sleep(1)
-    task["status"] = "completed"
-    task["progress"] = 100
-    task["updated_at"] = utc_now()
-
-    export_file_id = new_id()
-    export_config = task.get("export_config") if isinstance(task.get("export_config"), dict) else {}
-    fmt = export_config.get("format") or "mp4"
-    EXPORT_FILES[export_file_id] = {
-        "id": export_file_id,
-        "project_id": project_id,
-        "task_id": task_id,
-        "format": fmt,
-        "resolution": export_config.get("resolution"),
-        "aspect_ratio": export_config.get("aspect_ratio"),
-        "url": f"https://example.com/exports/{export_file_id}.{fmt}",
-        "created_at": utc_now(),
-    }
-    task["file_id"] = export_file_id
-
     db = SessionLocal()
     try:
+        task = task_repo.get_export_task(db, task_id)
+        if not task:
+            return
+        task_repo.update_export_task(db, task_id, {"status": "running", "progress": 10})
+        time.sleep(2)
+        task_repo.update_export_task(db, task_id, {"progress": 60})
+        time.sleep(2)
+        task_repo.update_export_task(db, task_id, {"progress": 90})
+        time.sleep(1)
+        export_config = task.get("export_config") if isinstance(task.get("export_config"), dict) else {}
+        export_file = task_repo.create_export_file(db, project_id, task_id, export_config)
+        task_repo.update_export_task(
+            db,
+            task_id,
+            {"status": "completed", "progress": 100, "file_id": export_file["id"]},
+        )
         project_repo.update_project(
             db,
             project_id,
             {"status": "exported", "stage": "completed", "progress": 100},
         )
-    except SQLAlchemyError:
+    except SQLAlchemyError as exc:
         db.rollback()
-        logger.exception("Failed to update project export status project_id=%s", project_id)
+        logger.exception("Failed to update export task task_id=%s project_id=%s", task_id, project_id)
+        if job_will_retry(exc):
+            raise
     finally:
         db.close()
 
 
+def run_export_job(payload: dict) -> None:
+    _simulate_export_task(payload["task_id"], payload["project_id"])
+
+
 @router.post("/projects/{project_id}/export")
-async def create_export_task(
+def create_export_task(
     project_id: str,
     background_tasks: BackgroundTasks,
     payload: Dict[str, Any] = Body(default_factory=dict),
@@ -109,7 +100,6 @@ async def create_export_task(
     if cover_mode not in {"auto", "none"}:
         raise HTTPException(status_code=400, detail="cover_mode invalid")
 
-    task_id = new_id()
     estimated_minutes = _estimate_minutes(resolution)
     export_config = {
         "resolution": resolution,
@@ -123,26 +113,36 @@ async def create_export_task(
         "cover": {"mode": cover_mode},
     }
 
-    EXPORT_TASKS[task_id] = {
-        "id": task_id,
-        "project_id": project_id,
-        "status": "pending",
-        "progress": 0,
-        "export_config": export_config,
-        "estimated_minutes": estimated_minutes,
-        "created_at": utc_now(),
-        "updated_at": utc_now(),
-    }
+    try:
+        task = task_repo.create_export_task(db, project_id, export_config, estimated_minutes)
+    except SQLAlchemyError:
+        db.rollback()
+        raise HTTPException(status_code=500, detail="Database error")
+    task_id = task["id"]
 
-    background_tasks.add_task(_simulate_export_task, task_id, project_id)
+    try:
+        dispatch_job(
+            db,
+            background_tasks,
+            "export.run",
+            {"task_id": task_id, "project_id": project_id},
+            project_id=project_id,
+        )
+    except SQLAlchemyError:
+        db.rollback()
+        raise HTTPException(status_code=500, detail="Database error")
     return ok({"export_task_id": task_id, "estimated_minutes": estimated_minutes})
 
 
 @router.get("/export-tasks/{task_id}")
-async def get_export_task(task_id: str) -> Dict[str, Any]:
+def get_export_task(task_id: str, db: Session = Depends(get_db)) -> Dict[str, Any]:
     if not task_id.strip():
         raise HTTPException(status_code=400, detail="task_id required")
-    task = EXPORT_TASKS.get(task_id)
+    try:
+        task = task_repo.get_export_task(db, task_id)
+    except SQLAlchemyError:
+        db.rollback()
+        raise HTTPException(status_code=500, detail="Database error")
     if not task:
         raise HTTPException(status_code=404, detail="Export task not found")
     if task.get("status") not in _EXPORT_STATUSES:
@@ -151,19 +151,26 @@ async def get_export_task(task_id: str) -> Dict[str, Any]:
 
 
 @router.get("/projects/{project_id}/export-files")
-async def list_export_files(project_id: str) -> Dict[str, Any]:
+def list_export_files(project_id: str, db: Session = Depends(get_db)) -> Dict[str, Any]:
     if not project_id.strip():
         raise HTTPException(status_code=400, detail="project_id required")
-    files = [item for item in EXPORT_FILES.values() if item.get("project_id") == project_id]
-    files = sorted(files, key=lambda item: item.get("created_at") or "", reverse=True)
+    try:
+        files = task_repo.list_export_files(db, project_id)
+    except SQLAlchemyError:
+        db.rollback()
+        raise HTTPException(status_code=500, detail="Database error")
     return ok({"list": files})
 
 
 @router.get("/export-files/{file_id}/download-url")
-async def get_export_download_url(file_id: str) -> Dict[str, Any]:
+def get_export_download_url(file_id: str, db: Session = Depends(get_db)) -> Dict[str, Any]:
     if not file_id.strip():
         raise HTTPException(status_code=400, detail="file_id required")
-    export_file = EXPORT_FILES.get(file_id)
+    try:
+        export_file = task_repo.get_export_file(db, file_id)
+    except SQLAlchemyError:
+        db.rollback()
+        raise HTTPException(status_code=500, detail="Database error")
     if not export_file:
         raise HTTPException(status_code=404, detail="Export file not found")
     return ok({"url": export_file.get("url")})
@@ -1,24 +1,28 @@
+import asyncio
 import logging
 from pathlib import Path
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from queue import Empty
+from concurrent.futures import as_completed
 from typing import Any, Dict
 
-from fastapi import APIRouter, BackgroundTasks, Body, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Body, Depends, Header, HTTPException, Query
 from starlette.responses import StreamingResponse
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.api.v1.deps import get_current_user
+from app.api.v1.deps import get_current_user, get_current_user_async
 from app.api.v1.response import ok
 from app.core.config import settings
 from app.core.events import emit_event, new_trace_id
 from app.db.models import utc_now as db_utc_now
-from app.db.session import SessionLocal, get_db
+from app.db.session import SessionLocal, get_async_db, get_db
 from app.repositories import material_packages as package_repo
 from app.repositories import projects as project_repo
+from app.repositories import tasks as task_repo
 from app.services.blueprint_service import build_blueprint
+from app.services.circuit_breaker import ProviderUnavailableError
+from app.services.event_history import parse_last_event_id
 from app.services.generation_events import (
     format_sse,
     publish_generation_event,
@@ -28,11 +32,15 @@ from app.services.generation_events import (
 )
 from app.services.generation_todo import TODO_LIST
 from app.services.image_service import ImageService
+from app.services.job_queue import dispatch_job, job_will_retry
 from app.services.llm_service import LLMService
-from app.services.user_llm_settings import resolve_llm_overrides
+from app.services.user_llm_settings import resolve_llm_overrides, resolve_llm_overrides_for_user
 from app.services.model_registry import select_enabled_model
+from app.services.provider_executor import get_provider_executor
+from app.services.stage_graph import run_stage_graph
 from app.services.access_control import can_access_project, can_manage_project
-from app.store import GENERATION_TASKS, GENERATION_TRACES, new_id, utc_now
+from app.services.asset_writer import image_batcher
+from app.store import new_id
 
 router = APIRouter(prefix="/generation", tags=["generation"])
 image_service = ImageService()
@@ -113,6 +121,10 @@ def _emit_content_update(project_id: str, section: str, data: object) -> None:
     )
 
 
+def _fallback_package_name(summary: str, llm_input: str) -> str:
+    return (summary or llm_input or "素材包").strip()[:10] or "素材包"
+
+
 def _emit_done(project_id: str, package_id: str | None) -> None:
     publish_generation_event(
         project_id,
@@ -141,15 +153,19 @@ def _emit_image_error(project_id: str, image_type: str, message: str) -> None:
     )
 
 
-def _update_task(task_id: str, status: str | None = None, progress: int | None = None) -> None:
-    task = GENERATION_TASKS.get(task_id)
-    if not task:
-        return
+def _update_task(task_id: str, status: str | None = None, progress: int | None = None, **changes: Any) -> None:
     if status:
-        task["status"] = status
+        changes["status"] = status
     if progress is not None:
-        task["progress"] = progress
-    task["updated_at"] = utc_now()
+        changes["progress"] = progress
+    db = SessionLocal()
+    try:
+        task_repo.update_generation_task(db, task_id, changes)
+    except SQLAlchemyError:
+        db.rollback()
+        logger.exception("Failed to update generation task task_id=%s", task_id)
+    finally:
+        db.close()
 
 
 def _join_keywords(keywords: list[str]) -> str:
@@ -270,20 +286,6 @@ def _build_character_prompt_parts(subject: dict, blueprint: dict, sheet_prompt:
     }
 
 
-def _append_image_to_package(db: Session, package_id: str, image: dict) -> bool:
-    package = package_repo.get_package(db, package_id)
-    if not package:
-        return False
-    materials = package.get("materials") if isinstance(package.get("materials"), dict) else {}
-    metadata = materials.get("metadata") if isinstance(materials.get("metadata"), dict) else {}
-    images = metadata.get("images") if isinstance(metadata.get("images"), list) else []
-    images.append(image)
-    metadata["images"] = images
-    materials["metadata"] = metadata
-    package_repo.update_package(db, package_id, {"materials": materials})
-    return True
-
-
 def _build_character_sheet_prompt(subject: dict, blueprint: dict) -> str:
     art_style = blueprint.get("art_style", {}) if isinstance(blueprint, dict) else {}
     name = subject.get("name") or "Character"
@@ -329,9 +331,7 @@ def _build_character_sheet_prompt(subject: dict, blueprint: dict) -> str:
 def _next_package_version(items: list[dict]) -> int:
     max_version = 0
     for item in items:
-        materials = item.get("materials") if isinstance(item, dict) else {}
-        metadata = materials.get("metadata") if isinstance(materials, dict) else {}
-        version = metadata.get("package_version") if isinstance(metadata, dict) else None
+        version = item.get("package_version") if isinstance(item, dict) else None
         if isinstance(version, int) and version > max_version:
             max_version = version
     if max_version == 0 and items:
@@ -340,13 +340,13 @@ def _next_package_version(items: list[dict]) -> int:
 
 
 def _simulate_generation(task_id: str) -> None:
-    task = GENERATION_TASKS.get(task_id)
-    if not task:
-        return
-    trace_id = GENERATION_TRACES.get(task_id)
     db = SessionLocal()
     try:
         try:
+            task = task_repo.get_generation_task(db, task_id)
+            if not task:
+                return
+            trace_id = task_repo.get_generation_trace_id(db, task_id)
             project = project_repo.get_project(db, task["project_id"])
         except SQLAlchemyError:
             db.rollback()
@@ -354,9 +354,13 @@ def _simulate_generation(task_id: str) -> None:
         if not project:
             return
 
-        task["status"] = "running"
-        task["progress"] = 10
-        task["updated_at"] = utc_now()
+        try:
+            task = task_repo.update_generation_task(db, task_id, {"status": "running", "progress": 10})
+        except SQLAlchemyError:
+            db.rollback()
+            return
+        if not task:
+            return
         emit_event(
             "generation.progressed",
             {
@@ -369,8 +373,13 @@ def _simulate_generation(task_id: str) -> None:
         )
         time.sleep(1)
 
-        task["progress"] = 60
-        task["updated_at"] = utc_now()
+        try:
+            task = task_repo.update_generation_task(db, task_id, {"progress": 60})
+        except SQLAlchemyError:
+            db.rollback()
+            return
+        if not task:
+            return
         emit_event(
             "generation.progressed",
             {
@@ -383,9 +392,13 @@ def _simulate_generation(task_id: str) -> None:
         )
         time.sleep(1)
 
-        task["status"] = "completed"
-        task["progress"] = 100
-        task["updated_at"] = utc_now()
+        try:
+            task = task_repo.update_generation_task(db, task_id, {"status": "completed", "progress": 100})
+        except SQLAlchemyError:
+            db.rollback()
+            return
+        if not task:
+            return
         emit_event(
             "generation.completed",
             {
@@ -468,92 +481,44 @@ def _run_generation_task(
                 _emit_content_update(project_id, section, {"delta": delta})
             return handler
 
-        summary, keywords = llm.generate_summary(
-            llm_input,
-            mode,
-            documents=documents,
-            input_config=input_config,
-            on_delta=_stage_delta("summary"),
-        )
-        _emit_todo_update(project_id, "summary", "done")
-        _emit_content_update(project_id, "summary", summary)
-        _update_task(task_id, progress=STEP_PROGRESS["summary"])
-
-        current_step = "art_style"
-        art_style = llm.generate_art_style(
-            summary,
-            llm_input,
-            mode,
-            documents=documents,
-            input_config=input_config,
-            on_delta=_stage_delta("art_style"),
-        )
-        _emit_todo_update(project_id, "art_style", "done")
-        _emit_content_update(project_id, "art_style", art_style)
-        _update_task(task_id, progress=STEP_PROGRESS["art_style"])
-
-        current_step = "package_name"
-        fallback_name = (summary or llm_input or "素材包").strip()[:10]
-        package_name = fallback_name or "素材包"
-        _emit_content_update(project_id, "package_name", package_name)
-
-        current_step = "characters"
-        subjects = llm.generate_characters(
-            summary,
-            art_style,
-            llm_input,
-            mode,
-            documents=documents,
-            input_config=input_config,
-            on_delta=_stage_delta("characters"),
+        # Stages can finish out of order, so progress follows the number of
+        # completed stages rather than which one finished.
+        stage_progress = iter(
+            STEP_PROGRESS[name] for name in ("summary", "art_style", "characters", "scenes", "storyboard")
         )
-        _emit_todo_update(project_id, "characters", "done")
-        _emit_content_update(project_id, "characters", subjects)
-        _update_task(task_id, progress=STEP_PROGRESS["characters"])
-
-        current_step = "scenes"
-        scenes = llm.generate_scenes(
-            summary,
-            art_style,
-            subjects,
-            llm_input,
-            mode,
-            documents=documents,
-            input_config=input_config,
-            on_delta=_stage_delta("scenes"),
-        )
-        _emit_todo_update(project_id, "scenes", "done")
-        _emit_content_update(project_id, "scenes", scenes)
-        _update_task(task_id, progress=STEP_PROGRESS["scenes"])
 
-        current_step = "storyboard"
-        storyboard = llm.generate_storyboard(
-            summary,
-            art_style,
-            subjects,
-            scenes,
-            llm_input,
-            mode,
-            documents=documents,
-            input_config=input_config,
-            on_delta=_stage_delta("storyboard"),
+        def _stage_done(stage: str, value: Any) -> None:
+            content = value[0] if stage == "summary" else value
+            _emit_todo_update(project_id, stage, "done")
+            _emit_content_update(project_id, stage, content)
+            if stage == "summary":
+                _emit_content_update(project_id, "package_name", _fallback_package_name(content, llm_input))
+            _update_task(task_id, progress=next(stage_progress))
+
+        def _stage_failed(stage: str, _exc: BaseException) -> None:
+            nonlocal current_step
+            current_step = stage
+
+        stage_run = run_stage_graph(
+            llm.material_package_stages(
+                llm_input,
+                mode,
+                documents=documents,
+                input_config=input_config,
+                stage_delta=_stage_delta,
+            ),
+            llm.provider_name(),
+            project_id,
+            on_done=_stage_done,
+            on_failed=_stage_failed,
         )
-        _emit_todo_update(project_id, "storyboard", "done")
-        _emit_content_update(project_id, "storyboard", storyboard)
-        _update_task(task_id, progress=STEP_PROGRESS["storyboard"])
-
-        llm_payload = {
-            "summary": summary,
-            "keywords": keywords,
-            "art_style": art_style,
-            "subjects": subjects,
-            "scenes": scenes,
-            "storyboard": storyboard,
-        }
+        current_step = "storyboard"
+        llm_payload = LLMService.material_package_struct(stage_run.results)
+        package_name = _fallback_package_name(llm_payload["summary"], llm_input)
         blueprint = build_blueprint(llm_payload, source_prompt=llm_input)
 
         image_size = _resolve_image_size(input_config)
-        packages = package_repo.list_packages_for_project(db, project_id)
+        packages = package_repo.list_package_summaries(db, project_id)
         package_version = _next_package_version(packages)
 
         first_scene = blueprint["scenes"][0] if blueprint.get("scenes") else {}
@@ -588,6 +553,7 @@ def _run_generation_task(
                     "user_prompt": llm_input,
                     "user_feedback": None,
                     "generation_mode": mode,
+                    "generation_timing": stage_run.timing(),
                     "image_model_id": image_model_id,
                     "input_config": input_config,
                     "input_documents": documents,
@@ -612,11 +578,14 @@ def _run_generation_task(
                 "progress": 5,
             },
         )
-        task = GENERATION_TASKS.get(task_id)
-        if task is not None:
-            task["material_package_id"] = package["id"]
+        _update_task(task_id, material_package_id=package["id"])
         _emit_text_done(project_id, package["id"])
 
+        def _persist_failed(items: list[dict]) -> None:
+            for item in items:
+                _emit_image_error(project_id, item.get("type") or "scene", "图片保存失败")
+
+        writer = image_batcher(package["id"], _persist_failed)
         try:
             image_tasks: list[dict] = []
             for subject in blueprint.get("subjects", []):
@@ -673,63 +642,57 @@ def _run_generation_task(
                 return {"task": task, "image_result": result, "duration_ms": duration_ms}
 
             if image_tasks:
-                max_workers = len(image_tasks)
-                with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                    futures = [executor.submit(_generate_image, task) for task in image_tasks]
-                    for future in as_completed(futures):
-                        result = future.result()
-                        task = result.get("task") or {}
-                        kind = task.get("kind")
-                        if result.get("error"):
-                            if kind == "character_sheet":
-                                _emit_image_error(project_id, "character_sheet", "角色三视图生成失败")
-                            else:
-                                _emit_image_error(project_id, "scene", "场景图生成失败")
-                            continue
-                        image_result = result.get("image_result")
-                        if not isinstance(image_result, dict) or not image_result.get("url"):
-                            continue
+                executor = get_provider_executor()
+                provider = image_service.provider_name()
+                futures = [executor.submit(provider, project_id, _generate_image, task) for task in image_tasks]
+                for future in as_completed(futures):
+                    result = future.result()
+                    task = result.get("task") or {}
+                    kind = task.get("kind")
+                    if result.get("error"):
                         if kind == "character_sheet":
-                            image_payload = {
-                                "id": new_id(),
-                                "type": "character_sheet",
-                                "subject_id": task.get("subject_id"),
-                                "subject_name": task.get("subject_name"),
-                                "url": image_result.get("url"),
-                                "prompt": image_result.get("prompt") or task.get("prompt") or "",
-                                "prompt_parts": task.get("prompt_parts") or {},
-                                "provider": image_result.get("provider"),
-                                "model": image_result.get("model"),
-                                "model_id": image_model_id,
-                                "size": image_result.get("size"),
-                                "is_active": True,
-                            }
+                            _emit_image_error(project_id, "character_sheet", "角色三视图生成失败")
                         else:
-                            image_payload = {
-                                "id": new_id(),
-                                "type": "scene",
-                                "scene_id": task.get("scene_id"),
-                                "url": image_result.get("url"),
-                                "prompt": image_result.get("prompt") or task.get("prompt") or "",
-                                "prompt_parts": task.get("prompt_parts") or {},
-                                "provider": image_result.get("provider"),
-                                "model": image_result.get("model"),
-                                "model_id": image_model_id,
-                                "size": image_result.get("size"),
-                                "is_active": True,
-                            }
-                        try:
-                            if _append_image_to_package(db, package["id"], image_payload):
-                                _emit_image_generated(project_id, image_payload["id"], image_payload["type"])
-                        except SQLAlchemyError:
-                            db.rollback()
-                            logger.exception(
-                                "generation stage=image_gen persist failed project_id=%s image_type=%s",
-                                project_id,
-                                image_payload.get("type"),
-                            )
-                            _emit_image_error(project_id, image_payload.get("type") or "scene", "图片保存失败")
-
+                            _emit_image_error(project_id, "scene", "场景图生成失败")
+                        continue
+                    image_result = result.get("image_result")
+                    if not isinstance(image_result, dict) or not image_result.get("url"):
+                        continue
+                    if kind == "character_sheet":
+                        image_payload = {
+                            "id": new_id(),
+                            "type": "character_sheet",
+                            "subject_id": task.get("subject_id"),
+                            "subject_name": task.get("subject_name"),
+                            "url": image_result.get("url"),
+                            "prompt": image_result.get("prompt") or task.get("prompt") or "",
+                            "prompt_parts": task.get("prompt_parts") or {},
+                            "provider": image_result.get("provider"),
+                            "model": image_result.get("model"),
+                            "model_id": image_model_id,
+                            "size": image_result.get("size"),
+                            "is_active": True,
+                        }
+                    else:
+                        image_payload = {
+                            "id": new_id(),
+                            "type": "scene",
+                            "scene_id": task.get("scene_id"),
+                            "url": image_result.get("url"),
+                            "prompt": image_result.get("prompt") or task.get("prompt") or "",
+                            "prompt_parts": task.get("prompt_parts") or {},
+                            "provider": image_result.get("provider"),
+                            "model": image_result.get("model"),
+                            "model_id": image_model_id,
+                            "size": image_result.get("size"),
+                            "is_active": True,
+                        }
+                    # The UI hears about each image right away; the row is written
+                    # with the next batch, before the package is marked completed.
+                    writer.add(image_payload)
+                    _emit_image_generated(project_id, image_payload["id"], image_payload["type"])
+
+            writer.close()
             try:
                 package_repo.update_package(db, package["id"], {"status": "completed"})
             except SQLAlchemyError:
@@ -739,6 +702,8 @@ def _run_generation_task(
         except Exception:
             logger.exception("generation stage=image_pipeline failed project_id=%s", project_id)
             _emit_image_error(project_id, "all", "图片生成失败")
+        finally:
+            writer.close()
         _emit_done(project_id, package["id"])
         current_step = "done"
         _update_task(task_id, status="completed", progress=STEP_PROGRESS["done"])
@@ -755,16 +720,26 @@ def _run_generation_task(
         )
     except Exception as exc:
         logger.exception("generation failed project_id=%s", project_id)
+        if job_will_retry(exc):
+            # The task stays running; the retry resets the event history.
+            retry_event = {
+                "type": "generation.retrying",
+                "step": current_step,
+                "message": "生成遇到临时问题，正在重试",
+            }
+            if isinstance(exc, ProviderUnavailableError):
+                retry_event["code"] = exc.code
+            publish_generation_event(project_id, retry_event)
+            raise
         _update_task(task_id, status="failed", progress=0)
         if not error_sent:
             error_sent = True
-            error_message = "生成失败"
-            if isinstance(exc, RuntimeError) and "rate" in str(exc).lower():
-                error_message = "模型限流，请稍后重试"
-            publish_generation_event(
-                project_id,
-                {"type": "generation.error", "step": current_step, "message": error_message},
-            )
+            error_event = {"type": "generation.error", "step": current_step, "message": "生成失败"}
+            if isinstance(exc, ProviderUnavailableError):
+                error_event.update(code=exc.code, message="模型服务暂不可用，请稍后重试")
+            elif isinstance(exc, RuntimeError) and "rate" in str(exc).lower():
+                error_event["message"] = "模型限流，请稍后重试"
+            publish_generation_event(project_id, error_event)
         emit_event(
             "generation.completed",
             {
@@ -778,36 +753,69 @@ def _run_generation_task(
         db.close()
 
 
+def run_generation_job(payload: dict) -> None:
+    db = SessionLocal()
+    try:
+        llm_overrides = resolve_llm_overrides_for_user(db, payload.get("user_id"))
+    finally:
+        db.close()
+    _run_generation_task(
+        payload["project_id"],
+        payload.get("llm_input") or "",
+        payload.get("mode") or "general",
+        payload.get("documents") or [],
+        payload.get("input_config") or {},
+        payload["task_id"],
+        payload.get("trace_id") or "",
+        payload.get("image_model_id"),
+        payload.get("image_model"),
+        llm_overrides,
+    )
+
+
 @router.get("/stream/{project_id}")
 async def stream_generation(
     project_id: str,
-    current_user: object = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: object = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+    last_event_id: str | None = Header(default=None, alias="Last-Event-ID"),
+    last_event_id_query: str | None = Query(default=None, alias="last_event_id"),
 ) -> StreamingResponse:
     if not project_id.strip():
         raise HTTPException(status_code=400, detail="project_id required")
     try:
-        project = project_repo.get_project(db, project_id)
+        project = await project_repo.get_project_access_async(db, project_id)
     except SQLAlchemyError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Database error")
+    finally:
+        # The stream can stay open for minutes; don't hold a pooled connection.
+        await db.close()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     if not can_access_project(current_user, project):
         raise HTTPException(status_code=403, detail="Forbidden")
-    queue, history = subscribe_generation_events(project_id)
+    queue, history = subscribe_generation_events(
+        project_id, parse_last_event_id(last_event_id or last_event_id_query)
+    )
 
-    def event_stream():
+    async def event_stream():
         try:
-            for payload in history:
-                yield format_sse(payload)
+            for seq, payload in history:
+                yield format_sse(payload, seq)
+                if payload.get("type") in {"generation.error", "done"}:
+                    return
             while True:
                 try:
-                    payload = queue.get(timeout=15)
-                except Empty:
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
                     yield ": ping\n\n"
                     continue
-                yield format_sse(payload)
+                if event is None:
+                    # Dropped as a slow consumer; the client resumes from history.
+                    break
+                seq, payload = event
+                yield format_sse(payload, seq)
                 if payload.get("type") == "generation.error":
                     break
                 if payload.get("type") == "done":
@@ -826,7 +834,7 @@ async def stream_generation(
 
 
 @router.post("/start")
-async def start_generation(
+def start_generation(
     background_tasks: BackgroundTasks,
     payload: Dict[str, Any] = Body(default_factory=dict),
     current_user: object = Depends(get_current_user),
@@ -881,18 +889,13 @@ async def start_generation(
         except SQLAlchemyError:
             db.rollback()
             raise HTTPException(status_code=500, detail="Database error")
-    task_id = new_id()
     trace_id = new_trace_id()
-    task = {
-        "id": task_id,
-        "project_id": project_id,
-        "status": "pending",
-        "progress": 0,
-        "created_at": utc_now(),
-        "updated_at": utc_now(),
-    }
-    GENERATION_TASKS[task_id] = task
-    GENERATION_TRACES[task_id] = trace_id
+    try:
+        task = task_repo.create_generation_task(db, project_id, trace_id)
+    except SQLAlchemyError:
+        db.rollback()
+        raise HTTPException(status_code=500, detail="Database error")
+    task_id = task["id"]
     emit_event(
         "generation.started",
         {
@@ -906,24 +909,33 @@ async def start_generation(
     llm_overrides = resolve_llm_overrides(current_user)
     if not llm_overrides.get("api_key") and not llm_overrides.get("allow_fallback"):
         raise HTTPException(status_code=400, detail="api_key required")
-    background_tasks.add_task(
-        _run_generation_task,
-        project_id,
-        llm_input,
-        mode,
-        documents,
-        input_config,
-        task_id,
-        trace_id,
-        image_model_id,
-        image_model,
-        llm_overrides,
-    )
+    try:
+        dispatch_job(
+            db,
+            background_tasks,
+            "generation.run",
+            {
+                "project_id": project_id,
+                "llm_input": llm_input,
+                "mode": mode,
+                "documents": documents,
+                "input_config": input_config,
+                "task_id": task_id,
+                "trace_id": trace_id,
+                "image_model_id": image_model_id,
+                "image_model": image_model,
+                "user_id": getattr(current_user, "id", None),
+            },
+            project_id=project_id,
+        )
+    except SQLAlchemyError:
+        db.rollback()
+        raise HTTPException(status_code=500, detail="Database error")
     return ok(task)
 
 
 @router.get("/progress/{project_id}")
-async def get_generation_progress(
+def get_generation_progress(
     project_id: str,
     current_user: object = Depends(get_current_user),
     db: Session = Depends(get_db),
@@ -931,7 +943,7 @@ async def get_generation_progress(
     if not project_id.strip():
         raise HTTPException(status_code=400, detail="project_id required")
     try:
-        project = project_repo.get_project(db, project_id)
+        project = project_repo.get_project_access(db, project_id)
     except SQLAlchemyError:
         db.rollback()
         raise HTTPException(status_code=500, detail="Database error")
@@ -939,12 +951,16 @@ async def get_generation_progress(
         raise HTTPException(status_code=404, detail="Project not found")
     if not can_access_project(current_user, project):
         raise HTTPException(status_code=403, detail="Forbidden")
-    tasks = [task for task in GENERATION_TASKS.values() if task["project_id"] == project_id]
+    try:
+        tasks = task_repo.list_generation_tasks(db, project_id)
+    except SQLAlchemyError:
+        db.rollback()
+        raise HTTPException(status_code=500, detail="Database error")
     return ok({"list": tasks})
 
 
 @router.post("/retry/{task_id}")
-async def retry_generation(
+def retry_generation(
     task_id: str,
     background_tasks: BackgroundTasks,
     current_user: object = Depends(get_current_user),
@@ -952,11 +968,11 @@ async def retry_generation(
 ) -> Dict[str, Any]:
     if not task_id.strip():
         raise HTTPException(status_code=400, detail="task_id required")
-    task = GENERATION_TASKS.get(task_id)
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
     try:
-        project = project_repo.get_project(db, task["project_id"])
+        task = task_repo.get_generation_task(db, task_id)
+        if not task:
+            raise HTTPException(status_code=404, detail="Task not found")
+        project = project_repo.get_project_access(db, task["project_id"])
     except SQLAlchemyError:
         db.rollback()
         raise HTTPException(status_code=500, detail="Database error")
@@ -964,10 +980,14 @@ async def retry_generation(
         raise HTTPException(status_code=404, detail="Project not found")
     if not can_manage_project(current_user, project):
         raise HTTPException(status_code=403, detail="Forbidden")
-    task["status"] = "pending"
-    task["progress"] = 0
-    task["updated_at"] = utc_now()
-    trace_id = GENERATION_TRACES.get(task_id)
+    try:
+        task = task_repo.update_generation_task(db, task_id, {"status": "pending", "progress": 0})
+        trace_id = task_repo.get_generation_trace_id(db, task_id)
+    except SQLAlchemyError:
+        db.rollback()
+        raise HTTPException(status_code=500, detail="Database error")
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
     emit_event(
         "generation.started",
         {
@@ -983,18 +1003,18 @@ async def retry_generation(
 
 
 @router.post("/skip/{task_id}")
-async def skip_generation(
+def skip_generation(
     task_id: str,
     current_user: object = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
     if not task_id.strip():
         raise HTTPException(status_code=400, detail="task_id required")
-    task = GENERATION_TASKS.get(task_id)
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
     try:
-        project = project_repo.get_project(db, task["project_id"])
+        task = task_repo.get_generation_task(db, task_id)
+        if not task:
+            raise HTTPException(status_code=404, detail="Task not found")
+        project = project_repo.get_project_access(db, task["project_id"])
     except SQLAlchemyError:
         db.rollback()
         raise HTTPException(status_code=500, detail="Database error")
@@ -1002,9 +1022,14 @@ async def skip_generation(
         raise HTTPException(status_code=404, detail="Project not found")
     if not can_manage_project(current_user, project):
         raise HTTPException(status_code=403, detail="Forbidden")
-    task["status"] = "failed"
-    task["updated_at"] = utc_now()
-    trace_id = GENERATION_TRACES.get(task_id)
+    try:
+        task = task_repo.update_generation_task(db, task_id, {"status": "failed"})
+        trace_id = task_repo.get_generation_trace_id(db, task_id)
+    except SQLAlchemyError:
+        db.rollback()
+        raise HTTPException(status_code=500, detail="Database error")
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
     emit_event(
         "generation.completed",
         {
@@ -2,16 +2,19 @@ import logging
 from typing import Any, Dict, Optional
 
 from fastapi import APIRouter, Body, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
 from app.api.v1.deps import get_current_user
 from app.api.v1.response import ok
 from app.db.models import MaterialPackage
-from app.db.session import get_db
+from app.db.session import SessionLocal, get_db
 from app.repositories import material_packages as package_repo
+from app.repositories import package_assets as asset_repo
 from app.repositories import projects as project_repo
 from app.services.access_control import can_manage_project
+from app.services.circuit_breaker import ProviderUnavailableError
 from app.services.feedback_service import FeedbackService
 from app.services.image_service import ImageService
 from app.services.model_registry import select_enabled_model
@@ -142,16 +145,16 @@ def _find_image(
     db: Session,
     image_id: str,
 ) -> tuple[Optional[MaterialPackage], Optional[dict], Optional[list]]:
-    packages = db.query(MaterialPackage).all()
-    for package in packages:
-        materials = package.materials or {}
-        metadata = materials.get("metadata") if isinstance(materials, dict) else {}
-        images = metadata.get("images") if isinstance(metadata, dict) else []
-        if not isinstance(images, list):
-            continue
-        for image in images:
-            if isinstance(image, dict) and image.get("id") == image_id:
-                return package, image, images
+    package_id = asset_repo.find_package_id(db, "image", image_id)
+    if not package_id:
+        return None, None, None
+    package, _ = package_repo.get_package_model_with_access(db, package_id)
+    if not package:
+        return None, None, None
+    images = asset_repo.load_assets(db, [package.id])[package.id].get("image", [])
+    for image in images:
+        if image.get("id") == image_id:
+            return package, image, images
     return None, None, None
 
 
@@ -161,7 +164,8 @@ def _require_package_manage(db: Session, user: object, package: MaterialPackage
     project_id = getattr(package, "project_id", None)
     if not project_id:
         raise HTTPException(status_code=404, detail="Project not found")
-    project = project_repo.get_project(db, project_id)
+    # Already cached by the package lookup in _find_image.
+    project = project_repo.get_project_access(db, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     if not can_manage_project(user, project):
@@ -185,6 +189,38 @@ def _group_key(image: dict) -> tuple:
     return ("single", image.get("id") or "", image_type)
 
 
+def _load_regenerate_source(
+    db: Session, user: object, image_id: str
+) -> tuple[MaterialPackage, dict, list]:
+    """Find and authorize the image, then close the request session.
+
+    Closing ends the read transaction and detaches the loaded package, so
+    no connection or transaction is held while the provider is awaited.
+    """
+    try:
+        package, source_image, images = _find_image(db, image_id)
+        if not package or not source_image or images is None:
+            raise HTTPException(status_code=404, detail="Image not found")
+        _require_package_manage(db, user, package)
+        return package, source_image, images
+    except SQLAlchemyError:
+        db.rollback()
+        raise HTTPException(status_code=500, detail="Database error")
+    finally:
+        db.close()
+
+
+def _save_regenerated_materials(package_id: str, materials: dict, expected_version: int) -> None:
+    db = SessionLocal()
+    try:
+        package_repo.update_package(db, package_id, {"materials": materials}, expected_version=expected_version)
+    except SQLAlchemyError:
+        db.rollback()
+        raise HTTPException(status_code=500, detail="Database error")
+    finally:
+        db.close()
+
+
 @router.post("/{image_id}/regenerate")
 async def regenerate_image(
     image_id: str,
@@ -209,19 +245,16 @@ async def regenerate_image(
     if model_id is not None and not isinstance(model_id, str):
         raise HTTPException(status_code=400, detail="model_id must be a string")
     model_id = model_id.strip() if isinstance(model_id, str) and model_id.strip() else None
+    seed = payload.get("seed")
+    if seed is not None and (isinstance(seed, bool) or not isinstance(seed, int)):
+        raise HTTPException(status_code=400, detail="seed must be an integer")
+    # Regenerating asks for a new image, so the result cache is skipped
+    # unless the caller opts back in.
+    bypass_cache = payload.get("bypass_cache", True)
+    if not isinstance(bypass_cache, bool):
+        raise HTTPException(status_code=400, detail="bypass_cache must be a boolean")
 
-    try:
-        package, source_image, images = _find_image(db, image_id)
-    except SQLAlchemyError:
-        db.rollback()
-        raise HTTPException(status_code=500, detail="Database error")
-    if not package or not source_image or images is None:
-        raise HTTPException(status_code=404, detail="Image not found")
-    try:
-        _require_package_manage(db, current_user, package)
-    except SQLAlchemyError:
-        db.rollback()
-        raise HTTPException(status_code=500, detail="Database error")
+    package, source_image, images = await run_in_threadpool(_load_regenerate_source, db, current_user, image_id)
 
     materials = dict(package.materials or {})
     metadata = dict(materials.get("metadata") or {})
@@ -285,9 +318,15 @@ async def regenerate_image(
 
     try:
         if ref_images:
-            image_result = image_service.generate_image_with_refs(prompt, ref_images, size=size, model=resolved_model)
+            image_result = await image_service.generate_image_with_refs_async(
+                prompt, ref_images, size=size, model=resolved_model, seed=seed, bypass_cache=bypass_cache
+            )
         else:
-            image_result = image_service.generate_image(prompt, size=size, model=resolved_model)
+            image_result = await image_service.generate_image_async(
+                prompt, size=size, model=resolved_model, seed=seed, bypass_cache=bypass_cache
+            )
+    except ProviderUnavailableError:
+        raise
     except Exception:
         logger.exception("image regeneration failed image_id=%s", image_id)
         raise HTTPException(status_code=502, detail="Image generation failed")
@@ -320,7 +359,7 @@ async def regenerate_image(
 
     materials = dict(package.materials or {})
     metadata = dict(materials.get("metadata") or {})
-    existing_images = list(metadata.get("images") or [])
+    existing_images = list(images)
     target_group = _group_key(source_image)
     for image in existing_images:
         if not isinstance(image, dict):
@@ -339,17 +378,13 @@ async def regenerate_image(
             metadata["image_plan"] = image_plan
     materials["metadata"] = metadata
 
-    try:
-        package_repo.update_package(db, package.id, {"materials": materials})
-    except SQLAlchemyError:
-        db.rollback()
-        raise HTTPException(status_code=500, detail="Database error")
+    await run_in_threadpool(_save_regenerated_materials, package.id, materials, package.version)
 
     return ok({"image": new_image, "material_package_id": package.id})
 
 
 @router.post("/{image_id}/feedback")
-async def rewrite_image_prompt(
+def rewrite_image_prompt(
     image_id: str,
     payload: Dict[str, Any] = Body(default_factory=dict),
     current_user: object = Depends(get_current_user),
@@ -392,7 +427,7 @@ async def rewrite_image_prompt(
 
 
 @router.post("/{image_id}/adopt")
-async def adopt_image(
+def adopt_image(
     image_id: str,
     current_user: object = Depends(get_current_user),
     db: Session = Depends(get_db),
@@ -431,7 +466,7 @@ async def adopt_image(
     materials["metadata"] = metadata
 
     try:
-        package_repo.update_package(db, package.id, {"materials": materials})
+        package_repo.update_package(db, package.id, {"materials": materials}, expected_version=package.version)
     except SQLAlchemyError:
         db.rollback()
         raise HTTPException(status_code=500, detail="Database error")
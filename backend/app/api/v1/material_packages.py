@@ -1,41 +1,54 @@
 import asyncio
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import as_completed
 from pathlib import Path
 from typing import Any, Dict
 
-from app.api.v1.deps import get_current_user
+from app.api.v1.deps import get_current_user, get_current_user_async
 from app.api.v1.response import ok
 from app.core.config import settings
-from app.db.session import SessionLocal, get_db
+from app.db.session import SessionLocal, get_async_db, get_db
 from app.repositories import material_packages as package_repo
+from app.repositories import package_assets as asset_repo
 from app.repositories import projects as project_repo
 from app.services.access_control import can_access_project, can_manage_project
+from app.services.asset_writer import image_batcher
 from app.services.blueprint_service import build_blueprint
+from app.services.circuit_breaker import ProviderUnavailableError
+from app.services.delta_coalescer import coalescer_for_stream
+from app.services.event_history import parse_last_event_id
 from app.services.generation_events import (
     publish_generation_event,
     reset_generation_events,
 )
 from app.services.generation_todo import TODO_LIST
 from app.services.image_service import ImageService
+from app.services.job_queue import current_job_attempt, dispatch_job, job_will_retry
 from app.services.llm_service import (
     LLMService,
     _normalize_material_package_struct,
     _validate_material_package_struct,
 )
 from app.services.model_registry import select_enabled_model
+from app.services.provider_executor import get_provider_executor
 from app.services.package_events import (
     format_package_sse,
     publish_package_event,
     subscribe_package_events,
     unsubscribe_package_events,
 )
-from app.services.user_llm_settings import resolve_llm_overrides
+from app.services.stage_graph import run_stage_graph
+from app.services.user_llm_settings import (
+    resolve_llm_overrides,
+    resolve_llm_overrides_for_user,
+)
 from app.services.video_service import VideoService
 from app.store import new_id, utc_now
-from fastapi import APIRouter, BackgroundTasks, Body, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Body, Depends, Header, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 router = APIRouter(tags=["material-packages"])
@@ -198,7 +211,7 @@ def _active_storyboard_url(images: list[dict]) -> str:
 
 
 def _require_project_access(db: Session, user: object, project_id: str) -> dict:
-    project = project_repo.get_project(db, project_id)
+    project = project_repo.get_project_access(db, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     if not can_access_project(user, project):
@@ -215,25 +228,40 @@ def _require_project_manage(db: Session, user: object, project_id: str) -> dict:
     return project
 
 
-def _require_package_access(db: Session, user: object, package_id: str) -> dict:
-    package = package_repo.get_package(db, package_id)
+def _check_package_access(db: Session, user: object, package_id: str, manage: bool = False) -> dict:
+    access = package_repo.get_package_access(db, package_id)
+    if not access:
+        raise HTTPException(status_code=404, detail="Material package not found")
+    allowed = can_manage_project(user, access) if manage else can_access_project(user, access)
+    if not allowed:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    return access
+
+
+def _require_package_manage(db: Session, user: object, package_id: str) -> dict:
+    package, access = package_repo.get_package_with_access(db, package_id)
     if not package:
         raise HTTPException(status_code=404, detail="Material package not found")
-    project_id = package.get("project_id") if isinstance(package, dict) else None
-    if not project_id:
-        raise HTTPException(status_code=404, detail="Project not found")
-    _require_project_access(db, user, project_id)
+    if not can_manage_project(user, access):
+        raise HTTPException(status_code=403, detail="Forbidden")
     return package
 
 
-def _require_package_manage(db: Session, user: object, package_id: str) -> dict:
-    package = package_repo.get_package(db, package_id)
+async def _check_package_access_async(db: AsyncSession, user: object, package_id: str) -> dict:
+    access = await package_repo.get_package_access_async(db, package_id)
+    if not access:
+        raise HTTPException(status_code=404, detail="Material package not found")
+    if not can_access_project(user, access):
+        raise HTTPException(status_code=403, detail="Forbidden")
+    return access
+
+
+async def _require_package_manage_async(db: AsyncSession, user: object, package_id: str) -> dict:
+    package, access = await package_repo.get_package_with_access_async(db, package_id)
     if not package:
         raise HTTPException(status_code=404, detail="Material package not found")
-    project_id = package.get("project_id") if isinstance(package, dict) else None
-    if not project_id:
-        raise HTTPException(status_code=404, detail="Project not found")
-    _require_project_manage(db, user, project_id)
+    if not can_manage_project(user, access):
+        raise HTTPException(status_code=403, detail="Forbidden")
     return package
 
 
@@ -314,6 +342,10 @@ def _emit_todo_update(project_id: str, item_id: str, status: str) -> None:
     )
 
 
+def _fallback_package_name(summary: str, source_prompt: str) -> str:
+    return (summary or source_prompt or "素材包").strip()[:10] or "素材包"
+
+
 def _emit_content_update(project_id: str, section: str, data: object) -> None:
     publish_generation_event(
         project_id,
@@ -328,6 +360,23 @@ def _emit_done(project_id: str, package_id: str | None) -> None:
     )
 
 
+def _emit_retrying(project_id: str, message: str, code: str | None = None) -> None:
+    event = {"type": "generation.retrying", "message": message}
+    if code:
+        event["code"] = code
+    publish_generation_event(project_id, event)
+
+
+def _emit_package_retrying(package_id: str, message: str, code: str | None = None) -> None:
+    payload = {"message": message}
+    if code:
+        payload["code"] = code
+    publish_package_event(
+        package_id,
+        _build_package_event(package_id, "retrying", payload),
+    )
+
+
 def _emit_text_done(project_id: str, package_id: str | None) -> None:
     publish_generation_event(
         project_id,
@@ -342,11 +391,11 @@ def _emit_image_generated(project_id: str, image_id: str, image_type: str) -> No
     )
 
 
-def _emit_image_error(project_id: str, image_type: str, message: str) -> None:
-    publish_generation_event(
-        project_id,
-        {"type": "image.error", "image_type": image_type, "message": message},
-    )
+def _emit_image_error(project_id: str, image_type: str, message: str, code: str | None = None) -> None:
+    event = {"type": "image.error", "image_type": image_type, "message": message}
+    if code:
+        event["code"] = code
+    publish_generation_event(project_id, event)
 
 
 def _emit_package_image_generated(
@@ -362,25 +411,22 @@ def _emit_package_image_generated(
     )
 
 
-def _emit_package_image_error(package_id: str, image_type: str, message: str) -> None:
+def _emit_package_image_error(
+    package_id: str, image_type: str, message: str, code: str | None = None
+) -> None:
+    payload = {"image_type": image_type, "message": message}
+    if code:
+        payload["code"] = code
     publish_package_event(
         package_id,
-        _build_package_event(
-            package_id,
-            "image.error",
-            {"image_type": image_type, "message": message},
-        ),
+        _build_package_event(package_id, "image.error", payload),
     )
 
 
 def _next_package_version(items: list[dict]) -> int:
     max_version = 0
     for item in items:
-        materials = item.get("materials") if isinstance(item, dict) else {}
-        metadata = materials.get("metadata") if isinstance(materials, dict) else {}
-        version = (
-            metadata.get("package_version") if isinstance(metadata, dict) else None
-        )
+        version = item.get("package_version") if isinstance(item, dict) else None
         if isinstance(version, int) and version > max_version:
             max_version = version
     if max_version == 0 and items:
@@ -484,22 +530,13 @@ def _build_character_prompt_parts(
     }
 
 
-def _append_image_to_package(db: Session, package_id: str, image: dict) -> bool:
-    package = package_repo.get_package(db, package_id)
-    if not package:
-        return False
-    materials = (
-        package.get("materials") if isinstance(package.get("materials"), dict) else {}
-    )
-    metadata = (
-        materials.get("metadata") if isinstance(materials.get("metadata"), dict) else {}
-    )
-    images = metadata.get("images") if isinstance(metadata.get("images"), list) else []
-    images.append(image)
-    metadata["images"] = images
-    materials["metadata"] = metadata
-    package_repo.update_package(db, package_id, {"materials": materials})
-    return True
+def _save_generated_assets(
+    db: Session, package_id: str, asset_type: str, items: list[dict], ops: list[dict]
+) -> None:
+    for item in items:
+        asset_repo.add_active_asset(db, package_id, asset_type, item)
+    if ops:
+        package_repo.patch_materials(db, package_id, ops)
 
 
 def _build_character_sheet_prompt(subject: dict, blueprint: dict) -> str:
@@ -554,6 +591,12 @@ def _build_character_sheet_prompt(subject: dict, blueprint: dict) -> str:
     return "\n".join([line for line in lines if line is not None]).strip()
 
 
+def _image_task_key(kind: str | None, item: dict) -> tuple:
+    if kind == "character_sheet":
+        return (kind, item.get("subject_id"))
+    return (kind, item.get("scene_id"))
+
+
 def _run_feedback_image_generation(
     project_id: str,
     package_id: str,
@@ -563,7 +606,16 @@ def _run_feedback_image_generation(
     model: str | None,
     emit_package_events: bool = False,
 ) -> None:
+    def _persist_failed(items: list[dict]) -> None:
+        for item in items:
+            image_type = item.get("type") or "scene"
+            _emit_image_error(project_id, image_type, "图片保存失败")
+            if emit_package_events:
+                _emit_package_image_error(package_id, image_type, "图片保存失败")
+
     db = SessionLocal()
+    writer = image_batcher(package_id, _persist_failed)
+    retrying = False
     try:
         tasks: list[dict] = []
         for subject in blueprint.get("subjects", []):
@@ -625,132 +677,145 @@ def _run_feedback_image_generation(
                 }
             )
 
+        if current_job_attempt() > 1:
+            # A retried job keeps the images its earlier attempts saved.
+            saved = asset_repo.load_assets(db, [package_id])[package_id].get("image", [])
+            saved_keys = {_image_task_key(image.get("type"), image) for image in saved}
+            tasks = [task for task in tasks if _image_task_key(task["kind"], task) not in saved_keys]
+
         def _generate(task: dict) -> dict:
             try:
                 result = image_service.generate_image(
                     task["prompt"], size=image_size, model=model
                 )
+            except ProviderUnavailableError as exc:
+                return {"task": task, "error": str(exc), "code": exc.code}
             except Exception as exc:
                 return {"task": task, "error": str(exc)}
             return {"task": task, "image_result": result}
 
         if tasks:
-            with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
-                futures = [executor.submit(_generate, task) for task in tasks]
-                for future in as_completed(futures):
-                    result = future.result()
-                    task = result.get("task") or {}
-                    kind = task.get("kind")
-                    if result.get("error"):
-                        if kind == "character_sheet":
-                            _emit_image_error(
-                                project_id, "character_sheet", "角色三视图生成失败"
-                            )
-                            if emit_package_events:
-                                _emit_package_image_error(
-                                    package_id, "character_sheet", "角色三视图生成失败"
-                                )
-                        else:
-                            _emit_image_error(project_id, "scene", "场景图生成失败")
-                            if emit_package_events:
-                                _emit_package_image_error(
-                                    package_id, "scene", "场景图生成失败"
-                                )
-                        continue
-                    image_result = result.get("image_result")
-                    if not isinstance(image_result, dict) or not image_result.get(
-                        "url"
-                    ):
-                        continue
-
+            executor = get_provider_executor()
+            provider = image_service.provider_name()
+            futures = [
+                executor.submit(provider, package_id, _generate, task) for task in tasks
+            ]
+            for future in as_completed(futures):
+                result = future.result()
+                task = result.get("task") or {}
+                kind = task.get("kind")
+                if result.get("error"):
+                    code = result.get("code")
                     if kind == "character_sheet":
-                        image_payload = {
-                            "id": new_id(),
-                            "type": "character_sheet",
-                            "subject_id": task.get("subject_id"),
-                            "subject_name": task.get("subject_name"),
-                            "url": image_result.get("url"),
-                            "prompt": image_result.get("prompt")
-                            or task.get("prompt")
-                            or "",
-                            "prompt_parts": task.get("prompt_parts") or {},
-                            "provider": image_result.get("provider"),
-                            "model": image_result.get("model"),
-                            "model_id": model_id,
-                            "size": image_result.get("size"),
-                            "is_active": True,
-                        }
-                    else:
-                        image_payload = {
-                            "id": new_id(),
-                            "type": "scene",
-                            "scene_id": task.get("scene_id"),
-                            "url": image_result.get("url"),
-                            "prompt": image_result.get("prompt")
-                            or task.get("prompt")
-                            or "",
-                            "prompt_parts": {
-                                "content": task.get("prompt") or "",
-                                "style": blueprint.get("art_style", {}).get(
-                                    "style_prompt"
-                                )
-                                or "",
-                                "constraints": SCENE_QUALITY_CONSTRAINTS,
-                            },
-                            "provider": image_result.get("provider"),
-                            "model": image_result.get("model"),
-                            "model_id": model_id,
-                            "size": image_result.get("size"),
-                            "is_active": True,
-                        }
-                    try:
-                        if _append_image_to_package(db, package_id, image_payload):
-                            _emit_image_generated(
-                                project_id, image_payload["id"], image_payload["type"]
-                            )
-                            if emit_package_events:
-                                _emit_package_image_generated(
-                                    package_id,
-                                    image_payload["id"],
-                                    image_payload["type"],
-                                )
-                    except SQLAlchemyError:
-                        db.rollback()
-                        logger.exception(
-                            "generation stage=image_gen persist failed package_id=%s image_type=%s",
-                            package_id,
-                            image_payload.get("type"),
-                        )
                         _emit_image_error(
-                            project_id,
-                            image_payload.get("type") or "scene",
-                            "图片保存失败",
+                            project_id, "character_sheet", "角色三视图生成失败", code
                         )
                         if emit_package_events:
                             _emit_package_image_error(
-                                package_id,
-                                image_payload.get("type") or "scene",
-                                "图片保存失败",
+                                package_id, "character_sheet", "角色三视图生成失败", code
+                            )
+                    else:
+                        _emit_image_error(project_id, "scene", "场景图生成失败", code)
+                        if emit_package_events:
+                            _emit_package_image_error(
+                                package_id, "scene", "场景图生成失败", code
                             )
+                    continue
+                image_result = result.get("image_result")
+                if not isinstance(image_result, dict) or not image_result.get(
+                    "url"
+                ):
+                    continue
+
+                if kind == "character_sheet":
+                    image_payload = {
+                        "id": new_id(),
+                        "type": "character_sheet",
+                        "subject_id": task.get("subject_id"),
+                        "subject_name": task.get("subject_name"),
+                        "url": image_result.get("url"),
+                        "prompt": image_result.get("prompt")
+                        or task.get("prompt")
+                        or "",
+                        "prompt_parts": task.get("prompt_parts") or {},
+                        "provider": image_result.get("provider"),
+                        "model": image_result.get("model"),
+                        "model_id": model_id,
+                        "size": image_result.get("size"),
+                        "is_active": True,
+                    }
+                else:
+                    image_payload = {
+                        "id": new_id(),
+                        "type": "scene",
+                        "scene_id": task.get("scene_id"),
+                        "url": image_result.get("url"),
+                        "prompt": image_result.get("prompt")
+                        or task.get("prompt")
+                        or "",
+                        "prompt_parts": {
+                            "content": task.get("prompt") or "",
+                            "style": blueprint.get("art_style", {}).get(
+                                "style_prompt"
+                            )
+                            or "",
+                            "constraints": SCENE_QUALITY_CONSTRAINTS,
+                        },
+                        "provider": image_result.get("provider"),
+                        "model": image_result.get("model"),
+                        "model_id": model_id,
+                        "size": image_result.get("size"),
+                        "is_active": True,
+                    }
+                # The UI hears about each image right away; the row is written
+                # with the next batch, before the package is marked completed.
+                writer.add(image_payload)
+                _emit_image_generated(
+                    project_id, image_payload["id"], image_payload["type"]
+                )
+                if emit_package_events:
+                    _emit_package_image_generated(
+                        package_id,
+                        image_payload["id"],
+                        image_payload["type"],
+                    )
 
+        writer.close()
         try:
             package_repo.update_package(db, package_id, {"status": "completed"})
-        except SQLAlchemyError:
+        except SQLAlchemyError as exc:
             db.rollback()
             logger.exception(
                 "generation stage=image_finalize failed package_id=%s", package_id
             )
+            # Saved images are skipped on retry, so only the finalize reruns.
+            if job_will_retry(exc):
+                raise
             _emit_image_error(project_id, "all", "图片阶段收尾失败")
             if emit_package_events:
                 _emit_package_image_error(package_id, "all", "图片阶段收尾失败")
-    except Exception:
+    except Exception as exc:
         logger.exception("feedback image pipeline failed package_id=%s", package_id)
+        if job_will_retry(exc):
+            retrying = True
+            code = getattr(exc, "code", None)
+            _emit_retrying(project_id, "图片生成遇到临时问题，正在重试", code)
+            if emit_package_events:
+                _emit_package_retrying(package_id, "图片生成遇到临时问题，正在重试", code)
+            raise
         _emit_image_error(project_id, "all", "图片生成失败")
         if emit_package_events:
             _emit_package_image_error(package_id, "all", "图片生成失败")
     finally:
+        writer.close()
         db.close()
-        _emit_done(project_id, package_id)
+        if not retrying:
+            _emit_done(project_id, package_id)
+            if emit_package_events:
+                publish_package_event(
+                    package_id,
+                    _build_package_event(package_id, "done", {"status": "completed"}),
+                )
 
 
 def _run_stream_package_generation(
@@ -777,10 +842,7 @@ def _run_stream_package_generation(
             _build_package_event(package_id, "phase.started", {"phase": "text"}),
         )
 
-        def on_delta(delta: str, reasoning: str) -> None:
-            nonlocal partial_text
-            if delta:
-                partial_text += delta
+        def publish_delta(delta: str, reasoning: str) -> None:
             payload = {"phase": "text", "delta": delta or ""}
             if reasoning:
                 payload["reasoning_delta"] = reasoning
@@ -788,13 +850,24 @@ def _run_stream_package_generation(
                 package_id, _build_package_event(package_id, "phase.delta", payload)
             )
 
-        result = llm.stream_material_package(
-            prompt,
-            mode,
-            documents=documents,
-            input_config=input_config,
-            on_delta=on_delta,
-        )
+        coalescer = coalescer_for_stream("package.text", package_id, publish_delta)
+
+        def on_delta(delta: str, reasoning: str) -> None:
+            nonlocal partial_text
+            if delta:
+                partial_text += delta
+            coalescer.add(delta, reasoning)
+
+        try:
+            result = llm.stream_material_package(
+                prompt,
+                mode,
+                documents=documents,
+                input_config=input_config,
+                on_delta=on_delta,
+            )
+        finally:
+            coalescer.close()
         if result.get("finish_reason") or result.get("done"):
             publish_package_event(
                 package_id,
@@ -889,7 +962,7 @@ def _run_stream_package_generation(
             )
         except SQLAlchemyError:
             db.rollback()
-            raise RuntimeError("Database error")
+            raise
 
         publish_package_event(
             package_id,
@@ -900,54 +973,47 @@ def _run_stream_package_generation(
             ),
         )
 
-        _run_feedback_image_generation(
-            project_id,
-            package_id,
-            blueprint,
-            image_size,
-            resolved_model_id,
-            resolved_model,
-            emit_package_events=True,
-        )
-
-        publish_package_event(
-            package_id,
-            _build_package_event(package_id, "done", {"status": "completed"}),
+        # Images run as their own job so the text slot frees up as soon as the
+        # blueprint is stored; the image job publishes the final "done".
+        dispatch_job(
+            db,
+            None,
+            "material_package.images",
+            {
+                "project_id": project_id,
+                "package_id": package_id,
+                "blueprint": blueprint,
+                "image_size": image_size,
+                "model_id": resolved_model_id,
+                "model": resolved_model,
+                "emit_package_events": True,
+            },
+            project_id=project_id,
         )
     except Exception as exc:
         logger.exception("stream generation failed package_id=%s", package_id)
-        materials_payload = None
-        try:
-            package = package_repo.get_package(db, package_id)
-            if package and isinstance(package.get("materials"), dict):
-                materials_payload = package.get("materials")
-        except SQLAlchemyError:
-            materials_payload = None
-        if isinstance(materials_payload, dict):
-            metadata = (
-                materials_payload.get("metadata")
-                if isinstance(materials_payload.get("metadata"), dict)
-                else {}
-            )
-            metadata["partial_text"] = partial_text
-            materials_payload["metadata"] = metadata
+        retrying = job_will_retry(exc)
         try:
-            package_repo.update_package(
+            package_repo.patch_materials(
                 db,
                 package_id,
-                {
-                    "status": "failed",
-                    "materials": materials_payload
-                    or {"metadata": {"partial_text": partial_text}},
-                },
+                [package_repo.set_path(["metadata", "partial_text"], partial_text)],
             )
+            if not retrying:
+                package_repo.update_package(db, package_id, {"status": "failed"})
         except SQLAlchemyError:
             db.rollback()
         error_code = "stream_error"
         error_message = "生成失败"
-        if isinstance(exc, RuntimeError) and "rate" in str(exc).lower():
+        if isinstance(exc, ProviderUnavailableError):
+            error_code = exc.code
+            error_message = "模型服务暂不可用，请稍后重试"
+        elif isinstance(exc, RuntimeError) and "rate" in str(exc).lower():
             error_code = "rate_limited"
             error_message = "模型限流，请稍后重试"
+        if retrying:
+            _emit_package_retrying(package_id, "生成遇到临时问题，正在重试", error_code)
+            raise
         publish_package_event(
             package_id,
             _build_package_event(
@@ -963,6 +1029,37 @@ def _run_stream_package_generation(
         db.close()
 
 
+def run_package_generation_job(payload: dict) -> None:
+    db = SessionLocal()
+    try:
+        llm_overrides = resolve_llm_overrides_for_user(db, payload.get("user_id"))
+    finally:
+        db.close()
+    _run_stream_package_generation(
+        payload["project_id"],
+        payload["package_id"],
+        payload.get("prompt") or "",
+        payload.get("mode") or "general",
+        payload.get("documents") or [],
+        payload.get("input_config") or {},
+        payload.get("image_model_id"),
+        int(payload.get("package_version") or 1),
+        llm_overrides,
+    )
+
+
+def run_package_images_job(payload: dict) -> None:
+    _run_feedback_image_generation(
+        payload["project_id"],
+        payload["package_id"],
+        payload.get("blueprint") or {},
+        payload.get("image_size") or "",
+        payload.get("model_id"),
+        payload.get("model"),
+        emit_package_events=bool(payload.get("emit_package_events")),
+    )
+
+
 def _build_storyboard_prompt_parts(shot: dict, scene: dict, blueprint: dict) -> dict:
     summary = blueprint.get("summary", {}) if isinstance(blueprint, dict) else {}
     art_style = blueprint.get("art_style", {}) if isinstance(blueprint, dict) else {}
@@ -1049,7 +1146,7 @@ def _render_storyboard_prompt(parts: dict) -> str:
 
 
 @router.post("/material-packages")
-async def create_material_package(
+def create_material_package(
     background_tasks: BackgroundTasks,
     payload: Dict[str, Any] = Body(default_factory=dict),
     current_user: object = Depends(get_current_user),
@@ -1115,7 +1212,7 @@ async def create_material_package(
         raise HTTPException(status_code=400, detail="api_key required")
 
     try:
-        items = package_repo.list_packages_for_project(db, project_id)
+        items = package_repo.list_package_summaries(db, project_id)
     except SQLAlchemyError:
         db.rollback()
         raise HTTPException(status_code=500, detail="Database error")
@@ -1176,50 +1273,68 @@ async def create_material_package(
                 "progress": 0,
             },
         )
+        dispatch_job(
+            db,
+            background_tasks,
+            "material_package.generate",
+            {
+                "project_id": project_id,
+                "package_id": package["id"],
+                "prompt": llm_input,
+                "mode": mode,
+                "documents": documents,
+                "input_config": input_config,
+                "image_model_id": image_model_id,
+                "package_version": package_version,
+                "user_id": getattr(current_user, "id", None),
+            },
+            project_id=project_id,
+        )
     except SQLAlchemyError:
         db.rollback()
         raise HTTPException(status_code=500, detail="Database error")
-    background_tasks.add_task(
-        _run_stream_package_generation,
-        project_id,
-        package["id"],
-        llm_input,
-        mode,
-        documents,
-        input_config,
-        image_model_id,
-        package_version,
-        llm_overrides,
-    )
     return ok({"package_id": package["id"], "status": "running"})
 
 
 @router.get("/material-packages/{package_id}/events")
 async def stream_material_package_events(
     package_id: str,
-    current_user: object = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: object = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+    last_event_id: str | None = Header(default=None, alias="Last-Event-ID"),
+    last_event_id_query: str | None = Query(default=None, alias="last_event_id"),
 ) -> StreamingResponse:
     if not package_id.strip():
         raise HTTPException(status_code=400, detail="package_id required")
     try:
-        _require_package_access(db, current_user, package_id)
+        await _check_package_access_async(db, current_user, package_id)
     except SQLAlchemyError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Database error")
-    queue, history = subscribe_package_events(package_id)
+    finally:
+        # The stream can stay open for minutes; don't hold a pooled connection.
+        await db.close()
+    queue, history = subscribe_package_events(
+        package_id, parse_last_event_id(last_event_id or last_event_id_query)
+    )
 
     async def event_stream():
         try:
-            for payload in history:
-                yield format_package_sse(payload)
+            for seq, payload in history:
+                yield format_package_sse(payload, seq)
+                if payload.get("event") in {"done", "error"}:
+                    return
             while True:
                 try:
-                    payload = await asyncio.wait_for(queue.get(), timeout=15)
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
                 except asyncio.TimeoutError:
                     yield ": ping\n\n"
                     continue
-                yield format_package_sse(payload)
+                if event is None:
+                    # Dropped as a slow consumer; the client resumes from history.
+                    break
+                seq, payload = event
+                yield format_package_sse(payload, seq)
                 if payload.get("event") in {"done", "error"}:
                     break
         finally:
@@ -1236,14 +1351,20 @@ async def stream_material_package_events(
 
 
 @router.get("/projects/{project_id}/material-packages")
-async def list_material_packages(
+def list_material_packages(
     project_id: str,
+    view: str = Query(default="full"),
     current_user: object = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
+    if view not in {"full", "summary"}:
+        raise HTTPException(status_code=400, detail="view invalid")
     try:
         _require_project_access(db, current_user, project_id)
-        items = package_repo.list_packages_for_project(db, project_id)
+        if view == "summary":
+            items = package_repo.list_package_summaries(db, project_id)
+        else:
+            items = package_repo.list_packages_for_project(db, project_id)
     except HTTPException:
         raise
     except SQLAlchemyError:
@@ -1255,21 +1376,37 @@ async def list_material_packages(
 @router.get("/material-packages/{package_id}")
 async def get_material_package(
     package_id: str,
-    current_user: object = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: object = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ) -> Dict[str, Any]:
     try:
-        package = _require_package_manage(db, current_user, package_id)
+        package = await _require_package_manage_async(db, current_user, package_id)
     except SQLAlchemyError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Database error")
     return ok(package)
 
 
+def _expected_version(payload: Dict[str, Any], if_match: str | None) -> int | None:
+    version = payload.get("version")
+    if version is None and if_match:
+        tag = if_match.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        try:
+            version = int(tag.strip('"'))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="If-Match must be a package version")
+    if version is not None and (isinstance(version, bool) or not isinstance(version, int)):
+        raise HTTPException(status_code=400, detail="version must be an integer")
+    return version
+
+
 @router.put("/material-packages/{package_id}")
-async def update_material_package(
+def update_material_package(
     package_id: str,
     payload: Dict[str, Any] = Body(default_factory=dict),
+    if_match: str | None = Header(default=None, alias="If-Match"),
     current_user: object = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
@@ -1295,9 +1432,13 @@ async def update_material_package(
         raise HTTPException(status_code=400, detail="status invalid")
     if "is_active" in payload and not isinstance(payload["is_active"], bool):
         raise HTTPException(status_code=400, detail="is_active must be a boolean")
+    # A client that read the package sends its version back, so a write based
+    # on a stale copy (e.g. a full materials blob missing newer assets) is
+    # rejected with 409 instead of overwriting them.
+    expected_version = _expected_version(payload, if_match)
     try:
-        _require_package_manage(db, current_user, package_id)
-        package = package_repo.update_package(db, package_id, payload)
+        _check_package_access(db, current_user, package_id, manage=True)
+        package = package_repo.update_package(db, package_id, payload, expected_version=expected_version)
     except SQLAlchemyError:
         db.rollback()
         raise HTTPException(status_code=500, detail="Database error")
@@ -1316,12 +1457,18 @@ async def generate_storyboard_images(
     force = payload.get("force") is True
     size = payload.get("size")
     model_id = payload.get("model_id")
+    seed = payload.get("seed")
+    bypass_cache = payload.get("bypass_cache", False)
     if size is not None and not isinstance(size, str):
         raise HTTPException(status_code=400, detail="size must be a string")
     if model_id is not None and not isinstance(model_id, str):
         raise HTTPException(status_code=400, detail="model_id must be a string")
+    if seed is not None and (isinstance(seed, bool) or not isinstance(seed, int)):
+        raise HTTPException(status_code=400, detail="seed must be an integer")
+    if not isinstance(bypass_cache, bool):
+        raise HTTPException(status_code=400, detail="bypass_cache must be a boolean")
     try:
-        package = _require_package_manage(db, current_user, package_id)
+        package = await run_in_threadpool(_require_package_manage, db, current_user, package_id)
     except SQLAlchemyError:
         db.rollback()
         raise HTTPException(status_code=500, detail="Database error")
@@ -1472,12 +1619,16 @@ async def generate_storyboard_images(
                     task["ref_images"],
                     size=size,
                     model=resolved_model,
+                    seed=seed,
+                    bypass_cache=bypass_cache,
                 )
             else:
                 image_result = image_service.generate_image(
                     task["prompt"],
                     size=size,
                     model=resolved_model,
+                    seed=seed,
+                    bypass_cache=bypass_cache,
                 )
         except Exception:
             logger.exception(
@@ -1488,18 +1639,18 @@ async def generate_storyboard_images(
         return {"task": task, "image_result": image_result}
 
     if generation_tasks:
-        max_workers = len(generation_tasks)
-        loop = asyncio.get_running_loop()
-        if max_workers <= 1:
-            results = [_generate_storyboard_image(generation_tasks[0])]
-        else:
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                results = await asyncio.gather(
-                    *[
-                        loop.run_in_executor(executor, _generate_storyboard_image, task)
-                        for task in generation_tasks
-                    ]
+        executor = get_provider_executor()
+        provider = image_service.provider_name()
+        results = await asyncio.gather(
+            *[
+                asyncio.wrap_future(
+                    executor.submit(
+                        provider, package_id, _generate_storyboard_image, task
+                    )
                 )
+                for task in generation_tasks
+            ]
+        )
 
         for result in results:
             task = result.get("task") or {}
@@ -1532,23 +1683,17 @@ async def generate_storyboard_images(
             images.append(new_image)
             generated.append(new_image)
 
-    metadata["images"] = images
+    ops = []
     if resolved_model_id:
-        metadata["image_model_id"] = resolved_model_id
+        ops.append(package_repo.set_path(["metadata", "image_model_id"], resolved_model_id))
     if size:
-        metadata["image_size"] = size
-        image_plan = (
-            metadata.get("image_plan")
-            if isinstance(metadata.get("image_plan"), dict)
-            else {}
-        )
-        if isinstance(image_plan, dict):
-            image_plan["size"] = size
-            metadata["image_plan"] = image_plan
-    materials["metadata"] = metadata
+        ops.append(package_repo.set_path(["metadata", "image_size"], size))
+        ops.append(package_repo.set_path(["metadata", "image_plan", "size"], size))
 
     try:
-        package_repo.update_package(db, package_id, {"materials": materials})
+        await run_in_threadpool(
+            _save_generated_assets, db, package_id, "image", generated, ops
+        )
     except SQLAlchemyError:
         db.rollback()
         raise HTTPException(status_code=500, detail="Database error")
@@ -1603,7 +1748,7 @@ async def generate_storyboard_videos(
         )
 
     try:
-        package = _require_package_manage(db, current_user, package_id)
+        package = await run_in_threadpool(_require_package_manage, db, current_user, package_id)
     except SQLAlchemyError:
         db.rollback()
         raise HTTPException(status_code=500, detail="Database error")
@@ -1748,7 +1893,7 @@ async def generate_storyboard_videos(
         prompt_source = "storyboard_video_autogen"
 
         if feedback and llm:
-            prompt = llm.rewrite_prompt(prompt, feedback, prompt_parts)
+            prompt = await run_in_threadpool(llm.rewrite_prompt, prompt, feedback, prompt_parts)
             prompt_source = "user_feedback"
         elif prompt_override:
             prompt_source = "user_edit"
@@ -1756,7 +1901,7 @@ async def generate_storyboard_videos(
         video_result = None
         try:
             model_override = model or resolved_model
-            video_result = video_service.generate_video_from_image(
+            video_result = await video_service.generate_video_from_image_async(
                 prompt, [image_url], size=size, model=model_override
             )
         except Exception:
@@ -1799,13 +1944,14 @@ async def generate_storyboard_videos(
         videos.append(new_video)
         generated.append(new_video)
 
-    metadata["videos"] = videos
+    ops = []
     if resolved_model_id:
-        metadata["video_model_id"] = resolved_model_id
-    materials["metadata"] = metadata
+        ops.append(package_repo.set_path(["metadata", "video_model_id"], resolved_model_id))
 
     try:
-        package_repo.update_package(db, package_id, {"materials": materials})
+        await run_in_threadpool(
+            _save_generated_assets, db, package_id, "video", generated, ops
+        )
     except SQLAlchemyError:
         db.rollback()
         raise HTTPException(status_code=500, detail="Database error")
@@ -1825,7 +1971,7 @@ async def get_storyboard_video_result(
     if not task_id.strip():
         raise HTTPException(status_code=400, detail="task_id required")
     try:
-        package = _require_package_manage(db, current_user, package_id)
+        package = await run_in_threadpool(_require_package_manage, db, current_user, package_id)
     except SQLAlchemyError:
         db.rollback()
         raise HTTPException(status_code=500, detail="Database error")
@@ -1843,28 +1989,30 @@ async def get_storyboard_video_result(
     if not target:
         raise HTTPException(status_code=404, detail="Video task not found")
 
-    task_result = video_service.get_video_task_result(task_id)
+    task_result = await video_service.get_video_task_result_async(task_id)
+    changes = {}
     if task_result.get("task_status"):
-        target["task_status"] = task_result.get("task_status")
+        changes["task_status"] = task_result.get("task_status")
     if task_result.get("video_url"):
-        target["url"] = task_result.get("video_url")
+        changes["url"] = task_result.get("video_url")
     if task_result.get("cover_image_url"):
-        target["cover_image_url"] = task_result.get("cover_image_url")
-
-    metadata["videos"] = videos
-    materials["metadata"] = metadata
+        changes["cover_image_url"] = task_result.get("cover_image_url")
 
-    try:
-        package_repo.update_package(db, package_id, {"materials": materials})
-    except SQLAlchemyError:
-        db.rollback()
-        raise HTTPException(status_code=500, detail="Database error")
+    if changes:
+        try:
+            updated = await run_in_threadpool(
+                asset_repo.update_asset_by_task, db, package_id, "video", task_id, changes
+            )
+        except SQLAlchemyError:
+            db.rollback()
+            raise HTTPException(status_code=500, detail="Database error")
+        target = updated or {**target, **changes}
 
     return ok({"task": task_result, "video": target, "material_package_id": package_id})
 
 
 @router.post("/material-packages/{package_id}/feedback")
-async def regenerate_from_feedback(
+def regenerate_from_feedback(
     package_id: str,
     background_tasks: BackgroundTasks,
     payload: Dict[str, Any] = Body(default_factory=dict),
@@ -1912,7 +2060,7 @@ async def regenerate_from_feedback(
     _emit_todo_list(project_id)
 
     try:
-        items = package_repo.list_packages_for_project(db, project_id)
+        items = package_repo.list_package_summaries(db, project_id)
     except SQLAlchemyError:
         db.rollback()
         publish_generation_event(
@@ -1986,26 +2134,6 @@ async def regenerate_from_feedback(
             previous_summary = _normalize_text(
                 summary_block.get("logline")
             ) or _normalize_text(summary_block.get("synopsis"))
-        previous_art_style = (
-            previous_blueprint.get("art_style")
-            if isinstance(previous_blueprint, dict)
-            else {}
-        )
-        previous_subjects = (
-            previous_blueprint.get("subjects")
-            if isinstance(previous_blueprint, dict)
-            else []
-        )
-        previous_scenes = (
-            previous_blueprint.get("scenes")
-            if isinstance(previous_blueprint, dict)
-            else []
-        )
-        previous_storyboard = (
-            previous_blueprint.get("storyboard")
-            if isinstance(previous_blueprint, dict)
-            else []
-        )
 
         def _stage_delta(section: str):
             def handler(delta: str, _reasoning: str) -> None:
@@ -2015,101 +2143,39 @@ async def regenerate_from_feedback(
 
             return handler
 
-        summary, keywords = llm.generate_summary(
-            str(source_prompt),
-            mode,
-            documents=documents,
-            input_config=input_config,
-            feedback=feedback,
-            previous_summary=previous_summary,
-            on_delta=_stage_delta("summary"),
-        )
-        _emit_todo_update(project_id, "summary", "done")
-        _emit_content_update(project_id, "summary", summary)
-
-        current_step = "art_style"
-        art_style = llm.generate_art_style(
-            summary,
-            str(source_prompt),
-            mode,
-            documents=documents,
-            input_config=input_config,
-            feedback=feedback,
-            previous_art_style=previous_art_style
-            if isinstance(previous_art_style, dict)
-            else {},
-            on_delta=_stage_delta("art_style"),
-        )
-        _emit_todo_update(project_id, "art_style", "done")
-        _emit_content_update(project_id, "art_style", art_style)
-
-        current_step = "package_name"
-        fallback_name = (summary or source_prompt or "素材包").strip()[:10]
-        package_name = fallback_name or "素材包"
-        _emit_content_update(project_id, "package_name", package_name)
-
-        current_step = "characters"
-        subjects = llm.generate_characters(
-            summary,
-            art_style,
-            str(source_prompt),
-            mode,
-            documents=documents,
-            input_config=input_config,
-            feedback=feedback,
-            previous_subjects=previous_subjects
-            if isinstance(previous_subjects, list)
-            else [],
-            on_delta=_stage_delta("characters"),
-        )
-        _emit_todo_update(project_id, "characters", "done")
-        _emit_content_update(project_id, "characters", subjects)
-
-        current_step = "scenes"
-        scenes = llm.generate_scenes(
-            summary,
-            art_style,
-            subjects,
-            str(source_prompt),
-            mode,
-            documents=documents,
-            input_config=input_config,
-            feedback=feedback,
-            previous_scenes=previous_scenes
-            if isinstance(previous_scenes, list)
-            else [],
-            on_delta=_stage_delta("scenes"),
-        )
-        _emit_todo_update(project_id, "scenes", "done")
-        _emit_content_update(project_id, "scenes", scenes)
+        def _stage_done(stage: str, value: Any) -> None:
+            content = value[0] if stage == "summary" else value
+            _emit_todo_update(project_id, stage, "done")
+            _emit_content_update(project_id, stage, content)
+            if stage == "summary":
+                _emit_content_update(
+                    project_id, "package_name", _fallback_package_name(content, source_prompt)
+                )
 
-        current_step = "storyboard"
-        storyboard = llm.generate_storyboard(
-            summary,
-            art_style,
-            subjects,
-            scenes,
-            str(source_prompt),
-            mode,
-            documents=documents,
-            input_config=input_config,
-            feedback=feedback,
-            previous_storyboard=previous_storyboard
-            if isinstance(previous_storyboard, list)
-            else [],
-            on_delta=_stage_delta("storyboard"),
+        def _stage_failed(stage: str, _exc: BaseException) -> None:
+            nonlocal current_step
+            current_step = stage
+
+        # The previous blueprint feeds every stage; art style and characters
+        # then run side by side once the new summary is in.
+        stage_run = run_stage_graph(
+            llm.material_package_stages(
+                str(source_prompt),
+                mode,
+                previous_package={**previous_blueprint, "summary": previous_summary},
+                feedback=feedback,
+                documents=documents,
+                input_config=input_config,
+                stage_delta=_stage_delta,
+            ),
+            llm.provider_name(),
+            package_id,
+            on_done=_stage_done,
+            on_failed=_stage_failed,
         )
-        _emit_todo_update(project_id, "storyboard", "done")
-        _emit_content_update(project_id, "storyboard", storyboard)
-
-        llm_struct = {
-            "summary": summary,
-            "keywords": keywords,
-            "art_style": art_style,
-            "subjects": subjects,
-            "scenes": scenes,
-            "storyboard": storyboard,
-        }
+        current_step = "storyboard"
+        llm_struct = LLMService.material_package_struct(stage_run.results)
+        package_name = _fallback_package_name(llm_struct["summary"], source_prompt)
         blueprint = build_blueprint(llm_struct, source_prompt=str(source_prompt))
 
         image_size = (
@@ -2146,6 +2212,7 @@ async def regenerate_from_feedback(
                 "user_prompt": str(source_prompt),
                 "user_feedback": feedback,
                 "generation_mode": mode,
+                "generation_timing": stage_run.timing(),
                 "image_model_id": resolved_model_id,
                 "input_config": input_config,
                 "input_documents": documents,
@@ -2174,14 +2241,19 @@ async def regenerate_from_feedback(
             {"last_material_package_id": new_package["id"]},
         )
         _emit_text_done(project_id, new_package["id"])
-        background_tasks.add_task(
-            _run_feedback_image_generation,
-            project_id,
-            new_package["id"],
-            blueprint,
-            image_size,
-            resolved_model_id,
-            resolved_model,
+        dispatch_job(
+            db,
+            background_tasks,
+            "material_package.images",
+            {
+                "project_id": project_id,
+                "package_id": new_package["id"],
+                "blueprint": blueprint,
+                "image_size": image_size,
+                "model_id": resolved_model_id,
+                "model": resolved_model,
+            },
+            project_id=project_id,
         )
         current_step = "done"
         return ok(new_package)
@@ -2235,4 +2307,6 @@ async def regenerate_from_feedback(
                     "message": "生成失败",
                 },
             )
+        if isinstance(exc, ProviderUnavailableError):
+            raise
         raise HTTPException(status_code=502, detail="LLM generation failed") from exc
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import logging
 import mimetypes
+import shutil
 from pathlib import Path
 from typing import Any, Dict
 
@@ -107,7 +108,7 @@ def _resolve_music_asset(project_music: list[dict], music_id: str) -> dict | Non
 
 
 @router.get("/library")
-async def list_music_library(
+def list_music_library(
     project_id: str = Query(...),
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
@@ -133,7 +134,7 @@ async def list_music_library(
 
 
 @router.get("/audio/{project_id}/{music_id}")
-async def fetch_music_audio(
+def fetch_music_audio(
     project_id: str,
     music_id: str,
     db: Session = Depends(get_db),
@@ -155,7 +156,7 @@ async def fetch_music_audio(
 
 
 @router.post("/generate")
-async def generate_music(
+def generate_music(
     payload: Dict[str, Any] = Body(default_factory=dict),
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
@@ -200,7 +201,7 @@ async def generate_music(
 
 
 @router.post("/upload")
-async def upload_music(
+def upload_music(
     project_id: str = Form(...),
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
@@ -221,8 +222,8 @@ async def upload_music(
     stored_path = _music_path(project_id, music_id, safe_suffix)
     stored_path.parent.mkdir(parents=True, exist_ok=True)
     try:
-        content = await file.read()
-        stored_path.write_bytes(content)
+        with stored_path.open("wb") as target:
+            shutil.copyfileobj(file.file, target)
     except Exception:
         logger.exception("Failed to save music upload")
         raise HTTPException(status_code=500, detail="File upload failed")
@@ -253,7 +254,7 @@ async def upload_music(
 
 
 @router.post("/storyboard/{package_id}/{shot_id}/apply")
-async def apply_storyboard_music(
+def apply_storyboard_music(
     package_id: str,
     shot_id: str,
     payload: Dict[str, Any] = Body(default_factory=dict),
@@ -318,7 +319,9 @@ async def apply_storyboard_music(
     materials["metadata"] = pkg_meta
 
     try:
-        package_repo.update_package(db, package_id, {"materials": materials})
+        package_repo.update_package(
+            db, package_id, {"materials": materials}, expected_version=package.get("version")
+        )
     except SQLAlchemyError:
         db.rollback()
         raise HTTPException(status_code=500, detail="Database error")
@@ -20,22 +20,36 @@ PROJECT_STAGES = {"input", "generating", "editing", "completed"}
 
 
 @router.get("")
-async def list_projects(
+def list_projects(
     current_user: object = Depends(get_current_user),
     db: Session = Depends(get_db),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: str | None = Query(default=None),
+    include_total: bool = Query(default=True),
 ) -> Dict[str, Any]:
     try:
-        items, total = project_repo.list_projects_for_user(db, current_user, page, page_size)
+        items, total, next_cursor = project_repo.list_projects_for_user(
+            db, current_user, page, page_size, cursor=cursor, include_total=include_total
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="cursor invalid")
     except SQLAlchemyError:
         db.rollback()
         raise HTTPException(status_code=500, detail="Database error")
-    return ok({"list": items, "total": total, "page": page, "page_size": page_size})
+    return ok(
+        {
+            "list": items,
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "next_cursor": next_cursor,
+        }
+    )
 
 
 @router.post("")
-async def create_project(
+def create_project(
     payload: Dict[str, Any] = Body(default_factory=dict),
     current_user: object = Depends(get_current_user),
     db: Session = Depends(get_db),
@@ -75,7 +89,7 @@ async def create_project(
 
 
 @router.get("/{project_id}")
-async def get_project(
+def get_project(
     project_id: str,
     current_user: object = Depends(get_current_user),
     db: Session = Depends(get_db),
@@ -93,7 +107,7 @@ async def get_project(
 
 
 @router.put("/{project_id}")
-async def update_project(
+def update_project(
     project_id: str,
     payload: Dict[str, Any] = Body(default_factory=dict),
     current_user: object = Depends(get_current_user),
@@ -135,7 +149,7 @@ async def update_project(
 
 
 @router.delete("/{project_id}")
-async def delete_project(
+def delete_project(
     project_id: str,
     current_user: object = Depends(get_current_user),
     db: Session = Depends(get_db),
@@ -11,6 +11,7 @@ from app.api.v1.response import ok
 from app.db.models import MaterialPackage
 from app.db.session import get_db
 from app.repositories import material_packages as package_repo
+from app.services.access_control import can_manage_project
 from app.services.feedback_service import FeedbackService
 from app.services.llm_service import LLMService
 from app.services.user_llm_settings import resolve_llm_overrides
@@ -37,8 +38,25 @@ def _build_feedback_service(user: object) -> FeedbackService:
     )
 
 
-def _get_package(db: Session, package_id: str) -> Optional[MaterialPackage]:
-    return db.query(MaterialPackage).filter(MaterialPackage.id == package_id).one_or_none()
+def _get_package(db: Session, user: object, package_id: str) -> Optional[MaterialPackage]:
+    package, access = package_repo.get_package_model_with_access(db, package_id)
+    if package and not can_manage_project(user, access):
+        raise HTTPException(status_code=403, detail="Forbidden")
+    return package
+
+
+def _append_candidate(db: Session, package_id: str, group_path: list[str], candidate: dict) -> None:
+    # Appending in place keeps candidates added concurrently by other requests.
+    path = ["metadata", "text_candidates_v1", *group_path]
+    package_repo.patch_materials(
+        db,
+        package_id,
+        [
+            package_repo.set_path(["metadata", "text_candidates_v1", "version"], "v1"),
+            package_repo.append_path([*path, "candidates"], candidate),
+            package_repo.set_path([*path, "active_id"], candidate["id"]),
+        ],
+    )
 
 
 def _ensure_text_candidates(metadata: dict) -> dict:
@@ -155,7 +173,7 @@ def _resolve_storyboard_description(text_candidates: dict, blueprint: dict, shot
 
 
 @router.post("/art-style/feedback")
-async def art_style_feedback(
+def art_style_feedback(
     payload: Dict[str, Any] = Body(default_factory=dict),
     current_user: object = Depends(get_current_user),
     db: Session = Depends(get_db),
@@ -169,7 +187,7 @@ async def art_style_feedback(
     feedback = feedback.strip()
 
     try:
-        package = _get_package(db, package_id)
+        package = _get_package(db, current_user, package_id)
     except SQLAlchemyError:
         db.rollback()
         raise HTTPException(status_code=500, detail="Database error")
@@ -194,19 +212,9 @@ async def art_style_feedback(
         "value": rewritten,
         "created_at": _utc_now(),
     }
-    group = text_candidates.setdefault("art_style", {"active_id": None, "candidates": []})
-    group_candidates = group.get("candidates")
-    if not isinstance(group_candidates, list):
-        group_candidates = []
-        group["candidates"] = group_candidates
-    group_candidates.append(candidate)
-    group["active_id"] = candidate["id"]
     # NOTE: blueprint_v1 is immutable; store edits in text_candidates_v1 only.
-    metadata["text_candidates_v1"] = text_candidates
-    materials["metadata"] = metadata
-
     try:
-        package_repo.update_package(db, package.id, {"materials": materials})
+        _append_candidate(db, package.id, ["art_style"], candidate)
     except SQLAlchemyError:
         db.rollback()
         raise HTTPException(status_code=500, detail="Database error")
@@ -215,7 +223,7 @@ async def art_style_feedback(
 
 
 @router.post("/summary/feedback")
-async def summary_feedback(
+def summary_feedback(
     payload: Dict[str, Any] = Body(default_factory=dict),
     current_user: object = Depends(get_current_user),
     db: Session = Depends(get_db),
@@ -229,7 +237,7 @@ async def summary_feedback(
     feedback = feedback.strip()
 
     try:
-        package = _get_package(db, package_id)
+        package = _get_package(db, current_user, package_id)
     except SQLAlchemyError:
         db.rollback()
         raise HTTPException(status_code=500, detail="Database error")
@@ -254,18 +262,8 @@ async def summary_feedback(
         "value": {"summary": rewritten},
         "created_at": _utc_now(),
     }
-    group = text_candidates.setdefault("summary", {"active_id": None, "candidates": []})
-    group_candidates = group.get("candidates")
-    if not isinstance(group_candidates, list):
-        group_candidates = []
-        group["candidates"] = group_candidates
-    group_candidates.append(candidate)
-    group["active_id"] = candidate["id"]
-    metadata["text_candidates_v1"] = text_candidates
-    materials["metadata"] = metadata
-
     try:
-        package_repo.update_package(db, package.id, {"materials": materials})
+        _append_candidate(db, package.id, ["summary"], candidate)
     except SQLAlchemyError:
         db.rollback()
         raise HTTPException(status_code=500, detail="Database error")
@@ -274,7 +272,7 @@ async def summary_feedback(
 
 
 @router.post("/subjects/{subject_id}/feedback")
-async def subject_feedback(
+def subject_feedback(
     subject_id: str,
     payload: Dict[str, Any] = Body(default_factory=dict),
     current_user: object = Depends(get_current_user),
@@ -291,7 +289,7 @@ async def subject_feedback(
     feedback = feedback.strip()
 
     try:
-        package = _get_package(db, package_id)
+        package = _get_package(db, current_user, package_id)
     except SQLAlchemyError:
         db.rollback()
         raise HTTPException(status_code=500, detail="Database error")
@@ -320,19 +318,8 @@ async def subject_feedback(
         "value": rewritten,
         "created_at": _utc_now(),
     }
-    group = text_candidates.setdefault("subjects", {})
-    subject_group = group.setdefault(subject_id, {"active_id": None, "candidates": []})
-    group_candidates = subject_group.get("candidates")
-    if not isinstance(group_candidates, list):
-        group_candidates = []
-        subject_group["candidates"] = group_candidates
-    group_candidates.append(candidate)
-    subject_group["active_id"] = candidate["id"]
-    metadata["text_candidates_v1"] = text_candidates
-    materials["metadata"] = metadata
-
     try:
-        package_repo.update_package(db, package.id, {"materials": materials})
+        _append_candidate(db, package.id, ["subjects", subject_id], candidate)
     except SQLAlchemyError:
         db.rollback()
         raise HTTPException(status_code=500, detail="Database error")
@@ -341,7 +328,7 @@ async def subject_feedback(
 
 
 @router.post("/scenes/{scene_id}/feedback")
-async def scene_feedback(
+def scene_feedback(
     scene_id: str,
     payload: Dict[str, Any] = Body(default_factory=dict),
     current_user: object = Depends(get_current_user),
@@ -358,7 +345,7 @@ async def scene_feedback(
     feedback = feedback.strip()
 
     try:
-        package = _get_package(db, package_id)
+        package = _get_package(db, current_user, package_id)
     except SQLAlchemyError:
         db.rollback()
         raise HTTPException(status_code=500, detail="Database error")
@@ -387,19 +374,8 @@ async def scene_feedback(
         "value": rewritten,
         "created_at": _utc_now(),
     }
-    group = text_candidates.setdefault("scenes", {})
-    scene_group = group.setdefault(scene_id, {"active_id": None, "candidates": []})
-    group_candidates = scene_group.get("candidates")
-    if not isinstance(group_candidates, list):
-        group_candidates = []
-        scene_group["candidates"] = group_candidates
-    group_candidates.append(candidate)
-    scene_group["active_id"] = candidate["id"]
-    metadata["text_candidates_v1"] = text_candidates
-    materials["metadata"] = metadata
-
     try:
-        package_repo.update_package(db, package.id, {"materials": materials})
+        _append_candidate(db, package.id, ["scenes", scene_id], candidate)
     except SQLAlchemyError:
         db.rollback()
         raise HTTPException(status_code=500, detail="Database error")
@@ -408,7 +384,7 @@ async def scene_feedback(
 
 
 @router.post("/storyboard/{shot_id}/feedback")
-async def storyboard_feedback(
+def storyboard_feedback(
     shot_id: str,
     payload: Dict[str, Any] = Body(default_factory=dict),
     current_user: object = Depends(get_current_user),
@@ -425,7 +401,7 @@ async def storyboard_feedback(
     feedback = feedback.strip()
 
     try:
-        package = _get_package(db, package_id)
+        package = _get_package(db, current_user, package_id)
     except SQLAlchemyError:
         db.rollback()
         raise HTTPException(status_code=500, detail="Database error")
@@ -454,21 +430,9 @@ async def storyboard_feedback(
         "value": {"description": rewritten},
         "created_at": _utc_now(),
     }
-    group = text_candidates.setdefault("storyboard", {})
-    shot_group = group.setdefault(shot_id, {"active_id": None, "candidates": []})
-    group_candidates = shot_group.get("candidates")
-    if not isinstance(group_candidates, list):
-        group_candidates = []
-        shot_group["candidates"] = group_candidates
-    group_candidates.append(candidate)
-    shot_group["active_id"] = candidate["id"]
-
     # NOTE: blueprint_v1 is immutable; store edits in text_candidates_v1 only.
-    metadata["text_candidates_v1"] = text_candidates
-    materials["metadata"] = metadata
-
     try:
-        package_repo.update_package(db, package.id, {"materials": materials})
+        _append_candidate(db, package.id, ["storyboard", shot_id], candidate)
     except SQLAlchemyError:
         db.rollback()
         raise HTTPException(status_code=500, detail="Database error")
@@ -477,8 +441,9 @@ async def storyboard_feedback(
 
 
 @router.post("/adopt")
-async def adopt_text_candidate(
+def adopt_text_candidate(
     payload: Dict[str, Any] = Body(default_factory=dict),
+    current_user: object = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
     package_id = payload.get("material_package_id")
@@ -495,7 +460,7 @@ async def adopt_text_candidate(
     scene_id = payload.get("scene_id")
 
     try:
-        package = _get_package(db, package_id)
+        package = _get_package(db, current_user, package_id)
     except SQLAlchemyError:
         db.rollback()
         raise HTTPException(status_code=500, detail="Database error")
@@ -512,13 +477,13 @@ async def adopt_text_candidate(
         candidates = group.get("candidates") if isinstance(group.get("candidates"), list) else []
         if not any(isinstance(cand, dict) and cand.get("id") == candidate_id for cand in candidates):
             raise HTTPException(status_code=404, detail="Candidate not found")
-        group["active_id"] = candidate_id
+        group_path = ["art_style"]
     elif target == "summary":
         group = text_candidates.setdefault("summary", {"active_id": None, "candidates": []})
         candidates = group.get("candidates") if isinstance(group.get("candidates"), list) else []
         if not any(isinstance(cand, dict) and cand.get("id") == candidate_id for cand in candidates):
             raise HTTPException(status_code=404, detail="Candidate not found")
-        group["active_id"] = candidate_id
+        group_path = ["summary"]
     elif target == "subject":
         if not isinstance(subject_id, str) or not subject_id.strip():
             raise HTTPException(status_code=400, detail="subject_id required")
@@ -529,7 +494,7 @@ async def adopt_text_candidate(
         candidates = subject_group.get("candidates") if isinstance(subject_group.get("candidates"), list) else []
         if not any(isinstance(cand, dict) and cand.get("id") == candidate_id for cand in candidates):
             raise HTTPException(status_code=404, detail="Candidate not found")
-        subject_group["active_id"] = candidate_id
+        group_path = ["subjects", subject_id]
     elif target == "scene":
         if not isinstance(scene_id, str) or not scene_id.strip():
             raise HTTPException(status_code=400, detail="scene_id required")
@@ -540,7 +505,7 @@ async def adopt_text_candidate(
         candidates = scene_group.get("candidates") if isinstance(scene_group.get("candidates"), list) else []
         if not any(isinstance(cand, dict) and cand.get("id") == candidate_id for cand in candidates):
             raise HTTPException(status_code=404, detail="Candidate not found")
-        scene_group["active_id"] = candidate_id
+        group_path = ["scenes", scene_id]
     elif target == "storyboard_description":
         if not isinstance(shot_id, str) or not shot_id.strip():
             raise HTTPException(status_code=400, detail="shot_id required")
@@ -551,16 +516,19 @@ async def adopt_text_candidate(
         candidates = shot_group.get("candidates") if isinstance(shot_group.get("candidates"), list) else []
         if not any(isinstance(cand, dict) and cand.get("id") == candidate_id for cand in candidates):
             raise HTTPException(status_code=404, detail="Candidate not found")
-        shot_group["active_id"] = candidate_id
+        group_path = ["storyboard", shot_id]
     else:
         raise HTTPException(status_code=400, detail="target_type invalid")
 
     # NOTE: blueprint_v1 is immutable; store edits in text_candidates_v1 only.
-    metadata["text_candidates_v1"] = text_candidates
-    materials["metadata"] = metadata
-
+    # Candidates are only ever appended, so the one validated above is still
+    # there and only active_id needs writing.
     try:
-        package_repo.update_package(db, package.id, {"materials": materials})
+        package_repo.patch_materials(
+            db,
+            package.id,
+            [package_repo.set_path(["metadata", "text_candidates_v1", *group_path, "active_id"], candidate_id)],
+        )
     except SQLAlchemyError:
         db.rollback()
         raise HTTPException(status_code=500, detail="Database error")
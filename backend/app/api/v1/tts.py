@@ -12,6 +12,7 @@ from sqlalchemy.orm import Session
 from app.api.v1.response import ok
 from app.db.session import get_db
 from app.repositories import material_packages as package_repo
+from app.repositories import package_assets as asset_repo
 from app.repositories import projects as project_repo
 from app.services.tts_service import synthesize_silent_wav
 from app.store import new_id, utc_now
@@ -61,12 +62,12 @@ def _audio_file_path(project_id: str, audio_id: str) -> Path:
 
 
 @router.get("/voices")
-async def list_voices() -> Dict[str, Any]:
+def list_voices() -> Dict[str, Any]:
     return ok({"list": VOICE_LIBRARY})
 
 
 @router.get("/audio/{project_id}/{audio_id}")
-async def fetch_audio(project_id: str, audio_id: str, db: Session = Depends(get_db)) -> FileResponse:
+def fetch_audio(project_id: str, audio_id: str, db: Session = Depends(get_db)) -> FileResponse:
     if not project_id.strip() or not audio_id.strip():
         raise HTTPException(status_code=400, detail="project_id and audio_id required")
     try:
@@ -81,7 +82,7 @@ async def fetch_audio(project_id: str, audio_id: str, db: Session = Depends(get_
 
 
 @router.post("/preview")
-async def preview_tts(
+def preview_tts(
     payload: Dict[str, Any] = Body(default_factory=dict),
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
@@ -130,7 +131,7 @@ async def preview_tts(
 
 
 @router.post("/storyboard/{package_id}/{shot_id}")
-async def generate_storyboard_audio(
+def generate_storyboard_audio(
     package_id: str,
     shot_id: str,
     payload: Dict[str, Any] = Body(default_factory=dict),
@@ -173,14 +174,6 @@ async def generate_storyboard_audio(
     output_path = _audio_file_path(project_id, audio_id)
     duration_sec = synthesize_silent_wav(text, float(speed), output_path)
 
-    materials = package.get("materials") if isinstance(package.get("materials"), dict) else {}
-    metadata = materials.get("metadata") if isinstance(materials.get("metadata"), dict) else {}
-    audios = metadata.get("audios") if isinstance(metadata.get("audios"), list) else []
-    audios = [audio for audio in audios if isinstance(audio, dict)]
-    for audio in audios:
-        if audio.get("type") == "storyboard_audio" and audio.get("shot_id") == shot_id:
-            audio["is_active"] = False
-
     audio_item = {
         "id": audio_id,
         "type": "storyboard_audio",
@@ -196,12 +189,8 @@ async def generate_storyboard_audio(
         "is_active": True,
         "created_at": utc_now(),
     }
-    audios.append(audio_item)
-    metadata["audios"] = audios
-    materials["metadata"] = metadata
-
     try:
-        package_repo.update_package(db, package_id, {"materials": materials})
+        asset_repo.add_active_asset(db, package_id, "audio", audio_item)
     except SQLAlchemyError:
         db.rollback()
         raise HTTPException(status_code=500, detail="Database error")
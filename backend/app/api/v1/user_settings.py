@@ -43,7 +43,7 @@ def _guess_extension(filename: str, content_type: str | None) -> str:
 
 
 @router.get("/me/llm-settings")
-async def get_llm_settings(
+def get_llm_settings(
     current_user: object = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
@@ -59,7 +59,7 @@ async def get_llm_settings(
 
 
 @router.get("/me/profile")
-async def get_profile(
+def get_profile(
     current_user: object = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
@@ -77,7 +77,7 @@ async def get_profile(
 
 
 @router.put("/me/profile")
-async def update_profile(
+def update_profile(
     payload: Dict[str, Any] = Body(default_factory=dict),
     current_user: object = Depends(get_current_user),
     db: Session = Depends(get_db),
@@ -105,7 +105,7 @@ async def update_profile(
 
 
 @router.post("/me/avatar")
-async def upload_avatar(
+def upload_avatar(
     file: UploadFile = File(...),
     current_user: object = Depends(get_current_user),
     db: Session = Depends(get_db),
@@ -137,7 +137,7 @@ async def upload_avatar(
 
 
 @router.get("/avatar/{user_id}/{filename}")
-async def get_avatar(
+def get_avatar(
     user_id: str,
     filename: str,
 ) -> FileResponse:
@@ -149,7 +149,7 @@ async def get_avatar(
 
 
 @router.put("/{user_id}/profile")
-async def update_user_profile_by_admin(
+def update_user_profile_by_admin(
     user_id: str,
     payload: Dict[str, Any] = Body(default_factory=dict),
     current_user: object = Depends(require_platform_admin),
@@ -175,7 +175,7 @@ async def update_user_profile_by_admin(
 
 
 @router.post("/{user_id}/avatar")
-async def upload_avatar_by_admin(
+def upload_avatar_by_admin(
     user_id: str,
     file: UploadFile = File(...),
     current_user: object = Depends(require_platform_admin),
@@ -208,7 +208,7 @@ async def upload_avatar_by_admin(
 
 
 @router.put("/me/llm-settings")
-async def update_llm_settings(
+def update_llm_settings(
     payload: Dict[str, Any] = Body(default_factory=dict),
     current_user: object = Depends(get_current_user),
     db: Session = Depends(get_db),
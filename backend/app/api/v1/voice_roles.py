@@ -16,7 +16,7 @@ logger = logging.getLogger(__name__)
 
 
 @router.get("")
-async def list_voice_roles(
+def list_voice_roles(
     project_id: str = Query(...),
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
@@ -38,7 +38,7 @@ async def list_voice_roles(
 
 
 @router.post("")
-async def create_voice_role(
+def create_voice_role(
     payload: Dict[str, Any] = Body(default_factory=dict),
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
@@ -87,7 +87,7 @@ async def create_voice_role(
 
 
 @router.put("/{role_id}")
-async def update_voice_role(
+def update_voice_role(
     role_id: str,
     payload: Dict[str, Any] = Body(default_factory=dict),
     db: Session = Depends(get_db),
@@ -22,6 +22,38 @@ def require_api_key(value: str, env_name: str) -> str:
     return value
 
 
+def parse_int_map(value: str) -> dict[str, int]:
+    result: dict[str, int] = {}
+    for item in (value or "").split(","):
+        key, sep, raw = item.partition("=")
+        key = normalize_provider(key)
+        if not key or not sep:
+            continue
+        try:
+            result[key] = int(raw.strip())
+        except ValueError:
+            continue
+    return result
+
+
+def parse_float_map(value: str) -> dict[str, float]:
+    result: dict[str, float] = {}
+    for item in (value or "").split(","):
+        key, sep, raw = item.partition("=")
+        key = normalize_provider(key)
+        if not key or not sep:
+            continue
+        try:
+            result[key] = float(raw.strip())
+        except ValueError:
+            continue
+    return result
+
+
+def env_flag(name: str, default: str = "false") -> bool:
+    return normalize_provider(os.getenv(name, default)) in {"1", "true", "yes", "on"}
+
+
 @dataclass(frozen=True)
 class Settings:
     app_name: str = "ZFlow API"
@@ -54,6 +86,50 @@ class Settings:
     sora_api_key: str = os.getenv("SORA_API_KEY", "")
     image_model_allowlist: str = os.getenv("IMAGE_MODEL_ALLOWLIST", "")
     video_model_allowlist: str = os.getenv("VIDEO_MODEL_ALLOWLIST", "")
+    provider_executor_max_workers: int = int(os.getenv("PROVIDER_EXECUTOR_MAX_WORKERS", "16"))
+    provider_concurrency: str = os.getenv("PROVIDER_CONCURRENCY", "seedream=8,vidu=4,glm=8,mock=16")
+    provider_rate_limits: str = os.getenv("PROVIDER_RATE_LIMITS", "glm=5,seedream=4,vidu=1")
+    provider_rate_burst: str = os.getenv("PROVIDER_RATE_BURST", "glm=5,seedream=8,vidu=2")
+    provider_key_concurrency: str = os.getenv("PROVIDER_KEY_CONCURRENCY", "glm=8,seedream=8,vidu=4")
+    provider_rate_max_wait_seconds: float = float(os.getenv("PROVIDER_RATE_MAX_WAIT_SECONDS", "120"))
+    circuit_breaker_failure_threshold: int = int(os.getenv("CIRCUIT_BREAKER_FAILURE_THRESHOLD", "5"))
+    circuit_breaker_open_seconds: float = float(os.getenv("CIRCUIT_BREAKER_OPEN_SECONDS", "30"))
+    circuit_breaker_half_open_probes: int = int(os.getenv("CIRCUIT_BREAKER_HALF_OPEN_PROBES", "1"))
+    circuit_breaker_slow_call_ms: str = os.getenv("CIRCUIT_BREAKER_SLOW_CALL_MS", "glm=90000,seedream=45000,vidu=20000")
+    http2_providers: str = os.getenv("HTTP2_PROVIDERS", "")
+    http_pool_max_connections: str = os.getenv("HTTP_POOL_MAX_CONNECTIONS", "glm=20,seedream=20,vidu=10,download=10")
+    http_keepalive_expiry_seconds: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "30"))
+    job_execution_mode: str = os.getenv("JOB_EXECUTION_MODE", "inline")
+    job_visibility_timeout_seconds: int = int(os.getenv("JOB_VISIBILITY_TIMEOUT_SECONDS", "120"))
+    job_max_attempts: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    job_retry_delay_seconds: int = int(os.getenv("JOB_RETRY_DELAY_SECONDS", "15"))
+    event_bus_backend: str = os.getenv("EVENT_BUS_BACKEND", "memory")
+    event_bus_retention_seconds: int = int(os.getenv("EVENT_BUS_RETENTION_SECONDS", "900"))
+    sse_delta_flush_ms: str = os.getenv("SSE_DELTA_FLUSH_MS", "package.text=50")
+    sse_delta_flush_chars: str = os.getenv("SSE_DELTA_FLUSH_CHARS", "package.text=512")
+    sse_subscriber_queue_size: int = int(os.getenv("SSE_SUBSCRIBER_QUEUE_SIZE", "100"))
+    sse_overflow_policy: str = os.getenv("SSE_OVERFLOW_POLICY", "drop_oldest")
+    session_backend: str = os.getenv("SESSION_BACKEND", "db")
+    session_secret: str = os.getenv("SESSION_SECRET", "")
+    session_ttl_seconds: int = int(os.getenv("SESSION_TTL_SECONDS", "86400"))
+    session_refresh_ttl_seconds: int = int(os.getenv("SESSION_REFRESH_TTL_SECONDS", "2592000"))
+    session_cache_size: int = int(os.getenv("SESSION_CACHE_SIZE", "1024"))
+    session_cache_ttl_seconds: int = int(os.getenv("SESSION_CACHE_TTL_SECONDS", "30"))
+    project_count_cache_seconds: int = int(os.getenv("PROJECT_COUNT_CACHE_SECONDS", "30"))
+    task_retention_seconds: int = int(os.getenv("TASK_RETENTION_SECONDS", "604800"))
+    asset_write_flush_ms: int = int(os.getenv("ASSET_WRITE_FLUSH_MS", "250"))
+    asset_write_batch_size: int = int(os.getenv("ASSET_WRITE_BATCH_SIZE", "8"))
+    image_cache_enabled: bool = env_flag("IMAGE_CACHE_ENABLED")
+    image_cache_dir: str = os.getenv("IMAGE_CACHE_DIR", "")
+    image_cache_ttl_seconds: int = int(os.getenv("IMAGE_CACHE_TTL_SECONDS", "43200"))
+    image_cache_max_bytes: int = int(os.getenv("IMAGE_CACHE_MAX_BYTES", "67108864"))
+    llm_cache_backend: str = os.getenv("LLM_CACHE_BACKEND", "memory")
+    llm_cache_path: str = os.getenv("LLM_CACHE_PATH", "")
+    llm_cache_ttl_seconds: int = int(os.getenv("LLM_CACHE_TTL_SECONDS", "600"))
+    llm_cache_max_entries: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+    llm_cache_nonzero_temperature: bool = env_flag("LLM_CACHE_NONZERO_TEMPERATURE")
+    loop_lag_monitor: bool = env_flag("LOOP_LAG_MONITOR")
+    loop_lag_threshold_ms: float = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "50"))
 
 
 settings = Settings()
@@ -0,0 +1,82 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+from fastapi import FastAPI
+
+from app.core import metrics
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_in_flight: dict[int, tuple[str, float]] = {}
+_recent: deque[tuple[str, float, float]] = deque(maxlen=50)
+
+
+class InFlightRequestMiddleware:
+    # Tracks which requests are on the loop so a lag report can name the
+    # handler that was most likely blocking it.
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        key = id(scope)
+        _in_flight[key] = (f"{scope.get('method')} {scope.get('path')}", time.monotonic())
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            label, started = _in_flight.pop(key)
+            _recent.append((label, started, time.monotonic()))
+
+
+def _describe_requests(window_start: float, now: float) -> str:
+    # A blocking handler often finishes before the watcher gets to run, so
+    # requests that ended inside the lag window count as suspects too.
+    items = [(label, started, now) for label, started in list(_in_flight.values())]
+    items.extend(item for item in list(_recent) if item[2] >= window_start)
+    items.sort(key=lambda item: item[1])
+    return ", ".join(f"{label} ({(ended - started) * 1000:.0f}ms)" for label, started, ended in items[:5])
+
+
+async def _watch_loop(interval: float, threshold_ms: float) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        window_start = time.monotonic()
+        await asyncio.sleep(interval)
+        lag_ms = (loop.time() - started - interval) * 1000
+        metrics.observe("event_loop.lag_ms", lag_ms)
+        if lag_ms > threshold_ms:
+            logger.warning(
+                "event loop blocked for %.0fms requests=[%s]",
+                lag_ms,
+                _describe_requests(window_start, time.monotonic()),
+            )
+
+
+def install_loop_monitor(app: FastAPI) -> None:
+    if not settings.loop_lag_monitor:
+        return
+    threshold_ms = settings.loop_lag_threshold_ms
+    app.add_middleware(InFlightRequestMiddleware)
+    state: dict[str, asyncio.Task] = {}
+
+    @app.on_event("startup")
+    async def start_loop_monitor() -> None:
+        loop = asyncio.get_running_loop()
+        # asyncio's debug mode names the exact callback or coroutine step that
+        # ran longer than slow_callback_duration.
+        loop.set_debug(True)
+        loop.slow_callback_duration = threshold_ms / 1000
+        state["task"] = loop.create_task(_watch_loop(threshold_ms / 1000, threshold_ms))
+        logger.info("event loop lag monitor enabled threshold_ms=%.0f", threshold_ms)
+
+    @app.on_event("shutdown")
+    async def stop_loop_monitor() -> None:
+        task = state.pop("task", None)
+        if task:
+            task.cancel()
@@ -0,0 +1,48 @@
+import threading
+from typing import Any
+
+_lock = threading.Lock()
+_counters: dict[str, float] = {}
+_gauges: dict[str, float] = {}
+_timings: dict[str, dict[str, float]] = {}
+
+
+def _key(name: str, labels: dict[str, Any]) -> str:
+    if not labels:
+        return name
+    parts = ",".join(f"{key}={labels[key]}" for key in sorted(labels))
+    return f"{name}{{{parts}}}"
+
+
+def increment(name: str, value: float = 1, **labels: Any) -> None:
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def set_gauge(name: str, value: float, **labels: Any) -> None:
+    key = _key(name, labels)
+    with _lock:
+        _gauges[key] = value
+
+
+def observe(name: str, value: float, **labels: Any) -> None:
+    key = _key(name, labels)
+    with _lock:
+        timing = _timings.get(key)
+        if timing is None:
+            timing = {"count": 0, "sum": 0.0, "max": 0.0}
+            _timings[key] = timing
+        timing["count"] += 1
+        timing["sum"] += value
+        if value > timing["max"]:
+            timing["max"] = value
+
+
+def snapshot() -> dict[str, Any]:
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "gauges": dict(_gauges),
+            "timings": {key: dict(value) for key, value in _timings.items()},
+        }
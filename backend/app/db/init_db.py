@@ -8,6 +8,7 @@ load_dotenv()
 from app.db.base import Base
 from app.db.session import engine
 from app.db import models  # noqa: F401
+from app.db.migrations import run_migrations
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
 logger = logging.getLogger("init_db")
@@ -16,6 +17,7 @@ logger = logging.getLogger("init_db")
 def init_db():
     logger.info("Creating database tables...")
     Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
     logger.info("Done.")
 
 
@@ -0,0 +1,81 @@
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from app.db.base import Base
+
+logger = logging.getLogger(__name__)
+
+# create_all only creates missing tables, so columns added to existing tables
+# are listed here as (table, column, DDL type). Every entry must be additive.
+COLUMN_MIGRATIONS: list[tuple[str, str, str]] = [
+    ("material_packages", "version", "INTEGER NOT NULL DEFAULT 1"),
+    ("material_packages", "package_version", "INTEGER"),
+]
+
+# Applies a list of {"op": "set"|"append", "path": [...], "value": ...} patches
+# to a jsonb document, creating missing parent objects on the way. Used by
+# material_packages.patch_materials.
+JSONB_PATCH_FUNCTION = """
+CREATE OR REPLACE FUNCTION zflow_jsonb_patch(doc jsonb, ops jsonb) RETURNS jsonb
+LANGUAGE plpgsql IMMUTABLE AS $$
+DECLARE
+    op jsonb;
+    path text[];
+    depth int;
+    current jsonb;
+BEGIN
+    IF jsonb_typeof(doc) IS DISTINCT FROM 'object' THEN
+        doc := '{}'::jsonb;
+    END IF;
+    FOR op IN SELECT value FROM jsonb_array_elements(ops) LOOP
+        path := ARRAY(SELECT jsonb_array_elements_text(op->'path'));
+        FOR depth IN 1 .. array_length(path, 1) - 1 LOOP
+            IF jsonb_typeof(doc #> path[1:depth]) IS DISTINCT FROM 'object' THEN
+                doc := jsonb_set(doc, path[1:depth], '{}'::jsonb, true);
+            END IF;
+        END LOOP;
+        IF op->>'op' = 'append' THEN
+            current := doc #> path;
+            IF jsonb_typeof(current) IS DISTINCT FROM 'array' THEN
+                current := '[]'::jsonb;
+            END IF;
+            doc := jsonb_set(doc, path, current || jsonb_build_array(op->'value'), true);
+        ELSE
+            doc := jsonb_set(doc, path, op->'value', true);
+        END IF;
+    END LOOP;
+    RETURN doc;
+END;
+$$
+"""
+
+
+def run_migrations(engine: Engine) -> None:
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    columns: dict[str, set[str]] = {}
+    with engine.begin() as conn:
+        for table, column, ddl in COLUMN_MIGRATIONS:
+            if table not in tables:
+                continue
+            if table not in columns:
+                columns[table] = {item["name"] for item in inspector.get_columns(table)}
+            if column in columns[table]:
+                continue
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+            columns[table].add(column)
+            logger.info("Added column %s.%s", table, column)
+        # Same for indexes declared on tables that already existed.
+        for table in Base.metadata.sorted_tables:
+            if table.name not in tables or not table.indexes:
+                continue
+            existing = {item["name"] for item in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in existing:
+                    continue
+                index.create(conn)
+                logger.info("Created index %s", index.name)
+        if engine.dialect.name == "postgresql":
+            conn.exec_driver_sql(JSONB_PATCH_FUNCTION)
@@ -1,7 +1,7 @@
 from datetime import datetime, timezone
 from typing import Any
 
-from sqlalchemy import JSON, Boolean, Column, DateTime, Float, ForeignKey, Integer, String, Text
+from sqlalchemy import JSON, BigInteger, Boolean, Column, DateTime, Float, ForeignKey, Index, Integer, String, Text
 
 from app.db.base import Base
 
@@ -31,6 +31,13 @@ class Project(Base):
     created_at = Column(DateTime(timezone=True), nullable=False, default=utc_now)
     updated_at = Column(DateTime(timezone=True), nullable=False, default=utc_now)
 
+    # Project listings are keyset-paginated on (created_at, id).
+    __table_args__ = (
+        Index("ix_projects_created_at_id", "created_at", "id"),
+        Index("ix_projects_owner_created_at_id", "owner_user_id", "created_at", "id"),
+        Index("ix_projects_company_visibility_created_at_id", "company_id", "visibility", "created_at", "id"),
+    )
+
 
 class MaterialPackage(Base):
     __tablename__ = "material_packages"
@@ -43,10 +50,42 @@ class MaterialPackage(Base):
     is_active = Column(Boolean, nullable=False, default=True)
     summary = Column(Text, nullable=True)
     materials = Column(JSON, nullable=False, default=dict)
+    version = Column(Integer, nullable=False, default=1)
+    # Copy of materials.metadata.package_version (0 when unset) so listings can
+    # skip the blob; NULL until a legacy row is first listed.
+    package_version = Column(Integer, nullable=True)
     generated_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), nullable=False, default=utc_now)
     updated_at = Column(DateTime(timezone=True), nullable=False, default=utc_now)
 
+    # Every ORM update checks and bumps the version, so a stale read-modify-write
+    # fails instead of silently overwriting a concurrent change.
+    __mapper_args__ = {"version_id_col": version}
+
+
+PACKAGE_ASSET_KEYS = {"image": "images", "video": "videos", "audio": "audios"}
+
+
+class PackageAsset(Base):
+    __tablename__ = "package_assets"
+    __table_args__ = (
+        Index("ix_package_assets_package_type_shot", "package_id", "asset_type", "shot_id"),
+        Index("ix_package_assets_package_type_position", "package_id", "asset_type", "position"),
+    )
+
+    id = Column(String(36), primary_key=True)
+    package_id = Column(String(36), ForeignKey("material_packages.id"), nullable=False)
+    asset_type = Column(String(20), nullable=False)
+    asset_id = Column(String(128), nullable=False, index=True)
+    kind = Column(String(64), nullable=True)
+    shot_id = Column(String(128), nullable=True)
+    is_active = Column(Boolean, nullable=True, index=True)
+    task_id = Column(String(128), nullable=True, index=True)
+    position = Column(Integer, nullable=False, default=0)
+    data = Column(JSON, nullable=False, default=dict)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=utc_now)
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=utc_now)
+
 
 class VoiceRole(Base):
     __tablename__ = "voice_roles"
@@ -92,6 +131,104 @@ class UserAccount(Base):
     updated_at = Column(DateTime(timezone=True), nullable=False, default=utc_now)
 
 
+class AuthSession(Base):
+    __tablename__ = "auth_sessions"
+
+    # Tokens are stored as SHA-256 hashes; the raw values only exist client side.
+    id = Column(String(36), primary_key=True)
+    token_hash = Column(String(64), nullable=False, unique=True, index=True)
+    refresh_token_hash = Column(String(64), nullable=False, unique=True, index=True)
+    user_id = Column(String(36), nullable=False, index=True)
+    current_space = Column(JSON, nullable=False, default=dict)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    refresh_expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=utc_now)
+    refreshed_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class RevokedSessionToken(Base):
+    __tablename__ = "revoked_session_tokens"
+
+    # Token ids of signed sessions that were logged out or rotated; rows can go
+    # once the tokens they name have expired.
+    jti = Column(String(32), primary_key=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    revoked_at = Column(DateTime(timezone=True), nullable=False, default=utc_now)
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (Index("ix_jobs_status_available_at", "status", "available_at"),)
+
+    id = Column(String(36), primary_key=True, index=True)
+    kind = Column(String(64), nullable=False)
+    status = Column(String(20), nullable=False, default="queued")
+    project_id = Column(String(36), nullable=True, index=True)
+    payload = Column(JSON, nullable=False, default=dict)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    available_at = Column(DateTime(timezone=True), nullable=False, default=utc_now)
+    lease_owner = Column(String(120), nullable=True)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=utc_now)
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=utc_now)
+
+
+class GenerationTask(Base):
+    __tablename__ = "generation_tasks"
+    __table_args__ = (Index("ix_generation_tasks_project_created_at", "project_id", "created_at"),)
+
+    id = Column(String(36), primary_key=True, index=True)
+    project_id = Column(String(36), nullable=False)
+    status = Column(String(20), nullable=False, default="pending")
+    progress = Column(Integer, nullable=False, default=0)
+    material_package_id = Column(String(36), nullable=True)
+    trace_id = Column(String(64), nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=utc_now)
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=utc_now, index=True)
+
+
+class ExportTask(Base):
+    __tablename__ = "export_tasks"
+
+    id = Column(String(36), primary_key=True, index=True)
+    project_id = Column(String(36), nullable=False, index=True)
+    status = Column(String(20), nullable=False, default="pending")
+    progress = Column(Integer, nullable=False, default=0)
+    export_config = Column(JSON, nullable=False, default=dict)
+    estimated_minutes = Column(Integer, nullable=True)
+    file_id = Column(String(36), nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=utc_now)
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=utc_now, index=True)
+
+
+class ExportFile(Base):
+    __tablename__ = "export_files"
+    __table_args__ = (Index("ix_export_files_project_created_at", "project_id", "created_at"),)
+
+    id = Column(String(36), primary_key=True, index=True)
+    project_id = Column(String(36), nullable=False)
+    task_id = Column(String(36), nullable=True)
+    format = Column(String(20), nullable=True)
+    resolution = Column(String(20), nullable=True)
+    aspect_ratio = Column(String(20), nullable=True)
+    url = Column(String(500), nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=utc_now)
+
+
+class BusEvent(Base):
+    __tablename__ = "bus_events"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    channel = Column(String(64), nullable=False)
+    key = Column(String(64), nullable=False)
+    payload = Column(JSON, nullable=False, default=dict)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=utc_now, index=True)
+
+
 def to_project_dict(project: Project) -> dict[str, Any]:
     return {
         "id": project.id,
@@ -115,7 +252,58 @@ def to_project_dict(project: Project) -> dict[str, Any]:
     }
 
 
-def to_material_package_dict(package: MaterialPackage) -> dict[str, Any]:
+def to_project_access_dict(
+    project_id: str, owner_user_id: str | None, company_id: str | None, visibility: str | None
+) -> dict[str, Any]:
+    """The project fields can_access_project and can_manage_project read."""
+    return {
+        "id": project_id,
+        "owner_user_id": owner_user_id,
+        "company_id": company_id,
+        "visibility": visibility,
+    }
+
+
+def to_project_list_dict(project: Project) -> dict[str, Any]:
+    """Project fields returned by listings; skips the large JSON columns."""
+    return {
+        "id": project.id,
+        "user_id": getattr(project, "user_id", None),
+        "team_space_id": project.team_space_id,
+        "owner_user_id": project.owner_user_id,
+        "company_id": project.company_id,
+        "visibility": project.visibility,
+        "name": project.name,
+        "description": project.description,
+        "status": project.status,
+        "stage": project.stage,
+        "progress": project.progress,
+        "tags": project.tags or [],
+        "thumbnail_url": project.thumbnail_url,
+        "last_material_package_id": project.last_material_package_id,
+        "created_at": project.created_at.isoformat() if project.created_at else None,
+        "updated_at": project.updated_at.isoformat() if project.updated_at else None,
+    }
+
+
+def merge_package_assets(materials: dict[str, Any], assets: dict[str, list[dict]]) -> dict[str, Any]:
+    metadata = materials.get("metadata")
+    if not isinstance(metadata, dict) and not any(assets.values()):
+        return materials
+    metadata = dict(metadata) if isinstance(metadata, dict) else {}
+    for asset_type, key in PACKAGE_ASSET_KEYS.items():
+        items = assets.get(asset_type)
+        if items or key not in metadata:
+            metadata[key] = list(items or [])
+    return {**materials, "metadata": metadata}
+
+
+def to_material_package_dict(
+    package: MaterialPackage, assets: dict[str, list[dict]] | None = None
+) -> dict[str, Any]:
+    materials = package.materials or {}
+    if assets is not None:
+        materials = merge_package_assets(materials, assets)
     return {
         "id": package.id,
         "project_id": package.project_id,
@@ -124,7 +312,29 @@ def to_material_package_dict(package: MaterialPackage) -> dict[str, Any]:
         "status": package.status,
         "is_active": package.is_active,
         "summary": package.summary,
-        "materials": package.materials or {},
+        "materials": materials,
+        "version": package.version,
+        "generated_at": package.generated_at.isoformat() if package.generated_at else None,
+        "created_at": package.created_at.isoformat() if package.created_at else None,
+        "updated_at": package.updated_at.isoformat() if package.updated_at else None,
+    }
+
+
+def to_material_package_summary_dict(
+    package: MaterialPackage, counts: dict[str, int], thumbnail_url: str | None
+) -> dict[str, Any]:
+    return {
+        "id": package.id,
+        "project_id": package.project_id,
+        "parent_id": package.parent_id,
+        "package_name": package.package_name,
+        "status": package.status,
+        "is_active": package.is_active,
+        "summary": package.summary,
+        "version": package.version,
+        "package_version": package.package_version or None,
+        "counts": counts,
+        "thumbnail_url": thumbnail_url,
         "generated_at": package.generated_at.isoformat() if package.generated_at else None,
         "created_at": package.created_at.isoformat() if package.created_at else None,
         "updated_at": package.updated_at.isoformat() if package.updated_at else None,
@@ -170,3 +380,62 @@ def to_company_dict(company: Company) -> dict[str, Any]:
         "created_at": company.created_at.isoformat() if company.created_at else None,
         "updated_at": company.updated_at.isoformat() if company.updated_at else None,
     }
+
+
+def to_job_dict(job: Job) -> dict[str, Any]:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "project_id": job.project_id,
+        "payload": job.payload or {},
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "available_at": job.available_at.isoformat() if job.available_at else None,
+        "lease_owner": job.lease_owner,
+        "lease_expires_at": job.lease_expires_at.isoformat() if job.lease_expires_at else None,
+        "heartbeat_at": job.heartbeat_at.isoformat() if job.heartbeat_at else None,
+        "last_error": job.last_error,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+    }
+
+
+def to_generation_task_dict(task: GenerationTask) -> dict[str, Any]:
+    return {
+        "id": task.id,
+        "project_id": task.project_id,
+        "status": task.status,
+        "progress": task.progress,
+        "material_package_id": task.material_package_id,
+        "created_at": task.created_at.isoformat() if task.created_at else None,
+        "updated_at": task.updated_at.isoformat() if task.updated_at else None,
+    }
+
+
+def to_export_task_dict(task: ExportTask) -> dict[str, Any]:
+    return {
+        "id": task.id,
+        "project_id": task.project_id,
+        "status": task.status,
+        "progress": task.progress,
+        "export_config": task.export_config or {},
+        "estimated_minutes": task.estimated_minutes,
+        "file_id": task.file_id,
+        "created_at": task.created_at.isoformat() if task.created_at else None,
+        "updated_at": task.updated_at.isoformat() if task.updated_at else None,
+    }
+
+
+def to_export_file_dict(export_file: ExportFile) -> dict[str, Any]:
+    return {
+        "id": export_file.id,
+        "project_id": export_file.project_id,
+        "task_id": export_file.task_id,
+        "format": export_file.format,
+        "resolution": export_file.resolution,
+        "aspect_ratio": export_file.aspect_ratio,
+        "url": export_file.url,
+        "created_at": export_file.created_at.isoformat() if export_file.created_at else None,
+    }
@@ -0,0 +1,34 @@
+from typing import Any, Awaitable, Callable, Hashable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+_CACHE_KEY = "request_cache"
+
+
+def cached(db: Session, key: Hashable, load: Callable[[], Any]) -> Any:
+    """Return ``load()`` once per session and reuse it for later lookups.
+
+    API sessions live for exactly one request (see ``get_db``), so this is a
+    request-scoped cache. Only use it for data a request does not change, such
+    as the identity and access fields checked before a handler runs.
+    """
+    cache = db.info.setdefault(_CACHE_KEY, {})
+    if key in cache:
+        return cache[key]
+    value = load()
+    cache[key] = value
+    return value
+
+
+async def cached_async(db: AsyncSession, key: Hashable, load: Callable[[], Awaitable[Any]]) -> Any:
+    cache = db.info.setdefault(_CACHE_KEY, {})
+    if key in cache:
+        return cache[key]
+    value = await load()
+    cache[key] = value
+    return value
+
+
+def remember(db: Session | AsyncSession, key: Hashable, value: Any) -> None:
+    db.info.setdefault(_CACHE_KEY, {})[key] = value
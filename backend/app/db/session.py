@@ -1,16 +1,72 @@
 import os
-from typing import Generator
+import threading
+from typing import Any, AsyncGenerator, Generator
 
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise RuntimeError("Missing required environment variable: DATABASE_URL")
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+# Async drivers for the sync URLs this app is configured with.
+_ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def _pool_options(url: str) -> dict[str, Any]:
+    # SQLite uses a per-thread/static pool that takes no sizing arguments.
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    }
+
+
+def _async_url(url: str) -> str:
+    parsed = make_url(url)
+    driver = _ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise RuntimeError(f"No async driver for database backend {parsed.get_backend_name()!r}")
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+engine = create_engine(DATABASE_URL, pool_pre_ping=True, **_pool_options(DATABASE_URL))
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
+_async_engine: AsyncEngine | None = None
+_async_sessionmaker: async_sessionmaker[AsyncSession] | None = None
+_async_lock = threading.Lock()
+
+
+def get_async_engine() -> AsyncEngine:
+    """The asyncio engine, created on first use so sync-only processes
+    (worker, scripts) never need the async driver installed."""
+    global _async_engine, _async_sessionmaker
+    if _async_engine is None:
+        with _async_lock:
+            if _async_engine is None:
+                url = os.getenv("ASYNC_DATABASE_URL") or _async_url(DATABASE_URL)
+                _async_engine = create_async_engine(url, pool_pre_ping=True, **_pool_options(url))
+                _async_sessionmaker = async_sessionmaker(
+                    bind=_async_engine, autoflush=False, expire_on_commit=False
+                )
+    return _async_engine
+
+
+def AsyncSessionLocal() -> AsyncSession:
+    get_async_engine()
+    return _async_sessionmaker()
+
+
+async def dispose_async_engine() -> None:
+    if _async_engine is not None:
+        await _async_engine.dispose()
+
 
 def get_db() -> Generator[Session, None, None]:
     db = SessionLocal()
@@ -18,3 +74,8 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,6 +1,7 @@
 from dotenv import load_dotenv
 
 load_dotenv()
+import math
 from pathlib import Path
 
 from fastapi import FastAPI, HTTPException, Request
@@ -13,6 +14,12 @@ from app.api.v1.response import fail
 from app.api.v1.router import router as v1_router
 from app.core.config import settings
 from app.core.logging import setup_logging
+from app.core.loop_monitor import install_loop_monitor
+from app.db.session import dispose_async_engine
+from app.repositories.material_packages import PackageVersionConflict
+from app.services.circuit_breaker import ProviderUnavailableError
+from app.services.event_bus import get_event_bus
+from app.services.http_clients import aclose_http_clients, close_http_clients
 
 setup_logging()
 
@@ -31,6 +38,28 @@ app.add_middleware(
 )
 app.include_router(health_router)
 app.include_router(v1_router)
+install_loop_monitor(app)
+
+
+@app.on_event("startup")
+async def start_event_bus() -> None:
+    get_event_bus().start()
+
+
+@app.on_event("shutdown")
+async def stop_event_bus() -> None:
+    get_event_bus().stop()
+
+
+@app.on_event("shutdown")
+async def close_provider_clients() -> None:
+    await aclose_http_clients()
+    close_http_clients()
+
+
+@app.on_event("shutdown")
+async def close_async_engine() -> None:
+    await dispose_async_engine()
 
 
 def _error_code_from_status(status_code: int) -> int:
@@ -40,6 +69,7 @@ def _error_code_from_status(status_code: int) -> int:
         403: 1003,
         404: 1004,
         409: 1005,
+        503: 1006,
     }
     return mapping.get(status_code, 1000)
 
@@ -54,6 +84,23 @@ async def http_exception_handler(request: Request, exc: HTTPException) -> JSONRe
     return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
 
 
+@app.exception_handler(PackageVersionConflict)
+async def package_version_conflict_handler(request: Request, exc: PackageVersionConflict) -> JSONResponse:
+    message = "Material package was modified concurrently, reload and retry"
+    if request.url.path.startswith("/api/v1"):
+        return JSONResponse(status_code=409, content=fail(_error_code_from_status(409), message))
+    return JSONResponse(status_code=409, content={"detail": message})
+
+
+@app.exception_handler(ProviderUnavailableError)
+async def provider_unavailable_handler(request: Request, exc: ProviderUnavailableError) -> JSONResponse:
+    message = "Model provider is temporarily unavailable, retry later"
+    headers = {"Retry-After": str(max(1, math.ceil(exc.retry_after)))}
+    if request.url.path.startswith("/api/v1"):
+        return JSONResponse(status_code=503, content=fail(_error_code_from_status(503), message), headers=headers)
+    return JSONResponse(status_code=503, content={"detail": message}, headers=headers)
+
+
 @app.exception_handler(Exception)
 async def unhandled_exception_handler(request: Request, exc: Exception) -> JSONResponse:
     if request.url.path.startswith("/api/v1"):
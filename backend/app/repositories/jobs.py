@@ -0,0 +1,163 @@
+from datetime import timedelta
+from typing import Optional
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.core.events import emit_event
+from app.db.models import Job, to_job_dict, utc_now
+from app.store import new_id
+
+
+def enqueue_job(
+    db: Session,
+    kind: str,
+    payload: dict,
+    project_id: str | None = None,
+    max_attempts: int = 3,
+    worker_id: str | None = None,
+    lease_seconds: int = 0,
+) -> dict:
+    now = utc_now()
+    job = Job(
+        id=new_id(),
+        kind=kind,
+        status="queued",
+        project_id=project_id,
+        payload=payload or {},
+        attempts=0,
+        max_attempts=max(1, max_attempts),
+        available_at=now,
+        created_at=now,
+        updated_at=now,
+    )
+    if worker_id:
+        _lease(job, worker_id, lease_seconds)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    emit_event("job.enqueued", {"job_id": job.id, "kind": kind, "project_id": project_id})
+    return to_job_dict(job)
+
+
+def get_job(db: Session, job_id: str) -> Optional[dict]:
+    job = db.execute(select(Job).where(Job.id == job_id)).scalar_one_or_none()
+    return to_job_dict(job) if job else None
+
+
+def _lease(job: Job, worker_id: str, lease_seconds: int) -> None:
+    now = utc_now()
+    job.status = "running"
+    job.attempts = (job.attempts or 0) + 1
+    job.lease_owner = worker_id
+    job.lease_expires_at = now + timedelta(seconds=lease_seconds)
+    job.heartbeat_at = now
+    job.updated_at = now
+
+
+def claim_next_job(
+    db: Session,
+    worker_id: str,
+    lease_seconds: int,
+    kinds: list[str] | None = None,
+) -> Optional[dict]:
+    # Expired leases are picked up again, so a crashed worker only delays a job
+    # by the visibility timeout instead of losing it.
+    while True:
+        now = utc_now()
+        query = select(Job).where(
+            or_(
+                and_(Job.status == "queued", Job.available_at <= now),
+                and_(Job.status == "running", Job.lease_expires_at < now),
+            )
+        )
+        if kinds:
+            query = query.where(Job.kind.in_(kinds))
+        query = (
+            query.order_by(Job.available_at, Job.created_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        job = db.execute(query).scalar_one_or_none()
+        if not job:
+            db.rollback()
+            return None
+        if job.status == "running" and (job.attempts or 0) >= job.max_attempts:
+            job.status = "failed"
+            job.last_error = job.last_error or "lease expired"
+            job.lease_owner = None
+            job.lease_expires_at = None
+            job.finished_at = now
+            job.updated_at = now
+            db.commit()
+            emit_event("job.failed", {"job_id": job.id, "kind": job.kind, "reason": "lease expired"})
+            continue
+        _lease(job, worker_id, lease_seconds)
+        db.commit()
+        db.refresh(job)
+        return to_job_dict(job)
+
+
+def heartbeat_job(db: Session, job_id: str, worker_id: str, lease_seconds: int) -> bool:
+    now = utc_now()
+    result = db.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.lease_owner == worker_id, Job.status == "running")
+        .values(
+            heartbeat_at=now,
+            lease_expires_at=now + timedelta(seconds=lease_seconds),
+            updated_at=now,
+        )
+    )
+    db.commit()
+    return result.rowcount > 0
+
+
+def complete_job(db: Session, job_id: str, worker_id: str) -> bool:
+    now = utc_now()
+    result = db.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.lease_owner == worker_id)
+        .values(
+            status="completed",
+            lease_owner=None,
+            lease_expires_at=None,
+            finished_at=now,
+            updated_at=now,
+        )
+    )
+    db.commit()
+    return result.rowcount > 0
+
+
+def fail_job(
+    db: Session,
+    job_id: str,
+    worker_id: str,
+    error: str,
+    retry_delay_seconds: int,
+) -> Optional[dict]:
+    job = db.execute(
+        select(Job).where(Job.id == job_id, Job.lease_owner == worker_id).with_for_update()
+    ).scalar_one_or_none()
+    if not job:
+        db.rollback()
+        return None
+    now = utc_now()
+    job.last_error = (error or "")[:2000]
+    job.lease_owner = None
+    job.lease_expires_at = None
+    job.updated_at = now
+    if (job.attempts or 0) < job.max_attempts:
+        job.status = "queued"
+        job.available_at = now + timedelta(seconds=retry_delay_seconds * job.attempts)
+    else:
+        job.status = "failed"
+        job.finished_at = now
+    db.commit()
+    db.refresh(job)
+    emit_event(
+        "job.failed" if job.status == "failed" else "job.retrying",
+        {"job_id": job.id, "kind": job.kind, "attempts": job.attempts},
+    )
+    return to_job_dict(job)
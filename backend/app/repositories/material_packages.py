@@ -1,12 +1,28 @@
-from typing import Optional
+import copy
+import json
+from typing import Any, Optional
 
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy import select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, defer
+from sqlalchemy.orm.exc import StaleDataError
 
 from app.core.events import emit_event
-from app.db.models import MaterialPackage, Project, to_material_package_dict, utc_now
+from app.db.models import (
+    PACKAGE_ASSET_KEYS,
+    MaterialPackage,
+    Project,
+    to_material_package_dict,
+    to_material_package_summary_dict,
+    to_project_access_dict,
+    utc_now,
+)
+from app.db.request_cache import cached, cached_async, remember
+from app.repositories import package_assets as asset_repo
 from app.store import new_id
 
+UPDATE_ATTEMPTS = 3
+
 
 def list_packages_for_project(db: Session, project_id: str) -> list[dict]:
     items = (
@@ -15,7 +31,82 @@ def list_packages_for_project(db: Session, project_id: str) -> list[dict]:
         .order_by(MaterialPackage.created_at.desc())
         .all()
     )
-    return [to_material_package_dict(item) for item in items]
+    for item in items:
+        _migrate_on_read(db, item)
+    assets = asset_repo.load_assets(db, [item.id for item in items])
+    return [to_material_package_dict(item, assets[item.id]) for item in items]
+
+
+def list_package_summaries(db: Session, project_id: str) -> list[dict]:
+    """List packages without loading their materials blob.
+
+    Packages listed here for the first time are migrated and get their
+    package_version column filled from the blob once.
+    """
+    legacy = (
+        db.execute(
+            select(MaterialPackage).where(
+                MaterialPackage.project_id == project_id,
+                MaterialPackage.package_version.is_(None),
+            )
+        )
+        .scalars()
+        .all()
+    )
+    for package in legacy:
+        _migrate_on_read(db, package, fill_package_version=True)
+    items = (
+        db.query(MaterialPackage)
+        .options(defer(MaterialPackage.materials))
+        .filter(MaterialPackage.project_id == project_id)
+        .order_by(MaterialPackage.created_at.desc())
+        .all()
+    )
+    summaries = asset_repo.summarize_assets(db, [item.id for item in items])
+    return [to_material_package_summary_dict(item, **summaries[item.id]) for item in items]
+
+
+def _package_version(materials: dict) -> int:
+    metadata = materials.get("metadata") if isinstance(materials, dict) else None
+    version = metadata.get("package_version") if isinstance(metadata, dict) else None
+    return version if isinstance(version, int) and not isinstance(version, bool) else 0
+
+
+def _to_dict(db: Session, package: MaterialPackage) -> dict:
+    return to_material_package_dict(package, asset_repo.load_assets(db, [package.id])[package.id])
+
+
+async def _to_dict_async(db: AsyncSession, package: MaterialPackage) -> dict:
+    assets = await asset_repo.load_assets_async(db, [package.id])
+    return to_material_package_dict(package, assets[package.id])
+
+
+def _migrate_on_read(db: Session, package: MaterialPackage, fill_package_version: bool = False) -> None:
+    """Lazily migrate a legacy package that is being read.
+
+    The commit bumps the package version, so a concurrent reader migrating
+    the same package makes it stale. For a read that only means the work is
+    done: the package is re-read (and migrated again if it still needs it)
+    instead of surfacing a version conflict.
+    """
+    for _ in range(UPDATE_ATTEMPTS):
+        changed = asset_repo.migrate_package(db, package)
+        if fill_package_version and package.package_version is None:
+            package.package_version = _package_version(package.materials or {})
+            changed = True
+        if not changed:
+            return
+        try:
+            db.commit()
+            return
+        except StaleDataError:
+            db.rollback()
+            db.refresh(package)
+
+
+async def _migrate_async(db: AsyncSession, package: MaterialPackage) -> None:
+    # Legacy packages are rare; reuse the sync migration on the same session.
+    await db.run_sync(lambda session: _migrate_on_read(session, package))
 
 
 def create_package(
@@ -30,6 +121,7 @@ def create_package(
     if not project:
         raise ValueError("Project not found")
     now = utc_now()
+    materials, assets = asset_repo.split_materials(materials or {})
     db.query(MaterialPackage).filter(MaterialPackage.project_id == project_id).update(
         {MaterialPackage.is_active: False},
         synchronize_session=False,
@@ -42,12 +134,15 @@ def create_package(
         status=status,
         is_active=True,
         summary=None,
-        materials=materials or {},
+        materials=materials,
+        package_version=_package_version(materials),
         generated_at=None,
         created_at=now,
         updated_at=now,
     )
     db.add(package)
+    db.flush()
+    asset_repo.sync_assets(db, package.id, assets)
     db.commit()
     db.refresh(package)
     emit_event(
@@ -65,18 +160,149 @@ def create_package(
             "material_package_id": package.id,
         },
     )
-    return to_material_package_dict(package)
+    return _to_dict(db, package)
 
 
 def get_package(db: Session, package_id: str) -> Optional[dict]:
     package = db.execute(select(MaterialPackage).where(MaterialPackage.id == package_id)).scalar_one_or_none()
-    return to_material_package_dict(package) if package else None
+    if not package:
+        return None
+    _migrate_on_read(db, package)
+    return _to_dict(db, package)
 
 
-def update_package(db: Session, package_id: str, payload: dict) -> Optional[dict]:
-    package = db.execute(select(MaterialPackage).where(MaterialPackage.id == package_id)).scalar_one_or_none()
+async def get_package_async(db: AsyncSession, package_id: str) -> Optional[dict]:
+    package = (
+        await db.execute(select(MaterialPackage).where(MaterialPackage.id == package_id))
+    ).scalar_one_or_none()
     if not package:
         return None
+    await _migrate_async(db, package)
+    return await _to_dict_async(db, package)
+
+
+def _access_query(package_id: str):
+    return (
+        select(MaterialPackage.project_id, Project.owner_user_id, Project.company_id, Project.visibility)
+        .join(Project, Project.id == MaterialPackage.project_id)
+        .where(MaterialPackage.id == package_id)
+    )
+
+
+def _with_access_query(package_id: str):
+    return (
+        select(MaterialPackage, Project.owner_user_id, Project.company_id, Project.visibility)
+        .join(Project, Project.id == MaterialPackage.project_id)
+        .where(MaterialPackage.id == package_id)
+    )
+
+
+def get_package_access(db: Session, package_id: str) -> Optional[dict]:
+    """Access fields of the package's project in one join, without the blob.
+
+    Cached for the request like ``projects.get_project_access``.
+    """
+
+    def load() -> Optional[dict]:
+        row = db.execute(_access_query(package_id)).one_or_none()
+        if row is None:
+            return None
+        access = to_project_access_dict(*row)
+        remember(db, ("project_access", access["id"]), access)
+        return access
+
+    return cached(db, ("package_access", package_id), load)
+
+
+async def get_package_access_async(db: AsyncSession, package_id: str) -> Optional[dict]:
+    async def load() -> Optional[dict]:
+        row = (await db.execute(_access_query(package_id))).one_or_none()
+        if row is None:
+            return None
+        access = to_project_access_dict(*row)
+        remember(db, ("project_access", access["id"]), access)
+        return access
+
+    return await cached_async(db, ("package_access", package_id), load)
+
+
+def get_package_model_with_access(
+    db: Session, package_id: str
+) -> tuple[Optional[MaterialPackage], Optional[dict]]:
+    """Load a package and its project's access fields in one SELECT."""
+    row = db.execute(_with_access_query(package_id)).one_or_none()
+    return _split_access_row(db, package_id, row)
+
+
+def _split_access_row(
+    db: Session | AsyncSession, package_id: str, row: Any
+) -> tuple[Optional[MaterialPackage], Optional[dict]]:
+    if row is None:
+        return None, None
+    package = row[0]
+    access = to_project_access_dict(package.project_id, *row[1:])
+    remember(db, ("package_access", package_id), access)
+    remember(db, ("project_access", package.project_id), access)
+    return package, access
+
+
+def get_package_with_access(db: Session, package_id: str) -> tuple[Optional[dict], Optional[dict]]:
+    package, access = get_package_model_with_access(db, package_id)
+    if not package:
+        return None, None
+    _migrate_on_read(db, package)
+    return _to_dict(db, package), access
+
+
+async def get_package_with_access_async(
+    db: AsyncSession, package_id: str
+) -> tuple[Optional[dict], Optional[dict]]:
+    row = (await db.execute(_with_access_query(package_id))).one_or_none()
+    package, access = _split_access_row(db, package_id, row)
+    if not package:
+        return None, None
+    await _migrate_async(db, package)
+    return await _to_dict_async(db, package), access
+
+
+class PackageVersionConflict(Exception):
+    def __init__(self, package_id: str, expected_version: int | None, current_version: int | None) -> None:
+        super().__init__(
+            f"material package {package_id} is at version {current_version}, expected {expected_version}"
+        )
+        self.package_id = package_id
+        self.expected_version = expected_version
+        self.current_version = current_version
+
+
+def update_package(
+    db: Session, package_id: str, payload: dict, expected_version: int | None = None
+) -> Optional[dict]:
+    # Without an expected version the caller only wants its fields written, so
+    # a concurrent bump is retried against the fresh row instead of failing.
+    for attempt in range(UPDATE_ATTEMPTS):
+        package = db.execute(
+            select(MaterialPackage)
+            .where(MaterialPackage.id == package_id)
+            .execution_options(populate_existing=True)
+        ).scalar_one_or_none()
+        if not package:
+            return None
+        if expected_version is not None and package.version != expected_version:
+            raise PackageVersionConflict(package_id, expected_version, package.version)
+        try:
+            return _apply_update(db, package, payload)
+        except StaleDataError:
+            db.rollback()
+            if expected_version is not None or attempt == UPDATE_ATTEMPTS - 1:
+                current = db.execute(
+                    select(MaterialPackage.version).where(MaterialPackage.id == package_id)
+                ).scalar_one_or_none()
+                raise PackageVersionConflict(package_id, expected_version, current)
+    return None
+
+
+def _apply_update(db: Session, package: MaterialPackage, payload: dict) -> dict:
     was_active = package.is_active
     was_completed = package.status == "completed"
     if payload.get("is_active") is True:
@@ -86,6 +312,11 @@ def update_package(db: Session, package_id: str, payload: dict) -> Optional[dict
         ).update({MaterialPackage.is_active: False}, synchronize_session=False)
     if payload.get("status") == "completed" and "generated_at" not in payload:
         payload["generated_at"] = utc_now()
+    if "materials" in payload:
+        materials, assets = asset_repo.split_materials(payload["materials"] or {})
+        asset_repo.sync_assets(db, package.id, assets)
+        payload = {**payload, "materials": materials}
+        package.package_version = _package_version(materials)
     for key in ["package_name", "summary", "status", "materials", "generated_at", "is_active"]:
         if key in payload:
             setattr(package, key, payload[key])
@@ -108,4 +339,117 @@ def update_package(db: Session, package_id: str, payload: dict) -> Optional[dict
                 "material_package_id": package.id,
             },
         )
-    return to_material_package_dict(package)
+    return _to_dict(db, package)
+
+
+def set_path(path: list[str], value: Any) -> dict:
+    return {"op": "set", "path": list(path), "value": value}
+
+
+def append_path(path: list[str], value: Any) -> dict:
+    return {"op": "append", "path": list(path), "value": value}
+
+
+def _validate_ops(ops: list[dict]) -> None:
+    if not ops:
+        raise ValueError("ops required")
+    asset_keys = set(PACKAGE_ASSET_KEYS.values())
+    for op in ops:
+        path = op.get("path")
+        if op.get("op") not in {"set", "append"}:
+            raise ValueError(f"unsupported op: {op.get('op')}")
+        if not path or not all(isinstance(part, str) and part for part in path):
+            raise ValueError("path must be a non-empty list of keys")
+        if path[0] == "metadata" and len(path) > 1 and path[1] in asset_keys:
+            raise ValueError("package assets are patched through package_assets")
+
+
+def _apply_ops(materials: dict, ops: list[dict]) -> dict:
+    for op in ops:
+        target = materials
+        for key in op["path"][:-1]:
+            if not isinstance(target.get(key), dict):
+                target[key] = {}
+            target = target[key]
+        last = op["path"][-1]
+        if op["op"] == "append":
+            items = target.get(last)
+            target[last] = (items if isinstance(items, list) else []) + [op["value"]]
+        else:
+            target[last] = op["value"]
+    return materials
+
+
+def patch_materials(
+    db: Session, package_id: str, ops: list[dict], expected_version: int | None = None
+) -> Optional[dict]:
+    """Apply path-level ``set``/``append`` ops to a package's materials.
+
+    On PostgreSQL the ops are sent as one jsonb document and applied in a
+    single UPDATE by ``zflow_jsonb_patch`` (see app.db.migrations), so only
+    the patch travels and concurrent patches never overwrite each other.
+    With ``expected_version`` the update also fails with
+    PackageVersionConflict when the package changed since it was read.
+    """
+    _validate_ops(ops)
+    if db.get_bind().dialect.name == "postgresql":
+        condition = " AND version = :expected_version" if expected_version is not None else ""
+        version = db.execute(
+            text(
+                "UPDATE material_packages SET "
+                "materials = CAST(zflow_jsonb_patch(CAST(materials AS jsonb), CAST(:ops AS jsonb)) AS json), "
+                "version = version + 1, updated_at = :updated_at "
+                f"WHERE id = :package_id{condition} RETURNING version"
+            ),
+            {
+                "ops": json.dumps(ops),
+                "package_id": package_id,
+                "expected_version": expected_version,
+                "updated_at": utc_now(),
+            },
+        ).scalar_one_or_none()
+    else:
+        version = _patch_materials_in_python(db, package_id, ops, expected_version)
+    if version is None:
+        current = db.execute(
+            select(MaterialPackage.version).where(MaterialPackage.id == package_id)
+        ).scalar_one_or_none()
+        db.rollback()
+        if current is None:
+            return None
+        raise PackageVersionConflict(package_id, expected_version, current)
+    db.commit()
+    package = db.execute(
+        select(MaterialPackage)
+        .where(MaterialPackage.id == package_id)
+        .execution_options(populate_existing=True)
+    ).scalar_one()
+    return _to_dict(db, package)
+
+
+def _patch_materials_in_python(
+    db: Session, package_id: str, ops: list[dict], expected_version: int | None
+) -> int | None:
+    # Compare-and-set fallback for databases without jsonb (local sqlite).
+    for _ in range(UPDATE_ATTEMPTS):
+        row = db.execute(
+            select(MaterialPackage.materials, MaterialPackage.version).where(MaterialPackage.id == package_id)
+        ).one_or_none()
+        if row is None:
+            return None
+        materials, version = row
+        if expected_version is not None and version != expected_version:
+            return None
+        result = db.execute(
+            update(MaterialPackage)
+            .where(MaterialPackage.id == package_id, MaterialPackage.version == version)
+            .values(
+                materials=_apply_ops(copy.deepcopy(materials or {}), ops),
+                version=version + 1,
+                updated_at=utc_now(),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            return version + 1
+    return None
@@ -0,0 +1,297 @@
+from typing import Any, Iterable
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.db.models import (
+    PACKAGE_ASSET_KEYS,
+    MaterialPackage,
+    PackageAsset,
+    merge_package_assets,
+    utc_now,
+)
+from app.store import new_id
+
+
+def _text(value: Any) -> str | None:
+    return str(value) if value not in (None, "") else None
+
+
+def _asset_id(asset_type: str, item: dict, position: int) -> str:
+    return _text(item.get("id")) or _text(item.get("task_id")) or f"{asset_type}:{position}"
+
+
+def _apply(row: PackageAsset, item: dict, position: int) -> None:
+    is_active = item.get("is_active")
+    row.data = item
+    row.position = position
+    row.kind = _text(item.get("type"))
+    row.shot_id = _text(item.get("shot_id"))
+    row.is_active = is_active if isinstance(is_active, bool) else None
+    row.task_id = _text(item.get("task_id"))
+    row.updated_at = utc_now()
+
+
+def split_materials(materials: dict) -> tuple[dict, dict[str, list[dict]]]:
+    metadata = materials.get("metadata") if isinstance(materials, dict) else None
+    if not isinstance(metadata, dict):
+        return materials, {}
+    stored = dict(metadata)
+    assets: dict[str, list[dict]] = {}
+    for asset_type, key in PACKAGE_ASSET_KEYS.items():
+        if key not in stored:
+            continue
+        items = stored.pop(key)
+        assets[asset_type] = [item for item in items if isinstance(item, dict)] if isinstance(items, list) else []
+    if not assets:
+        return materials, {}
+    return {**materials, "metadata": stored}, assets
+
+
+def sync_assets(db: Session, package_id: str, assets: dict[str, list[dict]]) -> None:
+    """Make the stored assets of each given type match ``assets``.
+
+    Rows are matched by asset id, so only new, changed or removed assets are
+    written. Types missing from ``assets`` are left alone. Does not commit.
+    """
+    for asset_type, items in assets.items():
+        rows = (
+            db.execute(
+                select(PackageAsset)
+                .where(PackageAsset.package_id == package_id, PackageAsset.asset_type == asset_type)
+                .order_by(PackageAsset.position, PackageAsset.created_at)
+            )
+            .scalars()
+            .all()
+        )
+        by_id: dict[str, list[PackageAsset]] = {}
+        for row in rows:
+            by_id.setdefault(row.asset_id, []).append(row)
+        kept: set[str] = set()
+        for position, item in enumerate(items):
+            asset_id = _asset_id(asset_type, item, position)
+            matches = by_id.get(asset_id)
+            row = matches.pop(0) if matches else None
+            if row is None:
+                row = PackageAsset(
+                    id=new_id(),
+                    package_id=package_id,
+                    asset_type=asset_type,
+                    asset_id=asset_id,
+                    created_at=utc_now(),
+                )
+                db.add(row)
+            if row.data != item or row.position != position:
+                _apply(row, item, position)
+            kept.add(row.id)
+        for row in rows:
+            if row.id not in kept:
+                db.delete(row)
+
+
+def _assets_query(ids: list[str]):
+    return (
+        select(PackageAsset.package_id, PackageAsset.asset_type, PackageAsset.data)
+        .where(PackageAsset.package_id.in_(ids))
+        .order_by(PackageAsset.package_id, PackageAsset.asset_type, PackageAsset.position, PackageAsset.created_at)
+    )
+
+
+def _group_assets(ids: list[str], rows: Iterable) -> dict[str, dict[str, list[dict]]]:
+    result: dict[str, dict[str, list[dict]]] = {package_id: {} for package_id in ids}
+    for package_id, asset_type, data in rows:
+        result[package_id].setdefault(asset_type, []).append(data or {})
+    return result
+
+
+def load_assets(db: Session, package_ids: Iterable[str]) -> dict[str, dict[str, list[dict]]]:
+    ids = list(package_ids)
+    if not ids:
+        return {}
+    return _group_assets(ids, db.execute(_assets_query(ids)).all())
+
+
+async def load_assets_async(db: AsyncSession, package_ids: Iterable[str]) -> dict[str, dict[str, list[dict]]]:
+    ids = list(package_ids)
+    if not ids:
+        return {}
+    return _group_assets(ids, (await db.execute(_assets_query(ids))).all())
+
+
+def summarize_assets(db: Session, package_ids: Iterable[str]) -> dict[str, dict[str, Any]]:
+    """Asset counts per list key and the first active image url for each package."""
+    ids = list(package_ids)
+    result: dict[str, dict[str, Any]] = {
+        package_id: {"counts": {key: 0 for key in PACKAGE_ASSET_KEYS.values()}, "thumbnail_url": None}
+        for package_id in ids
+    }
+    if not ids:
+        return result
+    counts = db.execute(
+        select(PackageAsset.package_id, PackageAsset.asset_type, func.count())
+        .where(PackageAsset.package_id.in_(ids))
+        .group_by(PackageAsset.package_id, PackageAsset.asset_type)
+    ).all()
+    for package_id, asset_type, count in counts:
+        key = PACKAGE_ASSET_KEYS.get(asset_type)
+        if key:
+            result[package_id]["counts"][key] = count
+    first = (
+        select(PackageAsset.package_id, func.min(PackageAsset.position).label("position"))
+        .where(
+            PackageAsset.package_id.in_(ids),
+            PackageAsset.asset_type == "image",
+            PackageAsset.is_active.is_(True),
+        )
+        .group_by(PackageAsset.package_id)
+        .subquery()
+    )
+    thumbnails = db.execute(
+        select(PackageAsset.package_id, PackageAsset.data)
+        .join(
+            first,
+            (PackageAsset.package_id == first.c.package_id) & (PackageAsset.position == first.c.position),
+        )
+        .where(PackageAsset.asset_type == "image")
+    ).all()
+    for package_id, data in thumbnails:
+        url = (data or {}).get("url")
+        if url and not result[package_id]["thumbnail_url"]:
+            result[package_id]["thumbnail_url"] = url
+    return result
+
+
+def find_package_id(db: Session, asset_type: str, asset_id: str) -> str | None:
+    # Copied packages share asset ids with their parent; the newest copy wins.
+    return db.execute(
+        select(PackageAsset.package_id)
+        .where(PackageAsset.asset_id == asset_id, PackageAsset.asset_type == asset_type)
+        .order_by(PackageAsset.created_at.desc())
+        .limit(1)
+    ).scalar_one_or_none()
+
+
+def migrate_package(db: Session, package: MaterialPackage) -> bool:
+    """Move asset lists still stored in the materials blob into ``package_assets``.
+
+    Returns True when the package changed; the caller commits.
+    """
+    stored, assets = split_materials(package.materials or {})
+    if not assets:
+        return False
+    sync_assets(db, package.id, {asset_type: items for asset_type, items in assets.items() if items})
+    package.materials = stored
+    return True
+
+
+def package_materials(db: Session, package: MaterialPackage) -> dict:
+    assets = load_assets(db, [package.id])[package.id]
+    return merge_package_assets(package.materials or {}, assets)
+
+
+def append_asset(db: Session, package_id: str, asset_type: str, item: dict) -> bool:
+    return append_assets(db, package_id, asset_type, [item])
+
+
+def append_assets(db: Session, package_id: str, asset_type: str, items: list[dict]) -> bool:
+    """Append ``items`` to the package in one transaction.
+
+    The package row is locked first so concurrent appends read the next
+    position one after another instead of handing out the same one.
+    """
+    package = db.execute(
+        select(MaterialPackage).where(MaterialPackage.id == package_id).with_for_update()
+    ).scalar_one_or_none()
+    if not package:
+        return False
+    migrate_package(db, package)
+    db.flush()
+    position = db.execute(
+        select(func.coalesce(func.max(PackageAsset.position) + 1, 0)).where(
+            PackageAsset.package_id == package_id,
+            PackageAsset.asset_type == asset_type,
+        )
+    ).scalar_one()
+    for offset, item in enumerate(items):
+        row = PackageAsset(
+            id=new_id(),
+            package_id=package_id,
+            asset_type=asset_type,
+            asset_id=_asset_id(asset_type, item, position + offset),
+            created_at=utc_now(),
+        )
+        _apply(row, item, position + offset)
+        db.add(row)
+    _touch_package(db, package_id)
+    db.commit()
+    return True
+
+
+def add_active_asset(db: Session, package_id: str, asset_type: str, item: dict) -> bool:
+    """Append ``item`` and deactivate earlier assets of the same kind for its shot."""
+    kind = _text(item.get("type"))
+    shot_id = _text(item.get("shot_id"))
+    if kind and shot_id:
+        rows = (
+            db.execute(
+                select(PackageAsset)
+                .where(
+                    PackageAsset.package_id == package_id,
+                    PackageAsset.asset_type == asset_type,
+                    PackageAsset.shot_id == shot_id,
+                    PackageAsset.kind == kind,
+                    PackageAsset.is_active.is_(True),
+                )
+                .with_for_update()
+            )
+            .scalars()
+            .all()
+        )
+        for row in rows:
+            _apply(row, {**(row.data or {}), "is_active": False}, row.position)
+    return append_asset(db, package_id, asset_type, item)
+
+
+def update_asset_by_task(
+    db: Session, package_id: str, asset_type: str, task_id: str, changes: dict
+) -> dict | None:
+    """Merge ``changes`` into the asset created for ``task_id``, under a row lock."""
+    row = (
+        db.execute(
+            select(PackageAsset)
+            .where(
+                PackageAsset.package_id == package_id,
+                PackageAsset.asset_type == asset_type,
+                PackageAsset.task_id == task_id,
+            )
+            .order_by(PackageAsset.created_at.desc())
+            .limit(1)
+            .with_for_update()
+        )
+        .scalars()
+        .first()
+    )
+    if row is None:
+        return None
+    data = {**(row.data or {}), **changes}
+    _apply(row, data, row.position)
+    _touch_package(db, package_id)
+    db.commit()
+    return data
+
+
+def _touch_package(db: Session, package_id: str) -> None:
+    # Asset writes bump the package version too, so read-modify-write callers
+    # holding an older version see the change.
+    db.execute(
+        update(MaterialPackage)
+        .where(MaterialPackage.id == package_id)
+        .values(updated_at=utc_now(), version=MaterialPackage.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def delete_project_assets(db: Session, project_id: str) -> None:
+    package_ids = select(MaterialPackage.id).where(MaterialPackage.project_id == project_id)
+    db.query(PackageAsset).filter(PackageAsset.package_id.in_(package_ids)).delete(synchronize_session=False)
@@ -1,23 +1,107 @@
+import base64
+import json
+import threading
+import time
+from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import and_, or_, select
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Query, Session, defer
 
+from app.core.config import settings
 from app.core.events import emit_event
-from app.db.models import MaterialPackage, Project, UserAccount, to_project_dict, utc_now
+from app.db.models import (
+    MaterialPackage,
+    Project,
+    UserAccount,
+    to_project_access_dict,
+    to_project_dict,
+    to_project_list_dict,
+    utc_now,
+)
+from app.db.request_cache import cached, cached_async
+from app.repositories import package_assets as asset_repo
+from app.repositories import tasks as task_repo
 from app.store import new_id
 
+# scope -> (expires_at, total); per process, so totals can lag by the TTL.
+_TOTALS: dict[str, tuple[float, int]] = {}
+_TOTALS_LOCK = threading.Lock()
 
-def list_projects(db: Session, page: int, page_size: int) -> tuple[list[dict], int]:
-    total = db.query(Project).count()
-    items = (
-        db.query(Project)
-        .order_by(Project.created_at.desc())
-        .offset((page - 1) * page_size)
-        .limit(page_size)
-        .all()
-    )
-    return [to_project_dict(item) for item in items], total
+
+def encode_cursor(created_at: datetime, project_id: str) -> str:
+    raw = json.dumps([created_at.isoformat(), project_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, project_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(project_id)
+    except (ValueError, TypeError) as exc:
+        raise ValueError("invalid cursor") from exc
+
+
+def _invalidate_totals() -> None:
+    with _TOTALS_LOCK:
+        _TOTALS.clear()
+
+
+def _total(query: Query, scope: str) -> int:
+    ttl = settings.project_count_cache_seconds
+    if ttl <= 0:
+        return query.order_by(None).count()
+    now = time.monotonic()
+    with _TOTALS_LOCK:
+        cached = _TOTALS.get(scope)
+    if cached and cached[0] > now:
+        return cached[1]
+    total = query.order_by(None).count()
+    with _TOTALS_LOCK:
+        _TOTALS[scope] = (now + ttl, total)
+    return total
+
+
+def _page(
+    query: Query,
+    scope: str,
+    page: int,
+    page_size: int,
+    cursor: Optional[str],
+    include_total: bool,
+) -> tuple[list[dict], Optional[int], Optional[str]]:
+    """Return one page of projects, newest first, and the cursor for the next.
+
+    With a cursor the page is read by keyset on (created_at, id); ``page`` is
+    only used for offset paging when no cursor is given. Listings skip the
+    input_config and metadata columns.
+    """
+    total = _total(query, scope) if include_total else None
+    query = query.options(defer(Project.input_config), defer(Project.metadata_json))
+    query = query.order_by(Project.created_at.desc(), Project.id.desc())
+    if cursor:
+        created_at, project_id = decode_cursor(cursor)
+        query = query.filter(tuple_(Project.created_at, Project.id) < tuple_(created_at, project_id))
+    else:
+        query = query.offset((page - 1) * page_size)
+    items = query.limit(page_size + 1).all()
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        next_cursor = encode_cursor(items[-1].created_at, items[-1].id)
+    return [to_project_list_dict(item) for item in items], total, next_cursor
+
+
+def list_projects(
+    db: Session,
+    page: int,
+    page_size: int,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+) -> tuple[list[dict], Optional[int], Optional[str]]:
+    return _page(db.query(Project), "all", page, page_size, cursor, include_total)
 
 
 def create_project(
@@ -51,6 +135,7 @@ def create_project(
     db.add(project)
     db.commit()
     db.refresh(project)
+    _invalidate_totals()
     emit_event(
         "project.created",
         {"project_id": project.id, "name": project.name, "status": project.status},
@@ -63,9 +148,13 @@ def list_projects_for_user(
     user: UserAccount,
     page: int,
     page_size: int,
-) -> tuple[list[dict], int]:
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+) -> tuple[list[dict], Optional[int], Optional[str]]:
     query = db.query(Project)
+    scope = "all"
     if not getattr(user, "is_platform_admin", False):
+        scope = f"user:{user.id}:{getattr(user, 'company_id', None) or ''}"
         if getattr(user, "company_id", None):
             query = query.filter(
                 or_(
@@ -78,14 +167,7 @@ def list_projects_for_user(
             )
         else:
             query = query.filter(Project.owner_user_id == user.id)
-    total = query.count()
-    items = (
-        query.order_by(Project.created_at.desc())
-        .offset((page - 1) * page_size)
-        .limit(page_size)
-        .all()
-    )
-    return [to_project_dict(item) for item in items], total
+    return _page(query, scope, page, page_size, cursor, include_total)
 
 
 def get_project(db: Session, project_id: str) -> Optional[dict]:
@@ -93,6 +175,35 @@ def get_project(db: Session, project_id: str) -> Optional[dict]:
     return to_project_dict(project) if project else None
 
 
+async def get_project_async(db: AsyncSession, project_id: str) -> Optional[dict]:
+    project = (await db.execute(select(Project).where(Project.id == project_id))).scalar_one_or_none()
+    return to_project_dict(project) if project else None
+
+
+def _access_query(project_id: str):
+    return select(Project.id, Project.owner_user_id, Project.company_id, Project.visibility).where(
+        Project.id == project_id
+    )
+
+
+def get_project_access(db: Session, project_id: str) -> Optional[dict]:
+    """Access fields of a project, read once per request."""
+
+    def load() -> Optional[dict]:
+        row = db.execute(_access_query(project_id)).one_or_none()
+        return to_project_access_dict(*row) if row else None
+
+    return cached(db, ("project_access", project_id), load)
+
+
+async def get_project_access_async(db: AsyncSession, project_id: str) -> Optional[dict]:
+    async def load() -> Optional[dict]:
+        row = (await db.execute(_access_query(project_id))).one_or_none()
+        return to_project_access_dict(*row) if row else None
+
+    return await cached_async(db, ("project_access", project_id), load)
+
+
 def get_project_model(db: Session, project_id: str) -> Optional[Project]:
     return db.execute(select(Project).where(Project.id == project_id)).scalar_one_or_none()
 
@@ -125,6 +236,8 @@ def update_project(db: Session, project_id: str, payload: dict) -> Optional[dict
     project.updated_at = utc_now()
     db.commit()
     db.refresh(project)
+    if "visibility" in updated_fields:
+        _invalidate_totals()
     emit_event(
         "project.updated",
         {"project_id": project.id, "fields": updated_fields},
@@ -136,8 +249,11 @@ def delete_project(db: Session, project_id: str) -> bool:
     project = db.execute(select(Project).where(Project.id == project_id)).scalar_one_or_none()
     if not project:
         return False
+    asset_repo.delete_project_assets(db, project_id)
+    task_repo.delete_project_tasks(db, project_id)
     db.query(MaterialPackage).filter(MaterialPackage.project_id == project_id).delete(synchronize_session=False)
     db.delete(project)
     db.commit()
+    _invalidate_totals()
     emit_event("project.deleted", {"project_id": project_id})
     return True
@@ -0,0 +1,164 @@
+from datetime import timedelta
+from typing import Optional
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models import (
+    ExportFile,
+    ExportTask,
+    GenerationTask,
+    to_export_file_dict,
+    to_export_task_dict,
+    to_generation_task_dict,
+    utc_now,
+)
+from app.store import new_id
+
+_FINISHED_STATUSES = ("completed", "failed", "canceled")
+
+
+def _sweep(db: Session) -> None:
+    # Task creation is rare next to progress polling, so it also drops
+    # finished tasks past the retention window.
+    if settings.task_retention_seconds <= 0:
+        return
+    cutoff = utc_now() - timedelta(seconds=settings.task_retention_seconds)
+    db.execute(
+        delete(GenerationTask).where(
+            GenerationTask.status.in_(_FINISHED_STATUSES), GenerationTask.updated_at < cutoff
+        )
+    )
+    db.execute(delete(ExportTask).where(ExportTask.status.in_(_FINISHED_STATUSES), ExportTask.updated_at < cutoff))
+    db.execute(delete(ExportFile).where(ExportFile.created_at < cutoff))
+
+
+def create_generation_task(db: Session, project_id: str, trace_id: str | None = None) -> dict:
+    now = utc_now()
+    _sweep(db)
+    task = GenerationTask(
+        id=new_id(),
+        project_id=project_id,
+        status="pending",
+        progress=0,
+        trace_id=trace_id,
+        created_at=now,
+        updated_at=now,
+    )
+    db.add(task)
+    db.commit()
+    db.refresh(task)
+    return to_generation_task_dict(task)
+
+
+def get_generation_task(db: Session, task_id: str) -> Optional[dict]:
+    task = db.execute(select(GenerationTask).where(GenerationTask.id == task_id)).scalar_one_or_none()
+    return to_generation_task_dict(task) if task else None
+
+
+def get_generation_trace_id(db: Session, task_id: str) -> Optional[str]:
+    return db.execute(select(GenerationTask.trace_id).where(GenerationTask.id == task_id)).scalar_one_or_none()
+
+
+def update_generation_task(db: Session, task_id: str, changes: dict) -> Optional[dict]:
+    task = db.execute(select(GenerationTask).where(GenerationTask.id == task_id)).scalar_one_or_none()
+    if not task:
+        return None
+    for key in ("status", "progress", "material_package_id"):
+        if key in changes:
+            setattr(task, key, changes[key])
+    task.updated_at = utc_now()
+    db.commit()
+    db.refresh(task)
+    return to_generation_task_dict(task)
+
+
+def list_generation_tasks(db: Session, project_id: str) -> list[dict]:
+    tasks = (
+        db.execute(
+            select(GenerationTask)
+            .where(GenerationTask.project_id == project_id)
+            .order_by(GenerationTask.created_at, GenerationTask.id)
+        )
+        .scalars()
+        .all()
+    )
+    return [to_generation_task_dict(task) for task in tasks]
+
+
+def create_export_task(
+    db: Session, project_id: str, export_config: dict, estimated_minutes: int | None = None
+) -> dict:
+    now = utc_now()
+    _sweep(db)
+    task = ExportTask(
+        id=new_id(),
+        project_id=project_id,
+        status="pending",
+        progress=0,
+        export_config=export_config or {},
+        estimated_minutes=estimated_minutes,
+        created_at=now,
+        updated_at=now,
+    )
+    db.add(task)
+    db.commit()
+    db.refresh(task)
+    return to_export_task_dict(task)
+
+
+def get_export_task(db: Session, task_id: str) -> Optional[dict]:
+    task = db.execute(select(ExportTask).where(ExportTask.id == task_id)).scalar_one_or_none()
+    return to_export_task_dict(task) if task else None
+
+
+def update_export_task(db: Session, task_id: str, changes: dict) -> bool:
+    values = {key: changes[key] for key in ("status", "progress", "file_id") if key in changes}
+    result = db.execute(update(ExportTask).where(ExportTask.id == task_id).values(**values, updated_at=utc_now()))
+    db.commit()
+    return result.rowcount > 0
+
+
+def create_export_file(db: Session, project_id: str, task_id: str, export_config: dict) -> dict:
+    file_id = new_id()
+    fmt = export_config.get("format") or "mp4"
+    export_file = ExportFile(
+        id=file_id,
+        project_id=project_id,
+        task_id=task_id,
+        format=fmt,
+        resolution=export_config.get("resolution"),
+        aspect_ratio=export_config.get("aspect_ratio"),
+        url=f"https://example.com/exports/{file_id}.{fmt}",
+        created_at=utc_now(),
+    )
+    db.add(export_file)
+    db.commit()
+    db.refresh(export_file)
+    return to_export_file_dict(export_file)
+
+
+def list_export_files(db: Session, project_id: str) -> list[dict]:
+    files = (
+        db.execute(
+            select(ExportFile)
+            .where(ExportFile.project_id == project_id)
+            .order_by(ExportFile.created_at.desc(), ExportFile.id)
+        )
+        .scalars()
+        .all()
+    )
+    return [to_export_file_dict(item) for item in files]
+
+
+def get_export_file(db: Session, file_id: str) -> Optional[dict]:
+    export_file = db.execute(select(ExportFile).where(ExportFile.id == file_id)).scalar_one_or_none()
+    return to_export_file_dict(export_file) if export_file else None
+
+
+def delete_project_tasks(db: Session, project_id: str) -> None:
+    """Delete the project's generation/export tasks and export files. Does not commit."""
+    db.execute(delete(GenerationTask).where(GenerationTask.project_id == project_id))
+    db.execute(delete(ExportTask).where(ExportTask.project_id == project_id))
+    db.execute(delete(ExportFile).where(ExportFile.project_id == project_id))
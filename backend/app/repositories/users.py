@@ -1,4 +1,5 @@
 from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.db.models import UserAccount, to_user_account_dict
@@ -18,6 +19,10 @@ def get_user(db: Session, user_id: str) -> UserAccount | None:
     return db.execute(select(UserAccount).where(UserAccount.id == user_id)).scalar_one_or_none()
 
 
+async def get_user_async(db: AsyncSession, user_id: str) -> UserAccount | None:
+    return (await db.execute(select(UserAccount).where(UserAccount.id == user_id))).scalar_one_or_none()
+
+
 def get_user_by_username(db: Session, username: str) -> UserAccount | None:
     return (
         db.execute(select(UserAccount).where(UserAccount.username == username))
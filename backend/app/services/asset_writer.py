@@ -0,0 +1,103 @@
+import logging
+import time
+from typing import Callable
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core import metrics
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.repositories import package_assets as asset_repo
+from app.services.batcher import Batcher
+
+logger = logging.getLogger(__name__)
+
+
+class AssetWriteBatcher:
+    """Write-behind buffer for assets generated into one material package.
+
+    Items are appended to the package in one transaction once ``max_items``
+    are buffered or ``flush_interval_ms`` after the first buffered item,
+    whichever comes first. Flushes use their own session so the shared
+    flusher thread never touches the caller's. ``on_error`` receives the
+    items of a batch that could not be written. ``close()`` flushes the tail.
+    """
+
+    def __init__(
+        self,
+        package_id: str,
+        asset_type: str,
+        flush_interval_ms: int,
+        max_items: int,
+        on_error: Callable[[list[dict]], None] | None = None,
+    ) -> None:
+        self._package_id = package_id
+        self._asset_type = asset_type
+        self._on_error = on_error
+        self._batcher: Batcher[dict] = Batcher(self._write, flush_interval_ms, max_items)
+        self.failed = 0
+
+    @property
+    def received(self) -> int:
+        return self._batcher.received
+
+    @property
+    def batches(self) -> int:
+        return self._batcher.batches
+
+    def add(self, item: dict) -> None:
+        if not self._batcher.add(item):
+            raise RuntimeError("asset batcher is closed")
+
+    def flush(self) -> None:
+        self._batcher.flush()
+
+    def _write(self, items: list[dict]) -> None:
+        started = time.perf_counter()
+        db = SessionLocal()
+        try:
+            written = asset_repo.append_assets(db, self._package_id, self._asset_type, items)
+        except SQLAlchemyError:
+            db.rollback()
+            written = False
+            logger.exception(
+                "asset batch write failed package_id=%s asset_type=%s items=%s",
+                self._package_id,
+                self._asset_type,
+                len(items),
+            )
+        finally:
+            db.close()
+        metrics.observe("assets.batch_write_ms", (time.perf_counter() - started) * 1000, asset_type=self._asset_type)
+        metrics.observe("assets.batch_size", len(items), asset_type=self._asset_type)
+        if written:
+            return
+        self.failed += len(items)
+        metrics.increment("assets.batch_write_failed", len(items), asset_type=self._asset_type)
+        if self._on_error is not None:
+            try:
+                self._on_error(items)
+            except Exception:
+                logger.exception("asset batch error callback failed package_id=%s", self._package_id)
+
+    def close(self) -> None:
+        if not self._batcher.close():
+            return
+        logger.info(
+            "asset batcher closed package_id=%s asset_type=%s received=%s batches=%s failed=%s",
+            self._package_id,
+            self._asset_type,
+            self.received,
+            self.batches,
+            self.failed,
+        )
+
+
+def image_batcher(package_id: str, on_error: Callable[[list[dict]], None] | None = None) -> AssetWriteBatcher:
+    return AssetWriteBatcher(
+        package_id,
+        "image",
+        settings.asset_write_flush_ms,
+        settings.asset_write_batch_size,
+        on_error,
+    )
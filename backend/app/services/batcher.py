@@ -0,0 +1,143 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Generic, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+# Threads that run interval flushes. A slow flush (an asset write waiting on
+# a row lock) only ties up one of them, not the timer.
+FLUSH_WORKERS = 8
+
+
+def _flush_due(batcher: "Batcher", token: int) -> None:
+    try:
+        batcher._flush_due(token)
+    except Exception:
+        logger.exception("scheduled batch flush failed")
+
+
+class _Flusher:
+    """One daemon thread that tracks the interval deadlines of every batcher.
+
+    Deadlines sit in a heap; a batcher that flushed early (by size or on
+    close) bumps its token, so its pending deadline is dropped when due.
+    The timer thread only hands due batchers to a small pool and never runs
+    a flush callback itself, so one slow flush cannot hold up the deadlines
+    of other batchers.
+    """
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._heap: list[tuple[float, int, "Batcher", int]] = []
+        self._seq = itertools.count()
+        self._pool = ThreadPoolExecutor(max_workers=FLUSH_WORKERS, thread_name_prefix="batch-flush")
+        self._thread = threading.Thread(target=self._run, name="batch-flusher", daemon=True)
+        self._thread.start()
+
+    def schedule(self, batcher: "Batcher", due: float, token: int) -> None:
+        with self._cond:
+            heapq.heappush(self._heap, (due, next(self._seq), batcher, token))
+            self._cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                    self._cond.wait(timeout)
+                _, _, batcher, token = heapq.heappop(self._heap)
+            if token == batcher._token:
+                self._pool.submit(_flush_due, batcher, token)
+
+
+_flusher: _Flusher | None = None
+_flusher_lock = threading.Lock()
+
+
+def _get_flusher() -> _Flusher:
+    global _flusher
+    if _flusher is None:
+        with _flusher_lock:
+            if _flusher is None:
+                _flusher = _Flusher()
+    return _flusher
+
+
+class Batcher(Generic[T]):
+    """Buffers items and hands them to ``flush`` in batches.
+
+    A batch goes out once ``max_size`` is buffered, as measured by ``size``
+    (one per item by default), or ``flush_interval_ms`` after its first
+    item, whichever comes first. ``flush`` runs under the batcher's lock, on
+    the adding thread or a shared flush worker, so batches never overlap or
+    reorder. ``close()`` flushes the tail; later adds are refused.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[list[T]], None],
+        flush_interval_ms: int,
+        max_size: int,
+        size: Callable[[T], int] | None = None,
+    ) -> None:
+        self._flush_batch = flush
+        self._interval = max(0, flush_interval_ms) / 1000
+        self._max_size = max(1, max_size)
+        self._size_of = size or (lambda item: 1)
+        self._lock = threading.RLock()
+        self._pending: list[T] = []
+        self._size = 0
+        self._token = 0
+        self._scheduled = False
+        self._closed = False
+        self.received = 0
+        self.batches = 0
+
+    def add(self, item: T) -> bool:
+        """Buffer ``item``; False when the batcher is already closed."""
+        with self._lock:
+            if self._closed:
+                return False
+            self.received += 1
+            self._pending.append(item)
+            self._size += self._size_of(item)
+            if self._size >= self._max_size or self._interval == 0:
+                self._flush()
+            elif not self._scheduled:
+                self._scheduled = True
+                _get_flusher().schedule(self, time.monotonic() + self._interval, self._token)
+            return True
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush()
+
+    def _flush_due(self, token: int) -> None:
+        with self._lock:
+            if token == self._token:
+                self._flush()
+
+    def _flush(self) -> None:
+        self._token += 1
+        self._scheduled = False
+        if not self._pending:
+            return
+        items = self._pending
+        self._pending = []
+        self._size = 0
+        self.batches += 1
+        self._flush_batch(items)
+
+    def close(self) -> bool:
+        """Flush the tail; False when the batcher was already closed."""
+        with self._lock:
+            if self._closed:
+                return False
+            self._flush()
+            self._closed = True
+            return True
@@ -0,0 +1,208 @@
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.core import metrics
+from app.core.config import normalize_provider, parse_int_map, settings
+from app.services.rate_limiter import get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class ProviderUnavailableError(RuntimeError):
+    """Raised instead of calling a provider whose circuit is open."""
+
+    code = "provider_unavailable"
+
+    def __init__(self, provider: str, retry_after: float) -> None:
+        super().__init__(f"{provider} is unavailable, retry in {retry_after:.0f}s")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+def is_provider_failure(exc: BaseException) -> bool:
+    # Client errors and 429s say nothing about the provider's health.
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    return isinstance(exc, httpx.TransportError)
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker for one provider endpoint.
+
+    ``failure_threshold`` consecutive failures (5xx, transport errors, or
+    calls slower than ``slow_call_ms``) open the circuit; calls then raise
+    ``ProviderUnavailableError`` without touching the network. After
+    ``open_seconds`` up to ``half_open_probes`` calls go through as probes:
+    one success closes the circuit, a failure opens it again.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        endpoint: str,
+        failure_threshold: int,
+        open_seconds: float,
+        half_open_probes: int,
+        slow_call_ms: int,
+    ) -> None:
+        self.provider = provider
+        self.endpoint = endpoint
+        self._failure_threshold = max(1, failure_threshold)
+        self._open_seconds = max(0.0, open_seconds)
+        self._half_open_probes = max(1, half_open_probes)
+        self._slow_call_ms = max(0, slow_call_ms)
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._export()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def _export(self) -> None:
+        metrics.set_gauge(
+            "circuit_breaker.state", _STATE_VALUES[self._state], provider=self.provider, endpoint=self.endpoint
+        )
+
+    def _transition(self, state: str) -> None:
+        if state == self._state:
+            return
+        logger.warning(
+            "circuit breaker provider=%s endpoint=%s %s -> %s failures=%s",
+            self.provider,
+            self.endpoint,
+            self._state,
+            state,
+            self._failures,
+        )
+        self._state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            metrics.increment("circuit_breaker.opened", provider=self.provider, endpoint=self.endpoint)
+        self._probes = 0
+        self._export()
+
+    def _admit(self, take_probe: bool) -> bool:
+        """Raise if the call must fail fast; return whether it is a probe."""
+        with self._lock:
+            if self._state == OPEN:
+                remaining = self._opened_at + self._open_seconds - time.monotonic()
+                if remaining > 0:
+                    self._reject(remaining)
+                self._transition(HALF_OPEN)
+            if self._state == CLOSED:
+                return False
+            if self._probes >= self._half_open_probes:
+                self._reject(self._open_seconds)
+            if take_probe:
+                self._probes += 1
+            return True
+
+    def _reject(self, retry_after: float) -> None:
+        metrics.increment("circuit_breaker.rejected", provider=self.provider, endpoint=self.endpoint)
+        raise ProviderUnavailableError(self.provider, retry_after)
+
+    def _record(self, probe: bool, failed: bool) -> None:
+        with self._lock:
+            if probe:
+                self._probes = max(0, self._probes - 1)
+            if not failed:
+                if probe or self._state == CLOSED:
+                    self._failures = 0
+                    self._transition(CLOSED)
+                return
+            self._failures += 1
+            if probe or (self._state == CLOSED and self._failures >= self._failure_threshold):
+                self._transition(OPEN)
+
+    def ensure_available(self) -> None:
+        """Fail fast without reserving a half-open probe."""
+        self._admit(take_probe=False)
+
+    @contextmanager
+    def guard(self, track_latency: bool = True) -> Iterator[None]:
+        """Run one provider call under the breaker.
+
+        Exceptions count as failures per ``is_provider_failure``; with
+        ``track_latency`` a call slower than the SLO counts as one too. Pass
+        ``track_latency=False`` for streams, whose length says nothing about
+        provider health.
+        """
+        probe = self._admit(take_probe=True)
+        started = time.monotonic()
+        try:
+            yield
+        except BaseException as exc:
+            self._record(probe, is_provider_failure(exc))
+            raise
+        elapsed_ms = (time.monotonic() - started) * 1000
+        slow = track_latency and self._slow_call_ms > 0 and elapsed_ms > self._slow_call_ms
+        if slow:
+            metrics.increment("circuit_breaker.slow_call", provider=self.provider, endpoint=self.endpoint)
+        self._record(probe, slow)
+
+
+_breakers: dict[tuple[str, str], CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(provider: str, endpoint_url: str) -> CircuitBreaker:
+    provider = normalize_provider(provider)
+    endpoint = urlsplit(endpoint_url).netloc or endpoint_url
+    key = (provider, endpoint)
+    breaker = _breakers.get(key)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(key)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    provider,
+                    endpoint,
+                    settings.circuit_breaker_failure_threshold,
+                    settings.circuit_breaker_open_seconds,
+                    settings.circuit_breaker_half_open_probes,
+                    parse_int_map(settings.circuit_breaker_slow_call_ms).get(provider, 0),
+                )
+                _breakers[key] = breaker
+    return breaker
+
+
+@contextmanager
+def provider_call(
+    provider: str, endpoint_url: str, api_key: str | None, track_latency: bool = True
+) -> Iterator[None]:
+    """Breaker check, rate limiter slot, then the guarded call.
+
+    The breaker is checked before queueing for a slot so an open circuit
+    fails fast, and latency is measured only once the slot is held.
+    """
+    breaker = get_breaker(provider, endpoint_url)
+    breaker.ensure_available()
+    with get_rate_limiter().slot(provider, api_key), breaker.guard(track_latency):
+        yield
+
+
+@asynccontextmanager
+async def provider_call_async(
+    provider: str, endpoint_url: str, api_key: str | None, track_latency: bool = True
+) -> AsyncIterator[None]:
+    breaker = get_breaker(provider, endpoint_url)
+    breaker.ensure_available()
+    async with get_rate_limiter().slot_async(provider, api_key):
+        with breaker.guard(track_latency):
+            yield
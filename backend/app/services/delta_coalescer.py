@@ -0,0 +1,93 @@
+import logging
+from typing import Callable
+
+from app.core import metrics
+from app.core.config import parse_int_map, settings
+from app.services.batcher import Batcher
+
+logger = logging.getLogger(__name__)
+DEFAULT_FLUSH_MS = 50
+DEFAULT_FLUSH_CHARS = 512
+
+
+class DeltaCoalescer:
+    """Batches streamed LLM deltas into fewer events.
+
+    Buffered text is flushed once ``max_chars`` accumulate or
+    ``flush_interval_ms`` after the first buffered delta, whichever comes
+    first. ``close()`` flushes the tail and records how many deltas were
+    received against how many events were published for the stream.
+    """
+
+    def __init__(
+        self,
+        emit: Callable[[str, str], None],
+        flush_interval_ms: int,
+        max_chars: int,
+        stream: str,
+        stream_id: str = "",
+    ) -> None:
+        self._emit = emit
+        self._stream = stream
+        self._stream_id = stream_id
+        self._batcher: Batcher[tuple[str, str]] = Batcher(
+            self._publish,
+            flush_interval_ms,
+            max_chars,
+            size=lambda item: len(item[0]) + len(item[1]),
+        )
+        self._empty_batches = 0
+
+    @property
+    def received(self) -> int:
+        return self._batcher.received
+
+    @property
+    def published(self) -> int:
+        return self._batcher.batches - self._empty_batches
+
+    def add(self, delta: str, reasoning: str = "") -> None:
+        self._batcher.add((delta or "", reasoning or ""))
+
+    def flush(self) -> None:
+        self._batcher.flush()
+
+    def _publish(self, items: list[tuple[str, str]]) -> None:
+        delta = "".join(item[0] for item in items)
+        reasoning = "".join(item[1] for item in items)
+        if not delta and not reasoning:
+            self._empty_batches += 1
+            return
+        # Runs under the batcher lock, which keeps timer and size flushes in order.
+        try:
+            self._emit(delta, reasoning)
+        except Exception:
+            logger.exception("delta flush failed stream=%s id=%s", self._stream, self._stream_id)
+
+    def close(self) -> None:
+        if not self._batcher.close():
+            return
+        metrics.increment("sse.deltas_received", self.received, stream=self._stream)
+        metrics.increment("sse.deltas_published", self.published, stream=self._stream)
+        metrics.increment("sse.deltas_coalesced", self.received - self.published, stream=self._stream)
+        logger.info(
+            "delta stream closed stream=%s id=%s received=%s published=%s",
+            self._stream,
+            self._stream_id,
+            self.received,
+            self.published,
+        )
+
+    def stats(self) -> dict:
+        received, published = self.received, self.published
+        return {
+            "received": received,
+            "published": published,
+            "coalesced": received - published,
+        }
+
+
+def coalescer_for_stream(stream: str, stream_id: str, emit: Callable[[str, str], None]) -> DeltaCoalescer:
+    flush_ms = parse_int_map(settings.sse_delta_flush_ms).get(stream, DEFAULT_FLUSH_MS)
+    flush_chars = parse_int_map(settings.sse_delta_flush_chars).get(stream, DEFAULT_FLUSH_CHARS)
+    return DeltaCoalescer(emit, flush_ms, flush_chars, stream, stream_id)
@@ -0,0 +1,225 @@
+import logging
+import select
+import itertools
+import threading
+import time
+from datetime import timedelta
+from typing import Any, Callable, Dict, List
+
+from sqlalchemy import delete, func, insert, select as sql_select, text
+
+from app.core.config import settings
+from app.db.models import BusEvent, utc_now
+from app.db.session import engine
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "zflow_events"
+# An id missing below a committed one usually belongs to a publish that has
+# not committed yet. Delivery waits this long for it, then moves past the gap
+# and keeps looking for the missing ids, delivering any that commit late.
+GAP_GRACE_SECONDS = 0.25
+MISSING_ID_TTL_SECONDS = 60
+MAX_MISSING_IDS = 1000
+REPLAY_BATCH = 500
+Handler = Callable[[str, int, Dict[str, Any]], None]
+
+
+class InProcessEventBus:
+    """Delivers events to handlers registered in the same process.
+
+    Every event gets a sequence number that increases across all keys. The
+    counter is seeded from the clock so ids stay increasing across restarts
+    and a stale Last-Event-ID never hides newer events.
+    """
+
+    def __init__(self) -> None:
+        self._handlers: Dict[str, List[Handler]] = {}
+        self._lock = threading.Lock()
+        self._seq = itertools.count(time.time_ns() // 1000)
+
+    def add_handler(self, channel: str, handler: Handler) -> None:
+        with self._lock:
+            self._handlers.setdefault(channel, []).append(handler)
+
+    def start(self) -> None:
+        return None
+
+    def stop(self) -> None:
+        return None
+
+    def publish(self, channel: str, key: str, payload: Dict[str, Any]) -> None:
+        # Numbering and delivery share the lock so subscribers always see
+        # sequences in increasing order.
+        with self._lock:
+            seq = next(self._seq)
+            self._dispatch(channel, key, seq, payload)
+
+    def _dispatch(self, channel: str, key: str, seq: int, payload: Dict[str, Any]) -> None:
+        handlers = list(self._handlers.get(channel, []))
+        for handler in handlers:
+            try:
+                handler(key, seq, payload)
+            except Exception:
+                logger.exception("event handler failed channel=%s key=%s", channel, key)
+
+
+class PostgresEventBus(InProcessEventBus):
+    """Fans events out to every API process through LISTEN/NOTIFY.
+
+    Payloads are stored in ``bus_events`` and only the row id is sent over
+    NOTIFY, which keeps large deltas clear of the 8000-byte notify limit.
+    Publishers do not deliver locally; their own listener receives the
+    notification like every other process, so ordering is the same everywhere.
+    The row id doubles as the event sequence, so ids match across processes.
+
+    NOTIFY is sent at commit, so notifications can arrive out of id order and
+    are only used as a wake-up: the listener reads every row after the last
+    id it delivered, in id order, and holds back at a gap for up to
+    ``GAP_GRACE_SECONDS``. Ids it then moves past are re-queried on every
+    wake-up for ``MISSING_ID_TTL_SECONDS`` and delivered late, out of order,
+    if their publish commits after all. The same read runs on every
+    (re)connect, so events published while the listener was down are
+    replayed.
+    """
+
+    def __init__(self, retention_seconds: int) -> None:
+        super().__init__()
+        self._retention = timedelta(seconds=retention_seconds)
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._last_id: int | None = None
+        self._gap_since: float | None = None
+        self._missing: Dict[int, float] = {}
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._listen_forever, name="event-bus-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def publish(self, channel: str, key: str, payload: Dict[str, Any]) -> None:
+        with engine.begin() as conn:
+            event_id = conn.execute(
+                insert(BusEvent)
+                .values(channel=channel, key=key, payload=payload, created_at=utc_now())
+                .returning(BusEvent.id)
+            ).scalar_one()
+            conn.execute(
+                text("SELECT pg_notify(:channel, :message)"),
+                {"channel": NOTIFY_CHANNEL, "message": str(event_id)},
+            )
+
+    def _listen_forever(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                self._listen()
+            except Exception:
+                logger.exception("event bus listener failed; reconnecting")
+                time.sleep(1)
+
+    def _listen(self) -> None:
+        raw = engine.raw_connection()
+        conn = raw.driver_connection
+        # The listener holds its connection for the life of the process, so it
+        # is detached rather than borrowed from the request pool.
+        raw.detach()
+        conn.rollback()
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+            if self._last_id is None:
+                with engine.connect() as db:
+                    self._last_id = db.execute(sql_select(func.coalesce(func.max(BusEvent.id), 0))).scalar_one()
+            logger.info("event bus listening channel=%s after_id=%s", NOTIFY_CHANNEL, self._last_id)
+            self._deliver_pending()
+            last_cleanup = time.monotonic()
+            while not self._stopped.is_set():
+                if self._gap_since is not None:
+                    timeout = 0.05
+                else:
+                    timeout = 1 if self._missing else 5
+                if select.select([conn], [], [], timeout) != ([], [], []):
+                    conn.poll()
+                    conn.notifies.clear()
+                    self._deliver_pending()
+                elif self._gap_since is not None or self._missing:
+                    self._deliver_pending()
+                if time.monotonic() - last_cleanup > 60:
+                    self._cleanup()
+                    last_cleanup = time.monotonic()
+        finally:
+            conn.close()
+
+    def _deliver_pending(self) -> None:
+        if self._missing:
+            self._deliver_late()
+        while True:
+            with engine.connect() as conn:
+                rows = conn.execute(
+                    sql_select(BusEvent.id, BusEvent.channel, BusEvent.key, BusEvent.payload)
+                    .where(BusEvent.id > self._last_id)
+                    .order_by(BusEvent.id)
+                    .limit(REPLAY_BATCH)
+                ).all()
+            for event_id, channel, key, payload in rows:
+                if event_id != self._last_id + 1:
+                    now = time.monotonic()
+                    if self._gap_since is None:
+                        self._gap_since = now
+                    if now - self._gap_since < GAP_GRACE_SECONDS:
+                        return
+                    self._remember_missing(self._last_id + 1, event_id, now)
+                self._gap_since = None
+                self._last_id = event_id
+                self._dispatch(channel, key, event_id, payload or {})
+            if len(rows) < REPLAY_BATCH:
+                return
+
+    def _remember_missing(self, first: int, end: int, now: float) -> None:
+        logger.info("event bus passed gap ids=%s-%s", first, end - 1)
+        for missing_id in range(max(first, end - MAX_MISSING_IDS), end):
+            self._missing[missing_id] = now
+
+    def _deliver_late(self) -> None:
+        now = time.monotonic()
+        for missing_id, since in list(self._missing.items()):
+            if now - since > MISSING_ID_TTL_SECONDS:
+                del self._missing[missing_id]
+        if not self._missing:
+            return
+        with engine.connect() as conn:
+            rows = conn.execute(
+                sql_select(BusEvent.id, BusEvent.channel, BusEvent.key, BusEvent.payload)
+                .where(BusEvent.id.in_(list(self._missing)))
+                .order_by(BusEvent.id)
+            ).all()
+        for event_id, channel, key, payload in rows:
+            del self._missing[event_id]
+            logger.warning("event bus delivering late id=%s channel=%s key=%s", event_id, channel, key)
+            self._dispatch(channel, key, event_id, payload or {})
+
+    def _cleanup(self) -> None:
+        with engine.begin() as conn:
+            conn.execute(delete(BusEvent).where(BusEvent.created_at < utc_now() - self._retention))
+
+
+_bus: InProcessEventBus | None = None
+_bus_lock = threading.Lock()
+
+
+def get_event_bus() -> InProcessEventBus:
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                backend = (settings.event_bus_backend or "memory").strip().lower()
+                if backend == "postgres":
+                    _bus = PostgresEventBus(settings.event_bus_retention_seconds)
+                else:
+                    _bus = InProcessEventBus()
+    return _bus
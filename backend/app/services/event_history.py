@@ -0,0 +1,48 @@
+from collections import deque
+from typing import Any, Dict, List, Tuple
+
+Event = Tuple[int, Dict[str, Any]]
+
+
+class EventHistory:
+    """Per-key ring buffer of ``(seq, payload)`` pairs.
+
+    Not thread-safe on its own; callers hold their module lock around it.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self._limit = limit
+        self._events: Dict[str, deque[Event]] = {}
+
+    def append(self, key: str, seq: int, payload: Dict[str, Any]) -> None:
+        events = self._events.get(key)
+        if events is None:
+            events = deque(maxlen=self._limit)
+            self._events[key] = events
+        events.append((seq, payload))
+
+    def since(self, key: str, last_seq: int | None) -> List[Event]:
+        events = self._events.get(key)
+        if not events:
+            return []
+        if last_seq is None:
+            return list(events)
+        # Filtered rather than scanned back to the first older seq: the
+        # postgres bus can deliver an event late, out of sequence order.
+        return [event for event in events if event[0] > last_seq]
+
+    def last(self, key: str) -> Event | None:
+        events = self._events.get(key)
+        return events[-1] if events else None
+
+    def clear(self, key: str) -> None:
+        self._events.pop(key, None)
+
+
+def parse_last_event_id(value: str | None) -> int | None:
+    if not value:
+        return None
+    try:
+        return int(value.strip())
+    except ValueError:
+        return None
@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from threading import Lock
+from typing import Any, Callable, Dict, List, Tuple
+
+from app.core import metrics
+from app.core.config import settings
+from app.services.event_history import Event, EventHistory
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = {"drop_oldest", "snapshot", "disconnect"}
+DeltaCheck = Callable[[Dict[str, Any]], bool]
+DeltaMerger = Callable[[Dict[str, Any], Dict[str, Any]], Dict[str, Any] | None]
+
+
+class SubscriberQueue:
+    """Bounded per-subscriber event queue owned by one event loop.
+
+    ``offer`` and ``get`` both run on the subscriber's loop. When the queue is
+    full the overflow policy decides what gives:
+
+    - ``drop_oldest`` discards the oldest queued delta;
+    - ``snapshot`` collapses runs of queued deltas into single merged events;
+    - ``disconnect`` closes the stream so the client reconnects and resumes
+      from history with Last-Event-ID.
+
+    If no delta can be dropped or merged, the subscriber is disconnected
+    rather than losing a non-delta event. ``get`` returns ``None`` once the
+    queue is closed.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        maxsize: int,
+        policy: str,
+        is_delta: DeltaCheck,
+        merge_deltas: DeltaMerger,
+        stream: str,
+    ) -> None:
+        self.loop = loop
+        self._items: deque[Event] = deque()
+        self._maxsize = max(1, maxsize)
+        self._policy = policy
+        self._is_delta = is_delta
+        self._merge = merge_deltas
+        self._stream = stream
+        self._ready = asyncio.Event()
+        self.closed = False
+        self.high_water = 0
+        self.dropped = 0
+
+    def offer(self, event: Event) -> None:
+        if self.closed:
+            return
+        if len(self._items) >= self._maxsize and not self._make_room():
+            self._close()
+            return
+        self._items.append(event)
+        if len(self._items) > self.high_water:
+            self.high_water = len(self._items)
+        self._ready.set()
+
+    def _make_room(self) -> bool:
+        metrics.increment("sse.queue_overflow", stream=self._stream, policy=self._policy)
+        if self._policy == "drop_oldest":
+            for index, (_seq, payload) in enumerate(self._items):
+                if self._is_delta(payload):
+                    del self._items[index]
+                    self.dropped += 1
+                    metrics.increment("sse.events_dropped", stream=self._stream)
+                    return True
+            return False
+        if self._policy == "snapshot":
+            before = len(self._items)
+            self._items = self._collapse(self._items)
+            merged = before - len(self._items)
+            metrics.increment("sse.events_collapsed", merged, stream=self._stream)
+            return merged > 0
+        return False
+
+    def _collapse(self, items: deque[Event]) -> deque[Event]:
+        collapsed: deque[Event] = deque()
+        for seq, payload in items:
+            if collapsed and self._is_delta(payload) and self._is_delta(collapsed[-1][1]):
+                merged = self._merge(collapsed[-1][1], payload)
+                if merged is not None:
+                    # The merged event keeps the newer id so resuming after it
+                    # does not replay anything it already contains.
+                    collapsed[-1] = (seq, merged)
+                    continue
+            collapsed.append((seq, payload))
+        return collapsed
+
+    def _close(self) -> None:
+        self.closed = True
+        self._items.clear()
+        self._ready.set()
+        metrics.increment("sse.subscribers_disconnected", stream=self._stream)
+        logger.warning("slow SSE subscriber disconnected stream=%s policy=%s", self._stream, self._policy)
+
+    async def get(self) -> Event | None:
+        while not self._items:
+            if self.closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        return self._items.popleft()
+
+    def qsize(self) -> int:
+        return len(self._items)
+
+
+class EventHub:
+    """History and asyncio subscribers for one kind of SSE stream.
+
+    Events are delivered from any thread; each subscriber queue is fed on its
+    own event loop, so waiting for events never ties up a worker thread.
+    ``is_delta`` and ``merge_deltas`` tell the slow-consumer policies which
+    events may be dropped or merged; ``merge_deltas`` returns ``None`` when two
+    deltas belong to different parts of the output.
+    """
+
+    def __init__(
+        self,
+        history_limit: int,
+        is_terminal: Callable[[Dict[str, Any]], bool],
+        ttl_seconds: int,
+        stream: str,
+        is_delta: DeltaCheck,
+        merge_deltas: DeltaMerger,
+    ) -> None:
+        self._history = EventHistory(history_limit)
+        self._is_terminal = is_terminal
+        self._ttl_seconds = ttl_seconds
+        self._stream = stream
+        self._is_delta = is_delta
+        self._merge_deltas = merge_deltas
+        self._subscribers: Dict[str, List[SubscriberQueue]] = {}
+        self._done_at: Dict[str, float] = {}
+        self._high_water = 0
+        self._lock = Lock()
+        policy = (settings.sse_overflow_policy or "").strip().lower()
+        if policy not in OVERFLOW_POLICIES:
+            logger.warning("unknown SSE_OVERFLOW_POLICY=%s; using drop_oldest", policy)
+            policy = "drop_oldest"
+        self._policy = policy
+
+    def _maybe_cleanup(self, now: float) -> None:
+        expired = [key for key, ts in self._done_at.items() if now - ts > self._ttl_seconds]
+        for key in expired:
+            self._history.clear(key)
+            self._subscribers.pop(key, None)
+            self._done_at.pop(key, None)
+
+    def deliver(self, key: str, seq: int, payload: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            self._history.append(key, seq, payload)
+            subscribers = list(self._subscribers.get(key, []))
+            if self._is_terminal(payload):
+                self._done_at[key] = now
+            self._maybe_cleanup(now)
+        for queue in subscribers:
+            queue.loop.call_soon_threadsafe(queue.offer, (seq, payload))
+
+    def clear(self, key: str) -> None:
+        with self._lock:
+            self._history.clear(key)
+            self._done_at.pop(key, None)
+
+    def subscribe(self, key: str, last_event_id: int | None = None) -> Tuple[SubscriberQueue, List[Event]]:
+        queue = SubscriberQueue(
+            asyncio.get_running_loop(),
+            settings.sse_subscriber_queue_size,
+            self._policy,
+            self._is_delta,
+            self._merge_deltas,
+            self._stream,
+        )
+        with self._lock:
+            self._subscribers.setdefault(key, []).append(queue)
+            history = self._history.since(key, last_event_id)
+            last = self._history.last(key)
+        # A client resuming after the stream ended gets the terminal event again
+        # so it stops reconnecting.
+        if not history and last and self._is_terminal(last[1]):
+            history = [last]
+        return queue, history
+
+    def unsubscribe(self, key: str, queue: SubscriberQueue) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(key, [])
+            remaining = [item for item in subscribers if item is not queue]
+            if remaining:
+                self._subscribers[key] = remaining
+            else:
+                self._subscribers.pop(key, None)
+            self._high_water = max(self._high_water, queue.high_water)
+            high_water = self._high_water
+        metrics.observe("sse.queue_high_water", queue.high_water, stream=self._stream)
+        metrics.set_gauge("sse.queue_high_water_max", high_water, stream=self._stream)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(items) for items in self._subscribers.values())
@@ -1,46 +1,65 @@
 import json
-from queue import Queue
-from threading import Lock
 from typing import Any, Dict, List, Tuple
 
+from app.services.event_bus import get_event_bus
+from app.services.event_history import Event
+from app.services.event_hub import EventHub, SubscriberQueue
+
+GENERATION_CHANNEL = "generation"
+GENERATION_RESET_CHANNEL = "generation.reset"
 HISTORY_LIMIT = 200
-_event_history: Dict[str, List[Dict[str, Any]]] = {}
-_subscribers: Dict[str, List[Queue]] = {}
-_lock = Lock()
+EVENT_TTL_SECONDS = 600
+TERMINAL_TYPES = {"generation.error", "done"}
+
+
+def _is_delta(payload: Dict[str, Any]) -> bool:
+    data = payload.get("data")
+    return payload.get("type") == "content_update" and isinstance(data, dict) and "delta" in data
+
+
+def _merge_deltas(older: Dict[str, Any], newer: Dict[str, Any]) -> Dict[str, Any] | None:
+    if older.get("section") != newer.get("section"):
+        return None
+    delta = (older["data"].get("delta") or "") + (newer["data"].get("delta") or "")
+    return {**newer, "data": {**newer["data"], "delta": delta}}
+
+
+_hub = EventHub(
+    HISTORY_LIMIT,
+    lambda payload: payload.get("type") in TERMINAL_TYPES,
+    EVENT_TTL_SECONDS,
+    GENERATION_CHANNEL,
+    _is_delta,
+    _merge_deltas,
+)
 
 
 def reset_generation_events(project_id: str) -> None:
-    with _lock:
-        _event_history[project_id] = []
+    get_event_bus().publish(GENERATION_RESET_CHANNEL, project_id, {})
 
 
 def publish_generation_event(project_id: str, payload: Dict[str, Any]) -> None:
-    with _lock:
-        history = _event_history.setdefault(project_id, [])
-        history.append(payload)
-        if len(history) > HISTORY_LIMIT:
-            _event_history[project_id] = history[-HISTORY_LIMIT:]
-        subscribers = list(_subscribers.get(project_id, []))
-    for queue in subscribers:
-        queue.put_nowait(payload)
-
-
-def subscribe_generation_events(project_id: str) -> Tuple[Queue, List[Dict[str, Any]]]:
-    queue: Queue = Queue()
-    with _lock:
-        _subscribers.setdefault(project_id, []).append(queue)
-        history = list(_event_history.get(project_id, []))
-    return queue, history
-
-
-def unsubscribe_generation_events(project_id: str, queue: Queue) -> None:
-    with _lock:
-        queues = _subscribers.get(project_id, [])
-        if queue in queues:
-            queues.remove(queue)
-        if not queues and project_id in _subscribers:
-            _subscribers.pop(project_id, None)
-
-
-def format_sse(payload: Dict[str, Any]) -> str:
-    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+    get_event_bus().publish(GENERATION_CHANNEL, project_id, payload)
+
+
+def _reset_history(project_id: str, _seq: int, _payload: Dict[str, Any]) -> None:
+    _hub.clear(project_id)
+
+
+def subscribe_generation_events(
+    project_id: str, last_event_id: int | None = None
+) -> Tuple[SubscriberQueue, List[Event]]:
+    return _hub.subscribe(project_id, last_event_id)
+
+
+def unsubscribe_generation_events(project_id: str, queue: SubscriberQueue) -> None:
+    _hub.unsubscribe(project_id, queue)
+
+
+get_event_bus().add_handler(GENERATION_CHANNEL, _hub.deliver)
+get_event_bus().add_handler(GENERATION_RESET_CHANNEL, _reset_history)
+
+
+def format_sse(payload: Dict[str, Any], seq: int | None = None) -> str:
+    event_id = f"id: {seq}\n" if seq is not None else ""
+    return f"{event_id}data: {json.dumps(payload, ensure_ascii=False)}\n\n"
@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import threading
+
+import httpx
+
+from app.core.config import normalize_provider, parse_int_map, settings
+
+logger = logging.getLogger(__name__)
+DEFAULT_POOL_SIZE = 20
+
+_lock = threading.Lock()
+_clients: dict[str, httpx.Client] = {}
+_async_clients: dict[tuple[str, int], httpx.AsyncClient] = {}
+
+
+def _use_http2(provider: str) -> bool:
+    providers = {normalize_provider(item) for item in settings.http2_providers.split(",")}
+    if provider not in providers:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("HTTP/2 requested for %s but h2 is not installed; using HTTP/1.1", provider)
+        return False
+    return True
+
+
+def _client_options(provider: str) -> dict:
+    pool_size = parse_int_map(settings.http_pool_max_connections).get(provider, DEFAULT_POOL_SIZE)
+    return {
+        "http2": _use_http2(provider),
+        "limits": httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=settings.http_keepalive_expiry_seconds,
+        ),
+        "timeout": httpx.Timeout(60.0),
+    }
+
+
+def get_http_client(provider: str) -> httpx.Client:
+    provider = normalize_provider(provider)
+    client = _clients.get(provider)
+    if client is None:
+        with _lock:
+            client = _clients.get(provider)
+            if client is None:
+                client = httpx.Client(**_client_options(provider))
+                _clients[provider] = client
+    return client
+
+
+def get_async_http_client(provider: str) -> httpx.AsyncClient:
+    # Async connections belong to the loop that opened them, so the API loop
+    # and each worker process loop get their own pool.
+    provider = normalize_provider(provider)
+    key = (provider, id(asyncio.get_running_loop()))
+    client = _async_clients.get(key)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(**_client_options(provider))
+        _async_clients[key] = client
+    return client
+
+
+async def aclose_http_clients() -> None:
+    loop_id = id(asyncio.get_running_loop())
+    for key in [key for key in _async_clients if key[1] == loop_id]:
+        client = _async_clients.pop(key)
+        await client.aclose()
+
+
+def close_http_clients() -> None:
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.core import metrics
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parents[2] / "cache" / "images"
+# Eviction trims the store to this share of the cap so the next few writes
+# do not each trigger a directory scan.
+_EVICT_TARGET = 0.9
+
+
+def image_cache_key(
+    provider: str,
+    model: str | None,
+    prompt: str,
+    size: str | None,
+    ref_images: list[str] | None = None,
+    seed: int | None = None,
+) -> str:
+    """Content address of one generation request.
+
+    Whitespace in the prompt is collapsed and reference URLs are sorted, so
+    requests that only differ in formatting or reference order share a key.
+    """
+    material = [
+        provider or "",
+        model or "",
+        " ".join((prompt or "").split()),
+        (size or "").strip().lower(),
+        sorted(ref_images or []),
+        seed,
+    ]
+    return hashlib.sha256(json.dumps(material, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class ImageResultCache:
+    """On-disk store of image generation results, one JSON file per key.
+
+    Entries older than ``ttl_seconds`` are misses and are removed on read.
+    A hit touches the file's mtime, and when the store grows past
+    ``max_bytes`` the least recently used files are deleted. Several
+    processes can share the directory: writes are atomic renames and each
+    eviction rescans the directory instead of trusting a local counter.
+    """
+
+    def __init__(self, root: Path, ttl_seconds: int, max_bytes: int) -> None:
+        self._root = root
+        self._ttl = max(0, ttl_seconds)
+        self._max_bytes = max(0, max_bytes)
+        self._lock = threading.Lock()
+        self._bytes: int | None = None
+
+    def _path(self, key: str) -> Path:
+        return self._root / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            logger.warning("image cache entry unreadable key=%s", key)
+            self._remove(path)
+            return None
+        if self._ttl and time.time() - float(entry.get("cached_at") or 0) > self._ttl:
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        result = entry.get("result")
+        return dict(result) if isinstance(result, dict) else None
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        path = self._path(key)
+        data = json.dumps({"cached_at": time.time(), "result": result}, ensure_ascii=False).encode("utf-8")
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        except OSError:
+            logger.exception("image cache write failed key=%s", key)
+            self._remove(tmp)
+            return
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = self._scan_bytes()
+            else:
+                self._bytes += len(data)
+            if self._max_bytes and self._bytes > self._max_bytes:
+                self._evict()
+            metrics.set_gauge("image_cache.bytes", self._bytes)
+
+    def _entries(self) -> list[tuple[float, int, Path]]:
+        entries = []
+        for path in self._root.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _scan_bytes(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self) -> None:
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = int(self._max_bytes * _EVICT_TARGET)
+        evicted = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            self._remove(path)
+            total -= size
+            evicted += 1
+        self._bytes = total
+        if evicted:
+            metrics.increment("image_cache.evicted", evicted)
+
+    def _remove(self, path: Path) -> None:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+_cache: ImageResultCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_image_cache() -> ImageResultCache | None:
+    """The shared cache, or None while IMAGE_CACHE_ENABLED is off."""
+    global _cache
+    if not settings.image_cache_enabled:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                root = Path(settings.image_cache_dir) if settings.image_cache_dir else DEFAULT_CACHE_DIR
+                _cache = ImageResultCache(root, settings.image_cache_ttl_seconds, settings.image_cache_max_bytes)
+    return _cache
@@ -1,11 +1,17 @@
+import asyncio
 import logging
 from datetime import datetime, timezone
 from pathlib import Path
 from urllib.parse import urlsplit, urlunsplit
 
-import requests
+import httpx
 
+from app.core import metrics
 from app.core.config import normalize_provider, settings
+from app.services.circuit_breaker import provider_call, provider_call_async
+from app.services.http_clients import get_async_http_client, get_http_client
+from app.services.image_cache import get_image_cache, image_cache_key
+from app.services.rate_limiter import RateLimitTimeout, get_rate_limiter, retry_after_seconds
 
 logger = logging.getLogger(__name__)
 PROMPT_PATH = Path(__file__).resolve().parents[3] / "worker" / "prompts" / "image" / "illustration_v1.txt"
@@ -15,6 +21,8 @@ SEEDREAM_SIZE_TOKENS = {"1K", "2K", "4K"}
 SEEDREAM_SIZE_HINT_PREFIX = "Aspect ratio"
 RAW_GITHUB_HOSTS = {"raw.githubusercontent.com"}
 CDN_GITHUB_HOST = "cdn.jsdelivr.net"
+SEEDREAM_MAX_ATTEMPTS = 3
+SEEDREAM_RETRY_BASE_SECONDS = 2.0
 DEFAULT_PROMPT = (
     "Create a clean, consistent 3:4 portrait illustration suitable for a short video storyboard frame.\n\n"
     "Scene summary: {{scene_summary}}\n"
@@ -43,12 +51,47 @@ class ImageService:
         self._provider = settings.image_provider
         self._prompt_template = self._load_prompt_template()
 
-    def generate_image(self, prompt: str, size: str | None = None, model: str | None = None) -> dict:
+    def provider_name(self) -> str:
+        return normalize_provider(self._provider) or "mock"
+
+    def generate_image(
+        self,
+        prompt: str,
+        size: str | None = None,
+        model: str | None = None,
+        seed: int | None = None,
+        bypass_cache: bool = False,
+    ) -> dict:
+        provider = normalize_provider(self._provider)
+        if not provider or provider == "mock":
+            return self._mock_output(prompt, size, model)
+        if provider == "seedream":
+            result = self.generate_seedream_image(
+                prompt, size=size, model=model, seed=seed, bypass_cache=bypass_cache
+            )
+        else:
+            logger.warning("Image provider %s not implemented; using mock output", provider)
+            result = self._mock_output(prompt, size, model)
+        if not result.get("url"):
+            logger.warning("Image generation returned no url; falling back to mock output")
+            return self._mock_output(prompt, size, model)
+        return result
+
+    async def generate_image_async(
+        self,
+        prompt: str,
+        size: str | None = None,
+        model: str | None = None,
+        seed: int | None = None,
+        bypass_cache: bool = False,
+    ) -> dict:
         provider = normalize_provider(self._provider)
         if not provider or provider == "mock":
             return self._mock_output(prompt, size, model)
         if provider == "seedream":
-            result = self.generate_seedream_image(prompt, size=size, model=model)
+            result = await self.generate_seedream_image_async(
+                prompt, size=size, model=model, seed=seed, bypass_cache=bypass_cache
+            )
         else:
             logger.warning("Image provider %s not implemented; using mock output", provider)
             result = self._mock_output(prompt, size, model)
@@ -164,9 +207,8 @@ class ImageService:
 
         return data.get("url") or data.get("image_url"), data.get("image_id")
 
-    def _seedream_request(self, payload: dict, prompt: str, model: str, size: str) -> dict:
-        api_key = settings.seedream_api_key
-        result = {
+    def _seedream_result(self, prompt: str, model: str, size: str) -> dict:
+        return {
             "provider": "seedream",
             "model": model,
             "url": None,
@@ -176,37 +218,53 @@ class ImageService:
             "request_id": None,
         }
 
-        if not api_key:
-            logger.error("Seedream provider selected but SEEDREAM_API_KEY is missing")
-            return result
+    def _seedream_headers(self, api_key: str) -> dict:
+        return {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {api_key}",
+        }
 
-        try:
-            response = requests.post(
-                self._seedream_endpoint(),
-                headers={
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {api_key}",
-                },
-                json=payload,
-                timeout=60,
-            )
-            response.raise_for_status()
-        except requests.HTTPError as exc:
-            status_code = exc.response.status_code if exc.response is not None else "unknown"
-            body = ""
-            if exc.response is not None:
-                body = exc.response.text or ""
-            logger.error(
-                "Seedream API error status=%s payload_keys=%s body=%s",
-                status_code,
-                list(payload.keys()),
-                body[:800],
-            )
-            return result
-        except requests.RequestException:
-            logger.exception("Seedream API request failed")
-            return result
+    def _log_seedream_http_error(self, exc: httpx.HTTPStatusError, payload: dict) -> None:
+        logger.error(
+            "Seedream API error status=%s payload_keys=%s body=%s",
+            exc.response.status_code,
+            list(payload.keys()),
+            (exc.response.text or "")[:800],
+        )
+
+    def _retry_rate_limited(self, exc: httpx.HTTPStatusError, api_key: str, attempt: int) -> bool:
+        # Only 429s are retried: the pause is shared through the limiter and
+        # the next attempt queues for its slot instead of sleeping here.
+        if exc.response.status_code != 429 or attempt >= SEEDREAM_MAX_ATTEMPTS - 1:
+            return False
+        delay = retry_after_seconds(exc.response, SEEDREAM_RETRY_BASE_SECONDS * (2**attempt))
+        get_rate_limiter().penalize("seedream", api_key, delay)
+        logger.warning("Seedream rate limited; retrying in %.1fs (attempt %s/%s)", delay, attempt + 1, SEEDREAM_MAX_ATTEMPTS)
+        return True
+
+    def _cache_key(self, payload: dict, size: str) -> str:
+        return image_cache_key(
+            "seedream", payload.get("model"), payload.get("prompt") or "", size, payload.get("images"), payload.get("seed")
+        )
+
+    def _cached_result(self, key: str, bypass_cache: bool) -> dict | None:
+        cache = get_image_cache()
+        if cache is None:
+            return None
+        if bypass_cache:
+            metrics.increment("image_cache.lookup", provider="seedream", result="bypass")
+            return None
+        result = cache.get(key)
+        metrics.increment("image_cache.lookup", provider="seedream", result="hit" if result else "miss")
+        return result
+
+    def _store_result(self, key: str, result: dict) -> dict:
+        cache = get_image_cache()
+        if cache is not None and result.get("url"):
+            cache.put(key, result)
+        return result
 
+    def _apply_seedream_response(self, result: dict, response: httpx.Response) -> dict:
         try:
             data = response.json()
         except ValueError:
@@ -223,6 +281,83 @@ class ImageService:
             result["image_id"] = image_id
         return result
 
+    def _seedream_request(
+        self, payload: dict, prompt: str, model: str, size: str, bypass_cache: bool = False
+    ) -> dict:
+        api_key = settings.seedream_api_key
+        result = self._seedream_result(prompt, model, size)
+        if not api_key:
+            logger.error("Seedream provider selected but SEEDREAM_API_KEY is missing")
+            return result
+        key = self._cache_key(payload, size)
+        cached = self._cached_result(key, bypass_cache)
+        if cached:
+            return cached
+
+        endpoint = self._seedream_endpoint()
+        for attempt in range(SEEDREAM_MAX_ATTEMPTS):
+            try:
+                with provider_call("seedream", endpoint, api_key):
+                    response = get_http_client("seedream").post(
+                        endpoint,
+                        headers=self._seedream_headers(api_key),
+                        json=payload,
+                        timeout=60,
+                    )
+                    response.raise_for_status()
+            except httpx.HTTPStatusError as exc:
+                self._log_seedream_http_error(exc, payload)
+                if self._retry_rate_limited(exc, api_key, attempt):
+                    continue
+                return result
+            except RateLimitTimeout:
+                logger.error("Seedream request gave up waiting for a rate limit slot")
+                return result
+            except httpx.HTTPError:
+                logger.exception("Seedream API request failed")
+                return result
+            return self._store_result(key, self._apply_seedream_response(result, response))
+        return result
+
+    async def _seedream_request_async(
+        self, payload: dict, prompt: str, model: str, size: str, bypass_cache: bool = False
+    ) -> dict:
+        api_key = settings.seedream_api_key
+        result = self._seedream_result(prompt, model, size)
+        if not api_key:
+            logger.error("Seedream provider selected but SEEDREAM_API_KEY is missing")
+            return result
+        key = self._cache_key(payload, size)
+        cached = await asyncio.to_thread(self._cached_result, key, bypass_cache)
+        if cached:
+            return cached
+
+        endpoint = self._seedream_endpoint()
+        for attempt in range(SEEDREAM_MAX_ATTEMPTS):
+            try:
+                async with provider_call_async("seedream", endpoint, api_key):
+                    response = await get_async_http_client("seedream").post(
+                        endpoint,
+                        headers=self._seedream_headers(api_key),
+                        json=payload,
+                        timeout=60,
+                    )
+                    response.raise_for_status()
+            except httpx.HTTPStatusError as exc:
+                self._log_seedream_http_error(exc, payload)
+                if self._retry_rate_limited(exc, api_key, attempt):
+                    continue
+                return result
+            except RateLimitTimeout:
+                logger.error("Seedream request gave up waiting for a rate limit slot")
+                return result
+            except httpx.HTTPError:
+                logger.exception("Seedream API request failed")
+                return result
+            result = self._apply_seedream_response(result, response)
+            return await asyncio.to_thread(self._store_result, key, result)
+        return result
+
     def build_prompt(self, scene_summary: str, mood: str, keywords: list[str] | str | None) -> str:
         summary_text = (scene_summary or "").strip() or "No scene summary provided."
         mood_text = (mood or "").strip() or "neutral"
@@ -238,7 +373,14 @@ class ImageService:
         prompt = prompt.replace("{{keywords}}", keywords_text)
         return prompt.strip()
 
-    def generate_seedream_image(self, prompt: str, size: str | None = None, model: str | None = None) -> dict:
+    def _seedream_payload(
+        self,
+        prompt: str,
+        size: str | None,
+        model: str | None,
+        ref_images: list[str] | None = None,
+        seed: int | None = None,
+    ) -> tuple[dict, str, str, str]:
         model = model or settings.seedream_model or "doubao-seedream-4.0"
         cleaned_prompt = (prompt or "").strip()
         requested_size = size or settings.seedream_default_size or "2K"
@@ -248,24 +390,17 @@ class ImageService:
         payload = {
             "model": model,
             "prompt": prompt_with_size or "No prompt provided.",
-            "watermark": False,
         }
+        if ref_images:
+            payload["images"] = ref_images
+        payload["watermark"] = False
         if seedream_size:
             payload["size"] = seedream_size
-        return self._seedream_request(payload, prompt_with_size, model, requested_size)
+        if seed is not None:
+            payload["seed"] = seed
+        return payload, prompt_with_size, model, requested_size
 
-    def generate_image_with_refs(
-        self,
-        prompt: str,
-        images: list[str],
-        size: str | None = None,
-        model: str | None = None,
-    ) -> dict:
-        provider = normalize_provider(self._provider)
-        if not provider or provider != "seedream":
-            return self.generate_image(prompt, size=size, model=model)
-
-        cleaned_prompt = (prompt or "").strip()
+    def _normalize_ref_images(self, images: list[str]) -> list[str]:
         ref_images = []
         for item in images:
             if isinstance(item, str) and item.strip():
@@ -275,21 +410,72 @@ class ImageService:
         if len(ref_images) > MAX_REFERENCE_IMAGES:
             ref_images = ref_images[:MAX_REFERENCE_IMAGES]
         ref_images = [url for url in ref_images if url.startswith("http://") or url.startswith("https://")]
-        ref_images = [self._convert_to_cdn_url(url) for url in ref_images if url]
+        return [self._convert_to_cdn_url(url) for url in ref_images if url]
 
+    def generate_seedream_image(
+        self,
+        prompt: str,
+        size: str | None = None,
+        model: str | None = None,
+        seed: int | None = None,
+        bypass_cache: bool = False,
+    ) -> dict:
+        payload, prompt_with_size, model, requested_size = self._seedream_payload(prompt, size, model, seed=seed)
+        return self._seedream_request(payload, prompt_with_size, model, requested_size, bypass_cache)
+
+    async def generate_seedream_image_async(
+        self,
+        prompt: str,
+        size: str | None = None,
+        model: str | None = None,
+        seed: int | None = None,
+        bypass_cache: bool = False,
+    ) -> dict:
+        payload, prompt_with_size, model, requested_size = self._seedream_payload(prompt, size, model, seed=seed)
+        return await self._seedream_request_async(payload, prompt_with_size, model, requested_size, bypass_cache)
+
+    def generate_image_with_refs(
+        self,
+        prompt: str,
+        images: list[str],
+        size: str | None = None,
+        model: str | None = None,
+        seed: int | None = None,
+        bypass_cache: bool = False,
+    ) -> dict:
+        provider = normalize_provider(self._provider)
+        if not provider or provider != "seedream":
+            return self.generate_image(
+                prompt, size=size, model=model, seed=seed, bypass_cache=bypass_cache
+            )
+
+        ref_images = self._normalize_ref_images(images)
         if not ref_images:
-            return self.generate_seedream_image(cleaned_prompt, size=size)
+            return self.generate_seedream_image(prompt, size=size, seed=seed, bypass_cache=bypass_cache)
+        payload, prompt_with_size, model, requested_size = self._seedream_payload(
+            prompt, size, model, ref_images, seed
+        )
+        return self._seedream_request(payload, prompt_with_size, model, requested_size, bypass_cache)
 
-        model = model or settings.seedream_model or "doubao-seedream-4.0"
-        requested_size = size or settings.seedream_default_size or "2K"
-        prompt_with_size = self._apply_size_hint(cleaned_prompt, requested_size)
-        seedream_size = self._normalize_seedream_size(requested_size)
-        payload = {
-            "model": model,
-            "prompt": prompt_with_size or "No prompt provided.",
-            "images": ref_images,
-            "watermark": False,
-        }
-        if seedream_size:
-            payload["size"] = seedream_size
-        return self._seedream_request(payload, prompt_with_size, model, requested_size)
+    async def generate_image_with_refs_async(
+        self,
+        prompt: str,
+        images: list[str],
+        size: str | None = None,
+        model: str | None = None,
+        seed: int | None = None,
+        bypass_cache: bool = False,
+    ) -> dict:
+        provider = normalize_provider(self._provider)
+        if not provider or provider != "seedream":
+            return await self.generate_image_async(
+                prompt, size=size, model=model, seed=seed, bypass_cache=bypass_cache
+            )
+
+        ref_images = self._normalize_ref_images(images)
+        if not ref_images:
+            return await self.generate_seedream_image_async(prompt, size=size, seed=seed, bypass_cache=bypass_cache)
+        payload, prompt_with_size, model, requested_size = self._seedream_payload(
+            prompt, size, model, ref_images, seed
+        )
+        return await self._seedream_request_async(payload, prompt_with_size, model, requested_size, bypass_cache)
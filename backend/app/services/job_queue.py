@@ -0,0 +1,180 @@
+import importlib
+import logging
+import os
+import socket
+import threading
+from typing import Callable
+
+import httpx
+from fastapi import BackgroundTasks
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.repositories import jobs as job_repo
+from app.services.circuit_breaker import ProviderUnavailableError
+from app.services.rate_limiter import RateLimitTimeout
+
+logger = logging.getLogger(__name__)
+
+# Handlers are referenced by import path so the worker can resolve them without
+# the API modules importing each other at startup.
+JOB_HANDLERS = {
+    "material_package.generate": "app.api.v1.material_packages:run_package_generation_job",
+    "material_package.images": "app.api.v1.material_packages:run_package_images_job",
+    "generation.run": "app.api.v1.generation:run_generation_job",
+    "export.run": "app.api.v1.exports:run_export_job",
+}
+
+# Worker stages get separate concurrency caps; "visual" and "video" have no
+# queued producers yet but are capped the same way once they do.
+JOB_STAGES = {
+    "material_package.generate": "script",
+    "generation.run": "script",
+    "material_package.images": "image",
+    "export.run": "render",
+}
+WORKER_STAGES = ("script", "visual", "render", "image", "video")
+
+# The job whose handler is running on this thread, so handlers can tell a
+# retry from a first run and whether their failure will be retried.
+_current = threading.local()
+
+
+def stage_for_kind(kind: str) -> str:
+    return JOB_STAGES.get(kind, "script")
+
+
+def kinds_for_stages(stages: list[str]) -> list[str]:
+    return [kind for kind, stage in JOB_STAGES.items() if stage in stages]
+
+
+def default_worker_id(prefix: str = "worker") -> str:
+    return f"{prefix}:{socket.gethostname()}:{os.getpid()}"
+
+
+def is_transient_failure(exc: BaseException) -> bool:
+    """Whether a job that failed with ``exc`` is worth running again."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code == 429
+    return isinstance(exc, (ProviderUnavailableError, RateLimitTimeout, SQLAlchemyError))
+
+
+def current_job_attempt() -> int:
+    """Attempt number of the job running on this thread; 1 outside a job."""
+    job = getattr(_current, "job", None)
+    return (job.get("attempts") or 1) if job else 1
+
+
+def job_will_retry(exc: BaseException) -> bool:
+    """Whether the job on this thread will run again if it fails with ``exc``.
+
+    Handlers that get True tell their listeners the run is being retried,
+    skip their terminal events and re-raise so the job is requeued. Only
+    worker mode retries: inline jobs are leased to the API process, and
+    nothing there claims a requeued job.
+    """
+    job = getattr(_current, "job", None)
+    if job is None or settings.job_execution_mode != "worker" or not is_transient_failure(exc):
+        return False
+    return (job.get("attempts") or 0) < (job.get("max_attempts") or 1)
+
+
+def resolve_job_handler(kind: str) -> Callable[[dict], None]:
+    target = JOB_HANDLERS.get(kind)
+    if not target:
+        raise ValueError(f"Unknown job kind: {kind}")
+    module_name, func_name = target.split(":", 1)
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+class _Heartbeat(threading.Thread):
+    def __init__(self, job_id: str, worker_id: str, lease_seconds: int) -> None:
+        super().__init__(name=f"job-heartbeat-{job_id[:8]}", daemon=True)
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.interval = max(1.0, lease_seconds / 3)
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            db = SessionLocal()
+            try:
+                if not job_repo.heartbeat_job(db, self.job_id, self.worker_id, self.lease_seconds):
+                    logger.warning("job lease lost job_id=%s worker_id=%s", self.job_id, self.worker_id)
+                    return
+            except SQLAlchemyError:
+                db.rollback()
+                logger.exception("job heartbeat failed job_id=%s", self.job_id)
+            finally:
+                db.close()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+
+def run_claimed_job(job: dict, worker_id: str) -> bool:
+    lease_seconds = settings.job_visibility_timeout_seconds
+    heartbeat = _Heartbeat(job["id"], worker_id, lease_seconds)
+    heartbeat.start()
+    error = None
+    # Inline jobs can start the next stage's job on the same thread.
+    outer_job = getattr(_current, "job", None)
+    _current.job = job
+    try:
+        handler = resolve_job_handler(job["kind"])
+        handler(job.get("payload") or {})
+    except Exception as exc:
+        logger.exception("job failed job_id=%s kind=%s", job["id"], job["kind"])
+        error = str(exc) or exc.__class__.__name__
+    finally:
+        _current.job = outer_job
+        heartbeat.stop()
+
+    db = SessionLocal()
+    try:
+        if error is None:
+            job_repo.complete_job(db, job["id"], worker_id)
+        else:
+            job_repo.fail_job(db, job["id"], worker_id, error, settings.job_retry_delay_seconds)
+    except SQLAlchemyError:
+        db.rollback()
+        logger.exception("job finalize failed job_id=%s", job["id"])
+    finally:
+        db.close()
+    return error is None
+
+
+def dispatch_job(
+    db: Session,
+    background_tasks: BackgroundTasks | None,
+    kind: str,
+    payload: dict,
+    project_id: str | None = None,
+) -> dict:
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    # "inline" keeps single-process deployments working without a worker: the
+    # API leases the job to itself, so a worker only picks it up if the lease
+    # expires (for example after an API restart). Without background_tasks the
+    # inline job runs in the calling thread, which is how one job hands off to
+    # the next stage.
+    inline = settings.job_execution_mode != "worker"
+    worker_id = default_worker_id("api") if inline else None
+    job = job_repo.enqueue_job(
+        db,
+        kind,
+        payload,
+        project_id=project_id,
+        max_attempts=settings.job_max_attempts,
+        worker_id=worker_id,
+        lease_seconds=settings.job_visibility_timeout_seconds,
+    )
+    if inline:
+        if background_tasks is None:
+            run_claimed_job(job, worker_id)
+        else:
+            background_tasks.add_task(run_claimed_job, job, worker_id)
+    return job
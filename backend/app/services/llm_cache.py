@@ -0,0 +1,158 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SQLITE_PATH = Path(__file__).resolve().parents[2] / "cache" / "llm_cache.sqlite3"
+
+
+def _digest(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def llm_cache_key(model: str, system_prompt: str, payload: dict, temperature: float) -> str:
+    material = [
+        model,
+        _digest(system_prompt or ""),
+        _digest(json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)),
+        round(float(temperature), 3),
+    ]
+    return _digest(json.dumps(material))
+
+
+def llm_cache_allows(temperature: float) -> bool:
+    # Sampling at a non-zero temperature gives a different answer each time,
+    # so those calls are only memoized when explicitly enabled.
+    return temperature == 0 or settings.llm_cache_nonzero_temperature
+
+
+class LLMCache(ABC):
+    """Memoized completions with a TTL.
+
+    Values are the raw completion text. Subclasses implement ``get`` and
+    ``put``; both must be safe to call from several threads.
+    """
+
+    backend = "base"
+
+    def __init__(self, ttl_seconds: int, max_entries: int) -> None:
+        self._ttl = max(1, ttl_seconds)
+        self._max_entries = max(1, max_entries)
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]: ...
+
+    @abstractmethod
+    def put(self, key: str, value: str) -> None: ...
+
+
+class MemoryLLMCache(LLMCache):
+    """Per-process LRU."""
+
+    backend = "memory"
+
+    def __init__(self, ttl_seconds: int, max_entries: int) -> None:
+        super().__init__(ttl_seconds, max_entries)
+        self._entries: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: str, value: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self._ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+
+class SqliteLLMCache(LLMCache):
+    """SQLite file shared by every process on the host, evicted LRU-first."""
+
+    backend = "sqlite"
+
+    def __init__(self, path: Path, ttl_seconds: int, max_entries: int) -> None:
+        super().__init__(ttl_seconds, max_entries)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, used_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_used_at ON llm_cache (used_at)")
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT value FROM llm_cache WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute("UPDATE llm_cache SET used_at = ? WHERE key = ?", (now, key))
+        except sqlite3.Error:
+            logger.exception("llm cache read failed")
+            return None
+        return row[0] if row else None
+
+    def put(self, key: str, value: str) -> None:
+        now = time.time()
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, used_at) VALUES (?, ?, ?, ?)",
+                    (key, value, now + self._ttl, now),
+                )
+                self._conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN ("
+                    "SELECT key FROM llm_cache ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                    (self._max_entries,),
+                )
+        except sqlite3.Error:
+            logger.exception("llm cache write failed")
+
+
+_cache: LLMCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache | None:
+    """The configured cache, or None when LLM_CACHE_BACKEND is off."""
+    global _cache
+    backend = (settings.llm_cache_backend or "off").strip().lower()
+    if backend in {"", "off", "none"}:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                ttl = settings.llm_cache_ttl_seconds
+                max_entries = settings.llm_cache_max_entries
+                if backend == "sqlite":
+                    path = Path(settings.llm_cache_path) if settings.llm_cache_path else DEFAULT_SQLITE_PATH
+                    _cache = SqliteLLMCache(path, ttl, max_entries)
+                else:
+                    _cache = MemoryLLMCache(ttl, max_entries)
+                logger.info("llm cache backend=%s", _cache.backend)
+    return _cache
@@ -1,11 +1,20 @@
 import json
 import logging
+import threading
 import time
 from pathlib import Path
 from typing import Callable
-from urllib import error, request
+from urllib.parse import urlsplit
 
+import httpx
+
+from app.core import metrics
 from app.core.config import normalize_provider, settings
+from app.services.circuit_breaker import ProviderUnavailableError, get_breaker, provider_call
+from app.services.http_clients import get_http_client
+from app.services.llm_cache import get_llm_cache, llm_cache_allows, llm_cache_key
+from app.services.rate_limiter import RateLimitTimeout, get_rate_limiter, retry_after_seconds
+from app.services.stage_graph import Stage, run_stage_graph
 
 logger = logging.getLogger(__name__)
 
@@ -649,11 +658,24 @@ class LLMService:
         allow_env_fallback: bool = True,
     ) -> None:
         self._provider = settings.llm_provider
-        self._last_error: str | None = None
+        # Package stages run concurrently on one service instance, so each
+        # thread keeps its own last error.
+        self._local = threading.local()
         self._api_key = api_key.strip() if isinstance(api_key, str) and api_key.strip() else None
         self._api_base = api_base.strip().rstrip("/") if isinstance(api_base, str) and api_base.strip() else None
         self._allow_env_fallback = allow_env_fallback
 
+    @property
+    def _last_error(self) -> str | None:
+        return getattr(self._local, "last_error", None)
+
+    @_last_error.setter
+    def _last_error(self, value: str | None) -> None:
+        self._local.last_error = value
+
+    def provider_name(self) -> str:
+        return normalize_provider(self._provider) or "mock"
+
     def _resolve_glm_api_key(self) -> str:
         if self._api_key:
             return self._api_key
@@ -908,10 +930,112 @@ class LLMService:
             raise ValueError("Invalid LLM output: storyboard missing")
         return normalized
 
+    def material_package_stages(
+        self,
+        prompt: str,
+        mode: str,
+        previous_package: dict | None = None,
+        feedback: str | None = None,
+        documents: list | None = None,
+        input_config: dict | None = None,
+        stage_delta: Callable[[str], Callable[[str, str], None] | None] | None = None,
+    ) -> list[Stage]:
+        """The staged package generation as a dependency graph.
+
+        Art style and characters only wait for the summary and run side by
+        side; characters see the previous package's art style (empty on a
+        first generation) rather than the new one. Scenes and storyboard
+        wait for everything before them. ``stage_delta(section)`` returns
+        the stream callback for a stage; results are keyed by stage name,
+        with ``summary`` holding ``(summary, keywords)``.
+        """
+        previous = previous_package if isinstance(previous_package, dict) else {}
+        previous_summary = _normalize_text(previous.get("summary"), "")
+        previous_art_style = previous.get("art_style") if isinstance(previous.get("art_style"), dict) else {}
+        previous_subjects = previous.get("subjects") if isinstance(previous.get("subjects"), list) else []
+        previous_scenes = previous.get("scenes") if isinstance(previous.get("scenes"), list) else []
+        previous_storyboard = previous.get("storyboard") if isinstance(previous.get("storyboard"), list) else []
+        common = {"documents": documents, "input_config": input_config, "feedback": feedback}
+
+        def _delta(section: str) -> Callable[[str, str], None] | None:
+            return stage_delta(section) if stage_delta else None
+
+        def _summary(results: dict) -> tuple[str, list[str]]:
+            return self.generate_summary(
+                prompt, mode, previous_summary=previous_summary, on_delta=_delta("summary"), **common
+            )
+
+        def _art_style(results: dict) -> dict:
+            return self.generate_art_style(
+                results["summary"][0],
+                prompt,
+                mode,
+                previous_art_style=previous_art_style,
+                on_delta=_delta("art_style"),
+                **common,
+            )
+
+        def _characters(results: dict) -> list[dict]:
+            return self.generate_characters(
+                results["summary"][0],
+                previous_art_style,
+                prompt,
+                mode,
+                previous_subjects=previous_subjects,
+                on_delta=_delta("characters"),
+                **common,
+            )
+
+        def _scenes(results: dict) -> list[dict]:
+            return self.generate_scenes(
+                results["summary"][0],
+                results["art_style"],
+                results["characters"],
+                prompt,
+                mode,
+                previous_scenes=previous_scenes,
+                on_delta=_delta("scenes"),
+                **common,
+            )
+
+        def _storyboard(results: dict) -> list[dict]:
+            return self.generate_storyboard(
+                results["summary"][0],
+                results["art_style"],
+                results["characters"],
+                results["scenes"],
+                prompt,
+                mode,
+                previous_storyboard=previous_storyboard,
+                on_delta=_delta("storyboard"),
+                **common,
+            )
+
+        return [
+            Stage("summary", _summary),
+            Stage("art_style", _art_style, after=("summary",)),
+            Stage("characters", _characters, after=("summary",)),
+            Stage("scenes", _scenes, after=("art_style", "characters")),
+            Stage("storyboard", _storyboard, after=("art_style", "characters", "scenes")),
+        ]
+
+    @staticmethod
+    def material_package_struct(results: dict) -> dict:
+        summary, keywords = results["summary"]
+        return {
+            "summary": summary,
+            "keywords": keywords,
+            "art_style": results["art_style"],
+            "subjects": results["characters"],
+            "scenes": results["scenes"],
+            "storyboard": results["storyboard"],
+        }
+
     def generate_material_package(
         self,
         prompt: str,
         mode: str,
+        tenant: str,
         previous_package: dict | None = None,
         feedback: str | None = None,
         documents: list | None = None,
@@ -923,70 +1047,16 @@ class LLMService:
                 "LLM provider is not configured for material package generation"
             )
             raise RuntimeError("LLM provider not configured")
-        previous_summary = _normalize_text(previous_package.get("summary"), "") if isinstance(previous_package, dict) else ""
-        previous_art_style = previous_package.get("art_style") if isinstance(previous_package, dict) else {}
-        previous_subjects = previous_package.get("subjects") if isinstance(previous_package, dict) else []
-        previous_scenes = previous_package.get("scenes") if isinstance(previous_package, dict) else []
-        previous_storyboard = previous_package.get("storyboard") if isinstance(previous_package, dict) else []
-
-        summary, keywords = self.generate_summary(
+        stages = self.material_package_stages(
             prompt,
             mode,
-            documents=documents,
-            input_config=input_config,
+            previous_package=previous_package,
             feedback=feedback,
-            previous_summary=previous_summary,
-        )
-        art_style = self.generate_art_style(
-            summary,
-            prompt,
-            mode,
-            documents=documents,
-            input_config=input_config,
-            feedback=feedback,
-            previous_art_style=previous_art_style if isinstance(previous_art_style, dict) else {},
-        )
-        subjects = self.generate_characters(
-            summary,
-            art_style,
-            prompt,
-            mode,
-            documents=documents,
-            input_config=input_config,
-            feedback=feedback,
-            previous_subjects=previous_subjects if isinstance(previous_subjects, list) else [],
-        )
-        scenes = self.generate_scenes(
-            summary,
-            art_style,
-            subjects,
-            prompt,
-            mode,
-            documents=documents,
-            input_config=input_config,
-            feedback=feedback,
-            previous_scenes=previous_scenes if isinstance(previous_scenes, list) else [],
-        )
-        storyboard = self.generate_storyboard(
-            summary,
-            art_style,
-            subjects,
-            scenes,
-            prompt,
-            mode,
             documents=documents,
             input_config=input_config,
-            feedback=feedback,
-            previous_storyboard=previous_storyboard if isinstance(previous_storyboard, list) else [],
         )
-        return {
-            "summary": summary,
-            "keywords": keywords,
-            "art_style": art_style,
-            "subjects": subjects,
-            "scenes": scenes,
-            "storyboard": storyboard,
-        }
+        run = run_stage_graph(stages, self.provider_name(), tenant)
+        return self.material_package_struct(run.results)
 
     def stream_material_package(
         self,
@@ -1066,22 +1136,17 @@ class LLMService:
             "temperature": 0.7,
         }
 
-        req = request.Request(
-            self._resolve_glm_endpoint(),
-            data=json.dumps(payload).encode("utf-8"),
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {api_key}",
-            },
-            method="POST",
-        )
-
         try:
-            with request.urlopen(req, timeout=180) as response:
-                response_text = response.read().decode("utf-8")
-        except error.HTTPError as exc:
-            logger.error("GLM API error: status=%s reason=%s", exc.code, exc.reason)
+            response_text = self._post_glm(api_key, payload).text
+        except httpx.HTTPStatusError as exc:
+            logger.error(
+                "GLM API error: status=%s reason=%s",
+                exc.response.status_code,
+                exc.response.reason_phrase,
+            )
             return self._mock_output(prompt)
+        except ProviderUnavailableError:
+            raise
         except Exception:
             logger.exception("GLM API request failed")
             return self._mock_output(prompt)
@@ -1151,48 +1216,46 @@ class LLMService:
                 "constraints": (prompt_parts.get("constraints") or "").strip(),
             }
 
-        req = request.Request(
-            self._resolve_glm_endpoint(),
-            data=json.dumps(
+        payload = {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": REWRITE_PROMPT},
                 {
-                    "model": model,
-                    "messages": [
-                        {"role": "system", "content": REWRITE_PROMPT},
-                        {
-                            "role": "user",
-                            "content": json.dumps(payload_context, ensure_ascii=True),
-                        },
-                    ],
-                    "temperature": 0.4,
-                }
-            ).encode("utf-8"),
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {api_key}",
-            },
-            method="POST",
-        )
+                    "role": "user",
+                    "content": json.dumps(payload_context, ensure_ascii=True),
+                },
+            ],
+            "temperature": 0.4,
+        }
 
-        try:
-            with request.urlopen(req, timeout=180) as response:
-                response_text = response.read().decode("utf-8")
-        except error.HTTPError as exc:
-            logger.error("GLM API error: status=%s reason=%s", exc.code, exc.reason)
-            return self._mock_rewrite(original_prompt, feedback)
-        except Exception:
-            logger.exception("GLM API request failed")
-            return self._mock_rewrite(original_prompt, feedback)
+        def _complete() -> str:
+            try:
+                response_text = self._post_glm(api_key, payload).text
+            except httpx.HTTPStatusError as exc:
+                logger.error(
+                    "GLM API error: status=%s reason=%s",
+                    exc.response.status_code,
+                    exc.response.reason_phrase,
+                )
+                return ""
+            except ProviderUnavailableError:
+                raise
+            except Exception:
+                logger.exception("GLM API request failed")
+                return ""
 
-        try:
-            data = json.loads(response_text)
-        except json.JSONDecodeError:
-            logger.error("GLM API response was not valid JSON")
-            return self._mock_rewrite(original_prompt, feedback)
+            try:
+                data = json.loads(response_text)
+            except json.JSONDecodeError:
+                logger.error("GLM API response was not valid JSON")
+                return ""
 
-        choices = data.get("choices") or []
-        message = choices[0].get("message", {}) if choices else {}
-        content = message.get("content") if isinstance(message, dict) else None
-        rewritten = (content or "").strip()
+            choices = data.get("choices") or []
+            message = choices[0].get("message", {}) if choices else {}
+            content = message.get("content") if isinstance(message, dict) else None
+            return (content or "").strip()
+
+        rewritten = self._cached_completion(REWRITE_PROMPT, payload_context, 0.4, _complete)
         return rewritten or self._mock_rewrite(original_prompt, feedback)
 
     def _mock_rewrite_summary(self, current_summary: str, feedback: str) -> str:
@@ -1288,7 +1351,7 @@ class LLMService:
             "current_style": _normalize_art_style(current_style or {}),
             "feedback": (feedback or "").strip(),
         }
-        content = self._call_glm(
+        content = self._call_glm_cached(
             ART_STYLE_REWRITE_PROMPT, payload_context, temperature=0.4
         )
         if not content:
@@ -1314,7 +1377,7 @@ class LLMService:
             "current_description": (current_description or "").strip(),
             "feedback": (feedback or "").strip(),
         }
-        content = self._call_glm(
+        content = self._call_glm_cached(
             STORYBOARD_REWRITE_PROMPT, payload_context, temperature=0.4
         )
         parsed = self._parse_json_dict(content)
@@ -1336,7 +1399,7 @@ class LLMService:
             "current_summary": (current_summary or "").strip(),
             "feedback": (feedback or "").strip(),
         }
-        content = self._call_glm(
+        content = self._call_glm_cached(
             SUMMARY_REWRITE_PROMPT, payload_context, temperature=0.4
         )
         parsed = self._parse_json_dict(content)
@@ -1356,7 +1419,7 @@ class LLMService:
             "current_subject": _normalize_subject_value(current_subject or {}),
             "feedback": (feedback or "").strip(),
         }
-        content = self._call_glm(
+        content = self._call_glm_cached(
             SUBJECT_REWRITE_PROMPT, payload_context, temperature=0.4
         )
         parsed = self._parse_json_dict(content)
@@ -1378,7 +1441,7 @@ class LLMService:
             "current_scene": _normalize_scene_value(current_scene or {}),
             "feedback": (feedback or "").strip(),
         }
-        content = self._call_glm(
+        content = self._call_glm_cached(
             SCENE_REWRITE_PROMPT, payload_context, temperature=0.4
         )
         parsed = self._parse_json_dict(content)
@@ -1387,6 +1450,63 @@ class LLMService:
             return _normalize_scene_value(current_scene or {})
         return rewritten
 
+    def _cached_completion(
+        self, system_prompt: str, payload_context: dict, temperature: float, complete: Callable[[], str]
+    ) -> str:
+        """Memoize ``complete()`` for repeated identical rewrite requests.
+
+        Empty results are failures and are never stored.
+        """
+        cache = get_llm_cache()
+        if cache is None or not llm_cache_allows(temperature):
+            return complete()
+        model = f"{urlsplit(self._resolve_glm_endpoint()).netloc}/{settings.glm_model}"
+        key = llm_cache_key(model, system_prompt, payload_context, temperature)
+        cached = cache.get(key)
+        metrics.increment("llm_cache.lookup", backend=cache.backend, result="miss" if cached is None else "hit")
+        if cached is not None:
+            return cached
+        content = complete()
+        if content:
+            cache.put(key, content)
+        return content
+
+    def _call_glm_cached(self, system_prompt: str, payload_context: dict, temperature: float = 0.4) -> str:
+        return self._cached_completion(
+            system_prompt,
+            payload_context,
+            temperature,
+            lambda: self._call_glm(system_prompt, payload_context, temperature=temperature),
+        )
+
+    def _glm_headers(self, api_key: str) -> dict:
+        return {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {api_key}",
+        }
+
+    def _post_glm(self, api_key: str, payload: dict) -> httpx.Response:
+        endpoint = self._resolve_glm_endpoint()
+        with provider_call("glm", endpoint, api_key):
+            response = get_http_client("glm").post(
+                endpoint,
+                headers=self._glm_headers(api_key),
+                content=json.dumps(payload).encode("utf-8"),
+                timeout=180,
+            )
+            response.raise_for_status()
+        return response
+
+    def _wait_before_retry(self, api_key: str, status: int, delay: float) -> None:
+        # Stop retrying as soon as the endpoint's circuit is open. A 429
+        # pauses the key for every caller; the retry then queues for its slot
+        # like any other request.
+        get_breaker("glm", self._resolve_glm_endpoint()).ensure_available()
+        if status == 429:
+            get_rate_limiter().penalize("glm", api_key, delay)
+        else:
+            time.sleep(delay)
+
     def _call_glm(
         self, system_prompt: str, payload_context: dict, temperature: float = 0.4
     ) -> str:
@@ -1402,68 +1522,53 @@ class LLMService:
             ",".join(sorted(payload_context.keys())),
         )
 
-        req = request.Request(
-            self._resolve_glm_endpoint(),
-            data=json.dumps(
+        payload = {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
                 {
-                    "model": model,
-                    "messages": [
-                        {"role": "system", "content": system_prompt},
-                        {
-                            "role": "user",
-                            "content": json.dumps(payload_context, ensure_ascii=True),
-                        },
-                    ],
-                    "temperature": temperature,
-                }
-            ).encode("utf-8"),
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {api_key}",
-            },
-            method="POST",
-        )
+                    "role": "user",
+                    "content": json.dumps(payload_context, ensure_ascii=True),
+                },
+            ],
+            "temperature": temperature,
+        }
 
         max_attempts = 5
         backoff_base = 2.0
         response_text = ""
         for attempt in range(max_attempts):
             try:
-                with request.urlopen(req, timeout=180) as response:
-                    response_text = response.read().decode("utf-8")
+                response_text = self._post_glm(api_key, payload).text
                 break
-            except error.HTTPError as exc:
-                logger.error("GLM API error: status=%s reason=%s", exc.code, exc.reason)
-                if exc.code == 429:
+            except httpx.HTTPStatusError as exc:
+                status = exc.response.status_code
+                logger.error(
+                    "GLM API error: status=%s reason=%s", status, exc.response.reason_phrase
+                )
+                if status == 429:
                     self._last_error = "rate_limited"
-                elif exc.code in {500, 502, 503, 504}:
+                elif status in {500, 502, 503, 504}:
                     self._last_error = "upstream_error"
-                should_retry = exc.code in {429, 500, 502, 503, 504} and attempt < max_attempts - 1
+                should_retry = status in {429, 500, 502, 503, 504} and attempt < max_attempts - 1
                 if should_retry:
-                    retry_after = None
-                    try:
-                        retry_after = exc.headers.get("Retry-After")
-                    except Exception:
-                        retry_after = None
-                    delay = None
-                    if isinstance(retry_after, str) and retry_after.strip():
-                        try:
-                            delay = float(retry_after.strip())
-                        except ValueError:
-                            delay = None
-                    if delay is None:
-                        delay = backoff_base * (2**attempt)
+                    delay = retry_after_seconds(exc.response, backoff_base * (2**attempt))
                     logger.warning("GLM request retrying in %.1fs (attempt %s/%s)", delay, attempt + 1, max_attempts)
-                    time.sleep(delay)
+                    self._wait_before_retry(api_key, status, delay)
                     continue
                 return ""
+            except ProviderUnavailableError:
+                raise
+            except RateLimitTimeout:
+                self._last_error = "rate_limited"
+                return ""
             except Exception:
                 logger.exception("GLM API request failed")
                 self._last_error = "request_failed"
                 if attempt < max_attempts - 1:
                     delay = backoff_base * (2**attempt)
                     logger.warning("GLM request retrying in %.1fs (attempt %s/%s)", delay, attempt + 1, max_attempts)
-                    time.sleep(delay)
+                    self._wait_before_retry(api_key, 0, delay)
                     continue
                 return ""
 
@@ -1517,21 +1622,19 @@ class LLMService:
             usage = None
             saw_done = False
             emitted = False
-            req = request.Request(
-                self._resolve_glm_endpoint(),
-                data=json.dumps(payload).encode("utf-8"),
-                headers={
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {api_key}",
-                },
-                method="POST",
-            )
             try:
-                with request.urlopen(req, timeout=180) as response:
-                    for raw_line in response:
-                        if not raw_line:
-                            continue
-                        line = raw_line.decode("utf-8").strip()
+                endpoint = self._resolve_glm_endpoint()
+                # Stream length tracks output size, not provider health.
+                with provider_call("glm", endpoint, api_key, track_latency=False), get_http_client("glm").stream(
+                    "POST",
+                    endpoint,
+                    headers=self._glm_headers(api_key),
+                    content=json.dumps(payload).encode("utf-8"),
+                    timeout=180,
+                ) as response:
+                    response.raise_for_status()
+                    for raw_line in response.iter_lines():
+                        line = raw_line.strip()
                         if not line or not line.startswith("data:"):
                             continue
                         data = line[len("data:") :].strip()
@@ -1565,38 +1668,34 @@ class LLMService:
                     "usage": usage,
                     "done": saw_done,
                 }
-            except error.HTTPError as exc:
-                logger.error("GLM API error: status=%s reason=%s", exc.code, exc.reason)
-                if exc.code == 429:
+            except httpx.HTTPStatusError as exc:
+                status = exc.response.status_code
+                logger.error(
+                    "GLM API error: status=%s reason=%s", status, exc.response.reason_phrase
+                )
+                if status == 429:
                     self._last_error = "rate_limited"
-                elif exc.code in {500, 502, 503, 504}:
+                elif status in {500, 502, 503, 504}:
                     self._last_error = "upstream_error"
                 if emitted:
                     break
-                should_retry = exc.code in {429, 500, 502, 503, 504} and attempt < max_attempts - 1
+                should_retry = status in {429, 500, 502, 503, 504} and attempt < max_attempts - 1
                 if should_retry:
-                    retry_after = None
-                    try:
-                        retry_after = exc.headers.get("Retry-After")
-                    except Exception:
-                        retry_after = None
-                    delay = None
-                    if isinstance(retry_after, str) and retry_after.strip():
-                        try:
-                            delay = float(retry_after.strip())
-                        except ValueError:
-                            delay = None
-                    if delay is None:
-                        delay = backoff_base * (2**attempt)
+                    delay = retry_after_seconds(exc.response, backoff_base * (2**attempt))
                     logger.warning(
                         "GLM stream retrying in %.1fs (attempt %s/%s)",
                         delay,
                         attempt + 1,
                         max_attempts,
                     )
-                    time.sleep(delay)
+                    self._wait_before_retry(api_key, status, delay)
                     continue
                 break
+            except ProviderUnavailableError:
+                raise
+            except RateLimitTimeout:
+                self._last_error = "rate_limited"
+                break
             except Exception:
                 logger.exception("GLM API stream request failed")
                 self._last_error = "request_failed"
@@ -1610,7 +1709,7 @@ class LLMService:
                         attempt + 1,
                         max_attempts,
                     )
-                    time.sleep(delay)
+                    self._wait_before_retry(api_key, 0, delay)
                     continue
                 break
 
@@ -0,0 +1,151 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from app.core import metrics
+from app.core.config import normalize_provider, parse_int_map, settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _WorkItem:
+    provider: str
+    tenant: str
+    fn: Callable[..., Any]
+    args: tuple
+    kwargs: dict
+    future: Future = field(default_factory=Future)
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class ProviderExecutor:
+    """Shared pool for outbound provider calls.
+
+    At most ``max_workers`` calls run at once process-wide and at most
+    ``provider_limits[provider]`` per provider. Pending work is queued per
+    tenant (package or user) and served round-robin, so one large storyboard
+    cannot starve everyone else.
+    """
+
+    def __init__(self, max_workers: int, provider_limits: dict[str, int] | None = None) -> None:
+        self._max_workers = max(1, max_workers)
+        self._provider_limits = provider_limits or {}
+        self._cond = threading.Condition()
+        self._queues: dict[str, deque[_WorkItem]] = {}
+        self._tenants: deque[str] = deque()
+        self._running: dict[str, int] = {}
+        self._pending = 0
+        self._threads: list[threading.Thread] = []
+
+    def _limit(self, provider: str) -> int:
+        return max(1, self._provider_limits.get(provider, self._max_workers))
+
+    def submit(self, provider: str, tenant: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        item = _WorkItem(
+            provider=normalize_provider(provider) or "default",
+            tenant=tenant or "default",
+            fn=fn,
+            args=args,
+            kwargs=kwargs,
+        )
+        with self._cond:
+            queue = self._queues.get(item.tenant)
+            if queue is None:
+                queue = deque()
+                self._queues[item.tenant] = queue
+                self._tenants.append(item.tenant)
+            queue.append(item)
+            self._pending += 1
+            self._record_depth(item.provider)
+            if len(self._threads) < self._max_workers:
+                thread = threading.Thread(
+                    target=self._work,
+                    name=f"provider-executor-{len(self._threads)}",
+                    daemon=True,
+                )
+                self._threads.append(thread)
+                thread.start()
+            self._cond.notify()
+        metrics.increment("provider_executor.submitted", provider=item.provider)
+        return item.future
+
+    def _record_depth(self, provider: str) -> None:
+        metrics.set_gauge("provider_executor.queue_depth", self._pending)
+        metrics.set_gauge("provider_executor.running", self._running.get(provider, 0), provider=provider)
+
+    def _next_item(self) -> _WorkItem | None:
+        for _ in range(len(self._tenants)):
+            tenant = self._tenants[0]
+            self._tenants.rotate(-1)
+            queue = self._queues[tenant]
+            for index, item in enumerate(queue):
+                if self._running.get(item.provider, 0) >= self._limit(item.provider):
+                    continue
+                del queue[index]
+                if not queue:
+                    del self._queues[tenant]
+                    self._tenants.remove(tenant)
+                return item
+        return None
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                item = self._next_item()
+                while item is None:
+                    self._cond.wait()
+                    item = self._next_item()
+                self._pending -= 1
+                self._running[item.provider] = self._running.get(item.provider, 0) + 1
+                self._record_depth(item.provider)
+
+            wait_ms = (time.monotonic() - item.enqueued_at) * 1000
+            metrics.observe("provider_executor.wait_ms", wait_ms, provider=item.provider)
+            if item.future.set_running_or_notify_cancel():
+                started_at = time.monotonic()
+                try:
+                    item.future.set_result(item.fn(*item.args, **item.kwargs))
+                except BaseException as exc:
+                    item.future.set_exception(exc)
+                metrics.observe(
+                    "provider_executor.run_ms",
+                    (time.monotonic() - started_at) * 1000,
+                    provider=item.provider,
+                )
+
+            with self._cond:
+                self._running[item.provider] -= 1
+                self._record_depth(item.provider)
+                # A freed provider slot can unblock work queued behind it.
+                self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "max_workers": self._max_workers,
+                "threads": len(self._threads),
+                "pending": self._pending,
+                "tenants": len(self._tenants),
+                "running": dict(self._running),
+            }
+
+
+_executor: ProviderExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_provider_executor() -> ProviderExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProviderExecutor(
+                    settings.provider_executor_max_workers,
+                    parse_int_map(settings.provider_concurrency),
+                )
+    return _executor
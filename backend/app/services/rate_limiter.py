@@ -0,0 +1,207 @@
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator
+
+import httpx
+
+from app.core import metrics
+from app.core.config import normalize_provider, parse_float_map, parse_int_map, settings
+
+logger = logging.getLogger(__name__)
+
+# Async waiters cannot sleep on the condition, so they re-check this often
+# while every concurrency slot is taken.
+_ASYNC_POLL_SECONDS = 0.05
+
+
+class RateLimitTimeout(RuntimeError):
+    def __init__(self, provider: str, waited: float) -> None:
+        super().__init__(f"{provider} rate limit: no slot after {waited:.1f}s")
+        self.provider = provider
+
+
+def retry_after_seconds(response: httpx.Response, default: float) -> float:
+    raw = response.headers.get("Retry-After")
+    try:
+        return max(0.0, float(raw.strip())) if raw and raw.strip() else default
+    except ValueError:
+        return default
+
+
+class _KeyLimit:
+    """Token bucket plus in-flight cap for one provider API key."""
+
+    def __init__(self, rate: float, burst: float, concurrency: int) -> None:
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.concurrency = concurrency
+        self.in_flight = 0
+
+    def try_acquire(self, now: float) -> float | None:
+        """Take a slot and return None, or return how long to wait first.
+
+        ``0`` means "until a running call finishes"."""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.concurrency and self.in_flight >= self.concurrency:
+            return 0.0
+        if self.rate > 0:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                return (1 - self.tokens) / self.rate
+            self.tokens -= 1
+        self.in_flight += 1
+        return None
+
+
+class ProviderRateLimiter:
+    """Proactive per-provider, per-API-key limits for outbound calls.
+
+    Each key gets a token bucket of ``rates[provider]`` requests per second
+    (bursting to ``bursts[provider]``) and at most ``concurrency[provider]``
+    calls in flight. Callers wrap each request in ``slot()``/``slot_async()``
+    and wait there instead of being rejected upstream; ``penalize()`` pauses a
+    key for every caller after a 429. Providers without a rate or concurrency
+    entry are not limited. Limits are per process.
+    """
+
+    def __init__(
+        self,
+        rates: dict[str, float],
+        bursts: dict[str, float],
+        concurrency: dict[str, int],
+        max_wait_seconds: float,
+    ) -> None:
+        self._rates = rates
+        self._bursts = bursts
+        self._concurrency = concurrency
+        self._max_wait = max(0.0, max_wait_seconds)
+        self._cond = threading.Condition()
+        self._limits: dict[tuple[str, str], _KeyLimit] = {}
+
+    def _limit(self, provider: str, api_key: str | None) -> _KeyLimit | None:
+        rate = self._rates.get(provider, 0.0)
+        concurrency = self._concurrency.get(provider, 0)
+        if rate <= 0 and concurrency <= 0:
+            return None
+        # Keys are only held as a digest so they never reach logs or metrics.
+        key = (provider, hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16])
+        limit = self._limits.get(key)
+        if limit is None:
+            limit = _KeyLimit(rate, self._bursts.get(provider, max(1.0, rate)), concurrency)
+            self._limits[key] = limit
+        return limit
+
+    def _acquire(self, provider: str, api_key: str | None) -> _KeyLimit | None:
+        started = time.monotonic()
+        deadline = started + self._max_wait
+        with self._cond:
+            limit = self._limit(provider, api_key)
+            if limit is None:
+                return None
+            while True:
+                now = time.monotonic()
+                wait = limit.try_acquire(now)
+                if wait is None:
+                    break
+                if now >= deadline:
+                    self._timed_out(provider, now - started)
+                self._cond.wait(min(wait, deadline - now) if wait else deadline - now)
+        self._waited(provider, started)
+        return limit
+
+    async def _acquire_async(self, provider: str, api_key: str | None) -> _KeyLimit | None:
+        started = time.monotonic()
+        deadline = started + self._max_wait
+        while True:
+            with self._cond:
+                limit = self._limit(provider, api_key)
+                if limit is None:
+                    return None
+                now = time.monotonic()
+                wait = limit.try_acquire(now)
+            if wait is None:
+                break
+            if now >= deadline:
+                self._timed_out(provider, now - started)
+            await asyncio.sleep(min(wait or _ASYNC_POLL_SECONDS, deadline - now))
+        self._waited(provider, started)
+        return limit
+
+    def _release(self, limit: _KeyLimit | None) -> None:
+        if limit is None:
+            return
+        with self._cond:
+            limit.in_flight -= 1
+            self._cond.notify_all()
+
+    def _waited(self, provider: str, started: float) -> None:
+        metrics.observe("rate_limiter.wait_ms", (time.monotonic() - started) * 1000, provider=provider)
+
+    def _timed_out(self, provider: str, waited: float) -> None:
+        metrics.increment("rate_limiter.timeout", provider=provider)
+        logger.warning("rate limiter gave up provider=%s waited=%.1fs", provider, waited)
+        raise RateLimitTimeout(provider, waited)
+
+    @contextmanager
+    def slot(self, provider: str, api_key: str | None = None) -> Iterator[None]:
+        limit = self._acquire(normalize_provider(provider), api_key)
+        try:
+            yield
+        finally:
+            self._release(limit)
+
+    @asynccontextmanager
+    async def slot_async(self, provider: str, api_key: str | None = None) -> AsyncIterator[None]:
+        limit = await self._acquire_async(normalize_provider(provider), api_key)
+        try:
+            yield
+        finally:
+            self._release(limit)
+
+    def penalize(self, provider: str, api_key: str | None, seconds: float) -> None:
+        """Hold every caller of this key back for ``seconds`` (after a 429)."""
+        provider = normalize_provider(provider)
+        with self._cond:
+            limit = self._limit(provider, api_key)
+            if limit is None:
+                return
+            now = time.monotonic()
+            limit.blocked_until = max(limit.blocked_until, now + max(0.0, seconds))
+            # One request may go as soon as the pause ends; the rest refill.
+            limit.tokens = 1.0
+            limit.updated = limit.blocked_until
+        metrics.increment("rate_limiter.penalized", provider=provider)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                f"{provider}:{digest[:6]}": {"in_flight": limit.in_flight, "tokens": round(limit.tokens, 2)}
+                for (provider, digest), limit in self._limits.items()
+            }
+
+
+_limiter: ProviderRateLimiter | None = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> ProviderRateLimiter:
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = ProviderRateLimiter(
+                    parse_float_map(settings.provider_rate_limits),
+                    parse_float_map(settings.provider_rate_burst),
+                    parse_int_map(settings.provider_key_concurrency),
+                    settings.provider_rate_max_wait_seconds,
+                )
+    return _limiter
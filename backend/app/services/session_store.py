@@ -0,0 +1,397 @@
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+
+from app.core import metrics
+from app.core.config import settings
+from app.db.models import AuthSession, RevokedSessionToken, utc_now
+from app.db.session import SessionLocal
+from app.store import new_id
+
+logger = logging.getLogger(__name__)
+
+
+def _hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _aware(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes even for timezone-aware columns.
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class SessionStore(ABC):
+    """Login sessions with a TTL, refresh-token rotation and an LRU front cache.
+
+    ``get`` serves hot tokens from a per-process LRU whose entries live at
+    most ``cache_ttl_seconds``; a revoke in another worker is therefore seen
+    within that window. Subclasses implement ``_create``, ``_load``,
+    ``_rotate`` and ``_revoke``. Sessions are dicts with ``user_id``,
+    ``current_space`` and ``expires_at``; ``create`` and ``refresh`` also
+    return the new ``session_token`` and ``refresh_token``.
+    """
+
+    backend = "base"
+
+    def __init__(
+        self,
+        ttl_seconds: int,
+        refresh_ttl_seconds: int,
+        cache_size: int,
+        cache_ttl_seconds: int,
+    ) -> None:
+        self._ttl = timedelta(seconds=max(1, ttl_seconds))
+        self._refresh_ttl = timedelta(seconds=max(ttl_seconds, refresh_ttl_seconds))
+        self._cache_size = max(0, cache_size)
+        self._cache_ttl = max(0, cache_ttl_seconds)
+        self._cache: "OrderedDict[str, tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, user_id: str, current_space: Dict[str, Any]) -> Dict[str, Any]:
+        now = utc_now()
+        return self._create(user_id, current_space, now + self._ttl, now + self._refresh_ttl)
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        if not token:
+            return None
+        key = _hash_token(token)
+        cached = self._cache_get(key)
+        if cached is not None:
+            metrics.increment("auth.session_cache", result="hit")
+            return cached
+        metrics.increment("auth.session_cache", result="miss")
+        session = self._load(token)
+        if session is None or session["expires_at"] <= utc_now():
+            return None
+        self._cache_put(key, session)
+        return session
+
+    def refresh(self, refresh_token: str) -> Optional[Dict[str, Any]]:
+        """Swap a refresh token for a new session and refresh token pair.
+
+        The old refresh token (and, where the backend can, the old session
+        token) stops working.
+        """
+        if not refresh_token:
+            return None
+        now = utc_now()
+        session = self._rotate(refresh_token, now + self._ttl, now + self._refresh_ttl)
+        if session is not None:
+            previous = session.pop("previous_token_hash", None)
+            if previous:
+                self._cache_evict(previous)
+        return session
+
+    def revoke(self, token: str) -> None:
+        self._cache_evict(_hash_token(token))
+        self._revoke(token)
+
+    # The cache is keyed by token hash so a rotation, which only knows the
+    # stored hash of the old session token, can evict it.
+    def _cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self._cache_size or not self._cache_ttl:
+            return None
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic() or entry[1]["expires_at"] <= utc_now():
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return entry[1]
+
+    def _cache_put(self, key: str, session: Dict[str, Any]) -> None:
+        if not self._cache_size or not self._cache_ttl:
+            return
+        with self._lock:
+            self._cache[key] = (time.monotonic() + self._cache_ttl, session)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+    def _cache_evict(self, key: str) -> None:
+        with self._lock:
+            self._cache.pop(key, None)
+
+    @abstractmethod
+    def _create(
+        self,
+        user_id: str,
+        current_space: Dict[str, Any],
+        expires_at: datetime,
+        refresh_expires_at: datetime,
+    ) -> Dict[str, Any]: ...
+
+    @abstractmethod
+    def _load(self, token: str) -> Optional[Dict[str, Any]]: ...
+
+    @abstractmethod
+    def _rotate(
+        self, refresh_token: str, expires_at: datetime, refresh_expires_at: datetime
+    ) -> Optional[Dict[str, Any]]: ...
+
+    @abstractmethod
+    def _revoke(self, token: str) -> None: ...
+
+
+class DatabaseSessionStore(SessionStore):
+    """Sessions in the ``auth_sessions`` table, shared by every worker."""
+
+    backend = "db"
+
+    def _create(
+        self,
+        user_id: str,
+        current_space: Dict[str, Any],
+        expires_at: datetime,
+        refresh_expires_at: datetime,
+    ) -> Dict[str, Any]:
+        token = secrets.token_urlsafe(32)
+        refresh_token = secrets.token_urlsafe(32)
+        now = utc_now()
+        db = SessionLocal()
+        try:
+            # Logins are rare next to reads, so they also sweep dead sessions.
+            db.execute(delete(AuthSession).where(AuthSession.refresh_expires_at <= now))
+            db.add(
+                AuthSession(
+                    id=new_id(),
+                    token_hash=_hash_token(token),
+                    refresh_token_hash=_hash_token(refresh_token),
+                    user_id=user_id,
+                    current_space=current_space,
+                    expires_at=expires_at,
+                    refresh_expires_at=refresh_expires_at,
+                    created_at=now,
+                )
+            )
+            db.commit()
+        finally:
+            db.close()
+        return {
+            "session_token": token,
+            "refresh_token": refresh_token,
+            "user_id": user_id,
+            "current_space": current_space,
+            "expires_at": expires_at,
+        }
+
+    def _load(self, token: str) -> Optional[Dict[str, Any]]:
+        db = SessionLocal()
+        try:
+            row = db.execute(
+                select(AuthSession.user_id, AuthSession.current_space, AuthSession.expires_at).where(
+                    AuthSession.token_hash == _hash_token(token)
+                )
+            ).one_or_none()
+        finally:
+            db.close()
+        if row is None:
+            return None
+        return {"user_id": row.user_id, "current_space": row.current_space or {}, "expires_at": _aware(row.expires_at)}
+
+    def _rotate(
+        self, refresh_token: str, expires_at: datetime, refresh_expires_at: datetime
+    ) -> Optional[Dict[str, Any]]:
+        token = secrets.token_urlsafe(32)
+        new_refresh_token = secrets.token_urlsafe(32)
+        db = SessionLocal()
+        try:
+            row = db.execute(
+                select(AuthSession)
+                .where(AuthSession.refresh_token_hash == _hash_token(refresh_token))
+                .with_for_update()
+            ).scalar_one_or_none()
+            if row is None or _aware(row.refresh_expires_at) <= utc_now():
+                db.rollback()
+                return None
+            previous_token_hash = row.token_hash
+            row.token_hash = _hash_token(token)
+            row.refresh_token_hash = _hash_token(new_refresh_token)
+            row.expires_at = expires_at
+            row.refresh_expires_at = refresh_expires_at
+            row.refreshed_at = utc_now()
+            user_id = row.user_id
+            current_space = row.current_space or {}
+            db.commit()
+        finally:
+            db.close()
+        return {
+            "session_token": token,
+            "refresh_token": new_refresh_token,
+            "user_id": user_id,
+            "current_space": current_space,
+            "expires_at": expires_at,
+            "previous_token_hash": previous_token_hash,
+        }
+
+    def _revoke(self, token: str) -> None:
+        db = SessionLocal()
+        try:
+            db.execute(delete(AuthSession).where(AuthSession.token_hash == _hash_token(token)))
+            db.commit()
+        finally:
+            db.close()
+
+
+class SignedSessionStore(SessionStore):
+    """Self-contained tokens: an HMAC-SHA256 signed JSON body.
+
+    Any worker with the same ``SESSION_SECRET`` can verify a token without
+    a lookup of the session itself. A session's access and refresh tokens
+    share one ``jti``; logout and refresh write it to the
+    ``revoked_session_tokens`` denylist, which ``get`` and ``refresh``
+    check, so a logged-out session stops working and a refresh token can be
+    used once. Rows are kept until the refresh TTL has passed.
+    """
+
+    backend = "signed"
+
+    def __init__(self, secret: str, *args: Any) -> None:
+        if not secret:
+            raise RuntimeError("Missing required environment variable: SESSION_SECRET")
+        super().__init__(*args)
+        self._key = hashlib.sha256(secret.encode("utf-8")).digest()
+
+    def _sign(self, claims: Dict[str, Any]) -> str:
+        body = base64.urlsafe_b64encode(json.dumps(claims, separators=(",", ":")).encode()).rstrip(b"=")
+        signature = hmac.new(self._key, body, hashlib.sha256).digest()
+        return f"{body.decode()}.{base64.urlsafe_b64encode(signature).rstrip(b'=').decode()}"
+
+    def _verify(self, token: str, kind: str) -> Optional[Dict[str, Any]]:
+        body, _, signature = token.partition(".")
+        if not body or not signature:
+            return None
+        expected = base64.urlsafe_b64encode(
+            hmac.new(self._key, body.encode(), hashlib.sha256).digest()
+        ).rstrip(b"=")
+        if not hmac.compare_digest(expected, signature.encode()):
+            return None
+        try:
+            claims = json.loads(base64.urlsafe_b64decode(body + "=" * (-len(body) % 4)))
+        except ValueError:
+            return None
+        if not isinstance(claims, dict) or claims.get("typ") != kind:
+            return None
+        if not isinstance(claims.get("exp"), (int, float)) or claims["exp"] <= time.time():
+            return None
+        return claims
+
+    def _issue(
+        self,
+        user_id: str,
+        current_space: Dict[str, Any],
+        expires_at: datetime,
+        refresh_expires_at: datetime,
+    ) -> Dict[str, Any]:
+        claims = {"uid": user_id, "space": current_space, "jti": secrets.token_urlsafe(12)}
+        return {
+            "session_token": self._sign({**claims, "typ": "access", "exp": int(expires_at.timestamp())}),
+            "refresh_token": self._sign({**claims, "typ": "refresh", "exp": int(refresh_expires_at.timestamp())}),
+            "user_id": user_id,
+            "current_space": current_space,
+            "expires_at": expires_at,
+        }
+
+    def _is_revoked(self, jti: Any) -> bool:
+        if not isinstance(jti, str) or not jti:
+            return True
+        db = SessionLocal()
+        try:
+            return db.get(RevokedSessionToken, jti) is not None
+        finally:
+            db.close()
+
+    def _deny(self, jti: Any) -> bool:
+        """Add ``jti`` to the denylist; False if it was already there."""
+        if not isinstance(jti, str) or not jti:
+            return False
+        now = utc_now()
+        db = SessionLocal()
+        try:
+            db.add(RevokedSessionToken(jti=jti, expires_at=now + self._refresh_ttl, revoked_at=now))
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            return False
+        finally:
+            db.close()
+        return True
+
+    def _create(
+        self,
+        user_id: str,
+        current_space: Dict[str, Any],
+        expires_at: datetime,
+        refresh_expires_at: datetime,
+    ) -> Dict[str, Any]:
+        db = SessionLocal()
+        try:
+            # Logins are rare next to reads, so they also sweep the denylist.
+            db.execute(delete(RevokedSessionToken).where(RevokedSessionToken.expires_at <= utc_now()))
+            db.commit()
+        finally:
+            db.close()
+        return self._issue(user_id, current_space, expires_at, refresh_expires_at)
+
+    def _load(self, token: str) -> Optional[Dict[str, Any]]:
+        claims = self._verify(token, "access")
+        if claims is None or self._is_revoked(claims.get("jti")):
+            return None
+        return {
+            "user_id": claims.get("uid"),
+            "current_space": claims.get("space") or {},
+            "expires_at": datetime.fromtimestamp(claims["exp"], timezone.utc),
+        }
+
+    def _rotate(
+        self, refresh_token: str, expires_at: datetime, refresh_expires_at: datetime
+    ) -> Optional[Dict[str, Any]]:
+        claims = self._verify(refresh_token, "refresh")
+        # Denying the jti first makes a concurrent second use of the same
+        # refresh token lose on the primary key.
+        if claims is None or not self._deny(claims.get("jti")):
+            return None
+        return self._issue(claims.get("uid"), claims.get("space") or {}, expires_at, refresh_expires_at)
+
+    def _revoke(self, token: str) -> None:
+        claims = self._verify(token, "access")
+        if claims is not None:
+            self._deny(claims.get("jti"))
+
+
+_store: SessionStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                args = (
+                    settings.session_ttl_seconds,
+                    settings.session_refresh_ttl_seconds,
+                    settings.session_cache_size,
+                    settings.session_cache_ttl_seconds,
+                )
+                backend = (settings.session_backend or "db").strip().lower()
+                if backend == "signed":
+                    _store = SignedSessionStore(settings.session_secret, *args)
+                else:
+                    _store = DatabaseSessionStore(*args)
+                logger.info("session store backend=%s", _store.backend)
+    return _store
@@ -0,0 +1,132 @@
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from app.core import metrics
+from app.services.provider_executor import get_provider_executor
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    # Receives the results of every stage finished so far, keyed by name.
+    run: Callable[[dict[str, Any]], Any]
+    after: tuple[str, ...] = ()
+
+
+@dataclass
+class StageRun:
+    results: dict[str, Any] = field(default_factory=dict)
+    # Stage name -> (start, end) in ms since the run started, excluding the
+    # time a stage spent queued for an executor slot.
+    spans: dict[str, tuple[float, float]] = field(default_factory=dict)
+    wall_ms: float = 0.0
+    after: dict[str, tuple[str, ...]] = field(default_factory=dict)
+
+    def critical_path(self) -> list[str]:
+        """The chain of stages that determined when the run finished.
+
+        Walks back from the last stage to finish through whichever
+        dependency finished last.
+        """
+        if not self.spans:
+            return []
+        name = max(self.spans, key=lambda item: self.spans[item][1])
+        path = [name]
+        while True:
+            deps = [dep for dep in self.after.get(name, ()) if dep in self.spans]
+            if not deps:
+                break
+            name = max(deps, key=lambda item: self.spans[item][1])
+            path.append(name)
+        return list(reversed(path))
+
+    def timing(self) -> dict:
+        path = self.critical_path()
+        return {
+            "wall_ms": round(self.wall_ms, 1),
+            "critical_path": path,
+            "critical_path_ms": round(sum(self.spans[name][1] - self.spans[name][0] for name in path), 1),
+            "stages": {
+                name: {"start_ms": round(start, 1), "end_ms": round(end, 1)}
+                for name, (start, end) in self.spans.items()
+            },
+        }
+
+
+def _timed(stage: Stage, results: dict[str, Any]) -> tuple[Any, float, float]:
+    started = time.monotonic()
+    value = stage.run(results)
+    return value, started, time.monotonic()
+
+
+def run_stage_graph(
+    stages: list[Stage],
+    provider: str,
+    tenant: str,
+    on_done: Callable[[str, Any], None] | None = None,
+    on_failed: Callable[[str, BaseException], None] | None = None,
+) -> StageRun:
+    """Run ``stages`` on the provider executor as soon as their dependencies finish.
+
+    ``on_done`` and ``on_failed`` are called on the calling thread, in
+    completion order. After a failure no new stage starts; stages already
+    running are waited for, then the first error is re-raised unchanged.
+    """
+    names = {stage.name for stage in stages}
+    for stage in stages:
+        missing = [dep for dep in stage.after if dep not in names]
+        if missing:
+            raise ValueError(f"Stage {stage.name} depends on unknown stages {missing}")
+
+    executor = get_provider_executor()
+    run = StageRun(after={stage.name: stage.after for stage in stages})
+    pending = {stage.name: stage for stage in stages}
+    running: dict[Future, str] = {}
+    failure: tuple[str, BaseException] | None = None
+    started = time.monotonic()
+    while pending or running:
+        if failure is None:
+            for name, stage in list(pending.items()):
+                if all(dep in run.results for dep in stage.after):
+                    del pending[name]
+                    running[executor.submit(provider, tenant, _timed, stage, dict(run.results))] = name
+        if not running:
+            if failure is None:
+                raise ValueError(f"Stages {sorted(pending)} have cyclic dependencies")
+            break
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            name = running.pop(future)
+            try:
+                value, stage_start, stage_end = future.result()
+            except Exception as exc:
+                if failure is None:
+                    failure = (name, exc)
+                continue
+            run.results[name] = value
+            run.spans[name] = ((stage_start - started) * 1000, (stage_end - started) * 1000)
+            metrics.observe("stage_graph.stage_ms", (stage_end - stage_start) * 1000, stage=name)
+            if failure is None and on_done:
+                on_done(name, value)
+    run.wall_ms = (time.monotonic() - started) * 1000
+
+    if failure is not None:
+        if on_failed:
+            on_failed(*failure)
+        raise failure[1]
+    timing = run.timing()
+    metrics.observe("stage_graph.wall_ms", timing["wall_ms"])
+    metrics.observe("stage_graph.critical_path_ms", timing["critical_path_ms"])
+    logger.info(
+        "stage graph done tenant=%s wall_ms=%.0f critical_path=%s critical_path_ms=%.0f",
+        tenant,
+        timing["wall_ms"],
+        ">".join(timing["critical_path"]),
+        timing["critical_path_ms"],
+    )
+    return run
@@ -1,5 +1,8 @@
 import logging
 
+from sqlalchemy.orm import Session
+
+from app.repositories import users as user_repo
 from app.services.crypto import decrypt_secret
 
 logger = logging.getLogger(__name__)
@@ -37,3 +40,8 @@ def resolve_llm_overrides(user: object) -> dict:
         "api_key": api_key,
         "allow_fallback": bool(getattr(user, "is_platform_admin", False)),
     }
+
+
+def resolve_llm_overrides_for_user(db: Session, user_id: str | None) -> dict:
+    user = user_repo.get_user(db, user_id) if user_id else None
+    return resolve_llm_overrides(user)
@@ -2,9 +2,12 @@ import base64
 import logging
 from urllib.parse import urlsplit, urlunsplit
 
-import requests
+import httpx
 
 from app.core.config import require_api_key, require_provider, settings
+from app.services.circuit_breaker import provider_call, provider_call_async
+from app.services.http_clients import get_async_http_client, get_http_client
+from app.services.rate_limiter import RateLimitTimeout, get_rate_limiter, retry_after_seconds
 
 logger = logging.getLogger(__name__)
 RAW_GITHUB_HOSTS = {"raw.githubusercontent.com"}
@@ -14,26 +17,21 @@ DATA_URL_PREFIX = "data:"
 MAX_BASE64_BYTES = 10 * 1024 * 1024
 ALLOWED_IMAGE_TYPES = {"image/png", "image/jpeg", "image/jpg", "image/webp"}
 VIDU_ALLOWED_SIZES = {"1280x720", "1920x1080"}
+VIDU_RATE_LIMIT_PAUSE_SECONDS = 2.0
 
 
 class VideoService:
     def __init__(self) -> None:
         self._provider = settings.video_provider
 
-    def generate_video_from_image(
-        self,
-        prompt: str,
-        image_urls: list[str],
-        size: str | None = None,
-        model: str | None = None,
-    ) -> dict:
+    def _require_vidu(self) -> None:
         provider = require_provider(
             self._provider,
             {"vidu", "runway", "pika", "sora"},
             "VIDEO_PROVIDER",
         )
         if provider == "vidu":
-            return self._generate_vidu_video(prompt, image_urls, size, model)
+            return
         if provider == "runway":
             require_api_key(settings.runway_api_key, "RUNWAY_API_KEY")
             raise NotImplementedError("Runway provider not implemented")
@@ -45,24 +43,33 @@ class VideoService:
             raise NotImplementedError("Sora provider not implemented")
         raise RuntimeError("Unsupported video provider")
 
+    def generate_video_from_image(
+        self,
+        prompt: str,
+        image_urls: list[str],
+        size: str | None = None,
+        model: str | None = None,
+    ) -> dict:
+        self._require_vidu()
+        return self._generate_vidu_video(prompt, image_urls, size, model)
+
+    async def generate_video_from_image_async(
+        self,
+        prompt: str,
+        image_urls: list[str],
+        size: str | None = None,
+        model: str | None = None,
+    ) -> dict:
+        self._require_vidu()
+        return await self._generate_vidu_video_async(prompt, image_urls, size, model)
+
     def get_video_task_result(self, task_id: str) -> dict:
-        provider = require_provider(
-            self._provider,
-            {"vidu", "runway", "pika", "sora"},
-            "VIDEO_PROVIDER",
-        )
-        if provider == "vidu":
-            return self._get_vidu_task_result(task_id)
-        if provider == "runway":
-            require_api_key(settings.runway_api_key, "RUNWAY_API_KEY")
-            raise NotImplementedError("Runway provider not implemented")
-        if provider == "pika":
-            require_api_key(settings.pika_api_key, "PIKA_API_KEY")
-            raise NotImplementedError("Pika provider not implemented")
-        if provider == "sora":
-            require_api_key(settings.sora_api_key, "SORA_API_KEY")
-            raise NotImplementedError("Sora provider not implemented")
-        raise RuntimeError("Unsupported video provider")
+        self._require_vidu()
+        return self._get_vidu_task_result(task_id)
+
+    async def get_video_task_result_async(self, task_id: str) -> dict:
+        self._require_vidu()
+        return await self._get_vidu_task_result_async(task_id)
 
     def _video_endpoint(self) -> str:
         endpoint = (settings.vidu_video_endpoint or "").strip()
@@ -111,14 +118,7 @@ class VideoService:
         query = (parsed_url.query or "").lower()
         return any(marker in query for marker in SIGNED_QUERY_MARKERS)
 
-    def _download_as_data_url(self, url: str) -> str:
-        try:
-            response = requests.get(url, timeout=30)
-            response.raise_for_status()
-        except requests.RequestException:
-            logger.exception("Failed to download image for base64 conversion")
-            return ""
-
+    def _encode_data_url(self, response: httpx.Response) -> str:
         if len(response.content) > MAX_BASE64_BYTES:
             logger.warning("Image exceeds base64 size limit: %s bytes", len(response.content))
             return ""
@@ -133,7 +133,25 @@ class VideoService:
         encoded = base64.b64encode(response.content).decode("ascii")
         return f"{DATA_URL_PREFIX}{content_type};base64,{encoded}"
 
-    def _convert_jpeg_extension(self, url: str) -> str:
+    def _download_as_data_url(self, url: str) -> str:
+        try:
+            response = get_http_client("download").get(url, timeout=30, follow_redirects=True)
+            response.raise_for_status()
+        except httpx.HTTPError:
+            logger.exception("Failed to download image for base64 conversion")
+            return ""
+        return self._encode_data_url(response)
+
+    async def _download_as_data_url_async(self, url: str) -> str:
+        try:
+            response = await get_async_http_client("download").get(url, timeout=30, follow_redirects=True)
+            response.raise_for_status()
+        except httpx.HTTPError:
+            logger.exception("Failed to download image for base64 conversion")
+            return ""
+        return self._encode_data_url(response)
+
+    def _jpg_alternative(self, url: str) -> str:
         if not isinstance(url, str):
             return ""
         cleaned = url.strip()
@@ -142,41 +160,79 @@ class VideoService:
         parsed = urlsplit(cleaned)
         path = (parsed.path or "")
         if not path.lower().endswith(".jpeg"):
-            return cleaned
+            return ""
         alt_path = f"{path[:-5]}.jpg"
-        alt_url = urlunsplit((parsed.scheme, parsed.netloc, alt_path, parsed.query, parsed.fragment))
+        return urlunsplit((parsed.scheme, parsed.netloc, alt_path, parsed.query, parsed.fragment))
+
+    def _convert_jpeg_extension(self, url: str) -> str:
+        alt_url = self._jpg_alternative(url)
+        if not alt_url:
+            return (url or "").strip() if isinstance(url, str) else ""
         try:
-            response = requests.head(alt_url, timeout=10)
+            response = get_http_client("download").head(alt_url, timeout=10)
             if response.status_code < 400:
                 return alt_url
-        except requests.RequestException:
+        except httpx.HTTPError:
             logger.exception("Failed to validate .jpg replacement for video input")
-        return cleaned
+        return url.strip()
 
-    def _prepare_vidu_image_input(self, url: str) -> str:
+    async def _convert_jpeg_extension_async(self, url: str) -> str:
+        alt_url = self._jpg_alternative(url)
+        if not alt_url:
+            return (url or "").strip() if isinstance(url, str) else ""
+        try:
+            response = await get_async_http_client("download").head(alt_url, timeout=10)
+            if response.status_code < 400:
+                return alt_url
+        except httpx.HTTPError:
+            logger.exception("Failed to validate .jpg replacement for video input")
+        return url.strip()
+
+    def _classify_vidu_image_input(self, url: str) -> tuple[str, str]:
+        # Returns (action, url): "keep" to use as-is, "download" for signed
+        # URLs that must be inlined, "jpeg" to probe a .jpg twin.
         if not isinstance(url, str):
-            return ""
+            return "keep", ""
         cleaned = url.strip()
         if not cleaned:
-            return ""
+            return "keep", ""
         if cleaned.startswith(DATA_URL_PREFIX):
-            return cleaned
+            return "keep", cleaned
 
         parsed = urlsplit(cleaned)
         if parsed.scheme not in {"http", "https"}:
-            return ""
-
+            return "keep", ""
         if self._is_signed_url(parsed):
+            return "download", cleaned
+        return "jpeg", cleaned
+
+    def _prepare_vidu_image_input(self, url: str) -> str:
+        action, cleaned = self._classify_vidu_image_input(url)
+        if action == "download":
             data_url = self._download_as_data_url(cleaned)
             if data_url:
                 return data_url
             logger.warning("Signed image URL could not be converted to base64; using original URL")
             return cleaned
+        if action == "jpeg":
+            return self._convert_jpeg_extension(cleaned)
+        return cleaned
 
-        return self._convert_jpeg_extension(cleaned)
+    async def _prepare_vidu_image_input_async(self, url: str) -> str:
+        action, cleaned = self._classify_vidu_image_input(url)
+        if action == "download":
+            data_url = await self._download_as_data_url_async(cleaned)
+            if data_url:
+                return data_url
+            logger.warning("Signed image URL could not be converted to base64; using original URL")
+            return cleaned
+        if action == "jpeg":
+            return await self._convert_jpeg_extension_async(cleaned)
+        return cleaned
 
-    def _normalize_image_urls(self, image_urls: list[str]) -> list[str]:
-        urls: list[str] = []
+    def _candidate_image_urls(self, image_urls: list[str]) -> list[tuple[bool, str]]:
+        # (needs_prepare, url) pairs; data URLs pass through untouched.
+        candidates: list[tuple[bool, str]] = []
         for url in image_urls:
             if not isinstance(url, str):
                 continue
@@ -184,27 +240,45 @@ class VideoService:
             if not cleaned:
                 continue
             if cleaned.startswith(DATA_URL_PREFIX):
-                urls.append(cleaned)
+                candidates.append((False, cleaned))
                 continue
             if not (cleaned.startswith("http://") or cleaned.startswith("https://")):
                 continue
-            cdn_url = self._convert_to_cdn_url(cleaned)
-            prepared = self._prepare_vidu_image_input(cdn_url)
+            candidates.append((True, self._convert_to_cdn_url(cleaned)))
+        return candidates
+
+    def _normalize_image_urls(self, image_urls: list[str]) -> list[str]:
+        urls: list[str] = []
+        for needs_prepare, url in self._candidate_image_urls(image_urls):
+            prepared = self._prepare_vidu_image_input(url) if needs_prepare else url
             if prepared:
                 urls.append(prepared)
         return urls
 
-    def _generate_vidu_video(
+    async def _normalize_image_urls_async(self, image_urls: list[str]) -> list[str]:
+        urls: list[str] = []
+        for needs_prepare, url in self._candidate_image_urls(image_urls):
+            prepared = await self._prepare_vidu_image_input_async(url) if needs_prepare else url
+            if prepared:
+                urls.append(prepared)
+        return urls
+
+    def _vidu_headers(self, api_key: str) -> dict:
+        return {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {api_key}",
+        }
+
+    def _vidu_video_request(
         self,
         prompt: str,
-        image_urls: list[str],
+        urls: list[str],
         size: str | None,
         model: str | None,
-    ) -> dict:
+    ) -> tuple[dict, dict, str]:
         cleaned_prompt = (prompt or "").strip()
         model = self._video_model(model)
         size = self._video_size(size)
-        urls = self._normalize_image_urls(image_urls)
 
         if len(urls) > 1:
             logger.warning("Vidu only supports 1 image; extra images will be ignored")
@@ -231,32 +305,9 @@ class VideoService:
             "request_id": None,
             "task_status": None,
         }
-        if not image_input:
-            logger.error("Video generation requires at least one image_url")
-            return result
-        api_key = require_api_key(settings.vidu_api_key, "VIDU_API_KEY")
-
-        try:
-            response = requests.post(
-                self._video_endpoint(),
-                headers={
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {api_key}",
-                },
-                json=payload,
-                timeout=60,
-            )
-            if response.status_code >= 400:
-                logger.error(
-                    "BigModel video API error: status=%s body=%s",
-                    response.status_code,
-                    response.text,
-                )
-            response.raise_for_status()
-        except requests.RequestException:
-            logger.exception("BigModel video API request failed")
-            return result
+        return payload, result, image_input
 
+    def _apply_vidu_video_response(self, result: dict, response: httpx.Response) -> dict:
         try:
             data = response.json()
         except ValueError:
@@ -271,8 +322,91 @@ class VideoService:
         result["task_status"] = data.get("task_status")
         return result
 
-    def _get_vidu_task_result(self, task_id: str) -> dict:
-        result = {
+    def _log_vidu_error(self, label: str, response: httpx.Response) -> None:
+        if response.status_code >= 400:
+            logger.error(
+                "BigModel video %s: status=%s body=%s",
+                label,
+                response.status_code,
+                response.text,
+            )
+
+    def _note_rate_limited(self, api_key: str, response: httpx.Response) -> None:
+        if response.status_code == 429:
+            get_rate_limiter().penalize(
+                "vidu", api_key, retry_after_seconds(response, VIDU_RATE_LIMIT_PAUSE_SECONDS)
+            )
+
+    def _generate_vidu_video(
+        self,
+        prompt: str,
+        image_urls: list[str],
+        size: str | None,
+        model: str | None,
+    ) -> dict:
+        urls = self._normalize_image_urls(image_urls)
+        payload, result, image_input = self._vidu_video_request(prompt, urls, size, model)
+        if not image_input:
+            logger.error("Video generation requires at least one image_url")
+            return result
+        api_key = require_api_key(settings.vidu_api_key, "VIDU_API_KEY")
+
+        try:
+            endpoint = self._video_endpoint()
+            with provider_call("vidu", endpoint, api_key):
+                response = get_http_client("vidu").post(
+                    endpoint,
+                    headers=self._vidu_headers(api_key),
+                    json=payload,
+                    timeout=60,
+                )
+                self._log_vidu_error("API error", response)
+                self._note_rate_limited(api_key, response)
+                response.raise_for_status()
+        except RateLimitTimeout:
+            logger.error("BigModel video request gave up waiting for a rate limit slot")
+            return result
+        except httpx.HTTPError:
+            logger.exception("BigModel video API request failed")
+            return result
+        return self._apply_vidu_video_response(result, response)
+
+    async def _generate_vidu_video_async(
+        self,
+        prompt: str,
+        image_urls: list[str],
+        size: str | None,
+        model: str | None,
+    ) -> dict:
+        urls = await self._normalize_image_urls_async(image_urls)
+        payload, result, image_input = self._vidu_video_request(prompt, urls, size, model)
+        if not image_input:
+            logger.error("Video generation requires at least one image_url")
+            return result
+        api_key = require_api_key(settings.vidu_api_key, "VIDU_API_KEY")
+
+        try:
+            endpoint = self._video_endpoint()
+            async with provider_call_async("vidu", endpoint, api_key):
+                response = await get_async_http_client("vidu").post(
+                    endpoint,
+                    headers=self._vidu_headers(api_key),
+                    json=payload,
+                    timeout=60,
+                )
+                self._log_vidu_error("API error", response)
+                self._note_rate_limited(api_key, response)
+                response.raise_for_status()
+        except RateLimitTimeout:
+            logger.error("BigModel video request gave up waiting for a rate limit slot")
+            return result
+        except httpx.HTTPError:
+            logger.exception("BigModel video API request failed")
+            return result
+        return self._apply_vidu_video_response(result, response)
+
+    def _vidu_task_result(self, task_id: str) -> dict:
+        return {
             "provider": "vidu",
             "task_id": task_id,
             "task_status": None,
@@ -281,30 +415,8 @@ class VideoService:
             "request_id": None,
             "raw_response": None,
         }
-        if not task_id:
-            return result
-        api_key = require_api_key(settings.vidu_api_key, "VIDU_API_KEY")
-
-        try:
-            response = requests.get(
-                self._async_result_endpoint(task_id),
-                headers={
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {api_key}",
-                },
-                timeout=60,
-            )
-            if response.status_code >= 400:
-                logger.error(
-                    "BigModel video async-result error: status=%s body=%s",
-                    response.status_code,
-                    response.text,
-                )
-            response.raise_for_status()
-        except requests.RequestException:
-            logger.exception("BigModel video async-result request failed")
-            return result
 
+    def _apply_vidu_task_response(self, result: dict, response: httpx.Response) -> dict:
         try:
             data = response.json()
         except ValueError:
@@ -323,3 +435,53 @@ class VideoService:
             result["video_url"] = first.get("url")
             result["cover_image_url"] = first.get("cover_image_url")
         return result
+
+    def _get_vidu_task_result(self, task_id: str) -> dict:
+        result = self._vidu_task_result(task_id)
+        if not task_id:
+            return result
+        api_key = require_api_key(settings.vidu_api_key, "VIDU_API_KEY")
+
+        try:
+            endpoint = self._async_result_endpoint(task_id)
+            with provider_call("vidu", endpoint, api_key):
+                response = get_http_client("vidu").get(
+                    endpoint,
+                    headers=self._vidu_headers(api_key),
+                    timeout=60,
+                )
+                self._log_vidu_error("async-result error", response)
+                self._note_rate_limited(api_key, response)
+                response.raise_for_status()
+        except RateLimitTimeout:
+            logger.error("BigModel video async-result gave up waiting for a rate limit slot")
+            return result
+        except httpx.HTTPError:
+            logger.exception("BigModel video async-result request failed")
+            return result
+        return self._apply_vidu_task_response(result, response)
+
+    async def _get_vidu_task_result_async(self, task_id: str) -> dict:
+        result = self._vidu_task_result(task_id)
+        if not task_id:
+            return result
+        api_key = require_api_key(settings.vidu_api_key, "VIDU_API_KEY")
+
+        try:
+            endpoint = self._async_result_endpoint(task_id)
+            async with provider_call_async("vidu", endpoint, api_key):
+                response = await get_async_http_client("vidu").get(
+                    endpoint,
+                    headers=self._vidu_headers(api_key),
+                    timeout=60,
+                )
+                self._log_vidu_error("async-result error", response)
+                self._note_rate_limited(api_key, response)
+                response.raise_for_status()
+        except RateLimitTimeout:
+            logger.error("BigModel video async-result gave up waiting for a rate limit slot")
+            return result
+        except httpx.HTTPError:
+            logger.exception("BigModel video async-result request failed")
+            return result
+        return self._apply_vidu_task_response(result, response)
@@ -1,5 +1,4 @@
 from datetime import datetime, timezone
-from typing import Any, Dict
 from uuid import uuid4
 
 
@@ -10,9 +9,3 @@ def utc_now() -> str:
 def new_id() -> str:
     return str(uuid4())
 
-
-SESSIONS: Dict[str, Dict[str, Any]] = {}
-GENERATION_TASKS: Dict[str, Dict[str, Any]] = {}
-GENERATION_TRACES: Dict[str, str] = {}
-EXPORT_TASKS: Dict[str, Dict[str, Any]] = {}
-EXPORT_FILES: Dict[str, Dict[str, Any]] = {}
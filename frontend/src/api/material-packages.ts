@@ -13,6 +13,7 @@ export type MaterialPackage = {
   status: string;
   is_active?: boolean;
   summary?: string | null;
+  version?: number;
   materials?: Record<string, unknown>;
   created_at?: string;
   updated_at?: string;
@@ -26,9 +26,10 @@ export type Project = {
 
 export type ProjectListResponse = {
   list: Project[];
-  total: number;
+  total: number | null;
   page: number;
   page_size: number;
+  next_cursor?: string | null;
 };
 
 export async function fetchProjects(page = 1, pageSize = 20): Promise<ProjectListResponse> {
@@ -0,0 +1,145 @@
+"""Compare image lookup by full package scan against the package_assets index.
+
+Seeds N material packages (each with a few images stored both in the legacy
+materials blob and in package_assets), then times the old scan-every-package
+lookup against the indexed ``_find_image`` used by the images API. The seeded
+rows are removed afterwards.
+
+    DATABASE_URL=postgresql+psycopg2://... PYTHONPATH=backend \\
+        python scripts/bench_image_lookup.py 10000 100000
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+if not os.getenv("DATABASE_URL"):
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+
+from sqlalchemy import delete, insert
+
+from app.api.v1.images import _find_image
+from app.db.base import Base
+from app.db.migrations import run_migrations
+from app.db.models import MaterialPackage, PackageAsset, Project, utc_now
+from app.db.session import SessionLocal, engine
+from app.store import new_id
+
+IMAGES_PER_PACKAGE = 4
+CHUNK = 2000
+
+
+def _legacy_find_image(db, image_id: str):
+    for package in db.query(MaterialPackage).all():
+        materials = package.materials or {}
+        metadata = materials.get("metadata") if isinstance(materials, dict) else {}
+        images = metadata.get("images") if isinstance(metadata, dict) else []
+        for image in images or []:
+            if isinstance(image, dict) and image.get("id") == image_id:
+                return package, image, images
+    return None, None, None
+
+
+def _seed(db, project_id: str, count: int) -> list[str]:
+    now = utc_now()
+    image_ids: list[str] = []
+    for start in range(0, count, CHUNK):
+        packages = []
+        assets = []
+        for _ in range(min(CHUNK, count - start)):
+            package_id = new_id()
+            images = []
+            for position in range(IMAGES_PER_PACKAGE):
+                image = {
+                    "id": new_id(),
+                    "type": "storyboard",
+                    "shot_id": f"shot-{position}",
+                    "url": f"https://example.invalid/{package_id}/{position}.png",
+                    "is_active": True,
+                }
+                images.append(image)
+                assets.append(
+                    {
+                        "id": new_id(),
+                        "package_id": package_id,
+                        "asset_type": "image",
+                        "asset_id": image["id"],
+                        "kind": image["type"],
+                        "shot_id": image["shot_id"],
+                        "is_active": True,
+                        "task_id": None,
+                        "position": position,
+                        "data": image,
+                        "created_at": now,
+                        "updated_at": now,
+                    }
+                )
+            image_ids.append(images[-1]["id"])
+            packages.append(
+                {
+                    "id": package_id,
+                    "project_id": project_id,
+                    "package_name": "bench",
+                    "status": "completed",
+                    "is_active": False,
+                    "materials": {"metadata": {"images": images}},
+                    "created_at": now,
+                    "updated_at": now,
+                }
+            )
+        db.execute(insert(MaterialPackage), packages)
+        db.execute(insert(PackageAsset), assets)
+        db.commit()
+    return image_ids
+
+
+def _time(fn, db, image_ids: list[str], rounds: int) -> float:
+    samples = []
+    for image_id in random.sample(image_ids, rounds):
+        db.expunge_all()
+        started = time.perf_counter()
+        package, image, _ = fn(db, image_id)
+        samples.append((time.perf_counter() - started) * 1000)
+        assert image and image["id"] == image_id
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def _cleanup(db, project_id: str) -> None:
+    package_ids = db.query(MaterialPackage.id).filter(MaterialPackage.project_id == project_id)
+    db.execute(delete(PackageAsset).where(PackageAsset.package_id.in_(package_ids.scalar_subquery())))
+    db.execute(delete(MaterialPackage).where(MaterialPackage.project_id == project_id))
+    db.execute(delete(Project).where(Project.id == project_id))
+    db.commit()
+
+
+def main() -> None:
+    counts = [int(arg) for arg in sys.argv[1:]] or [10000, 100000]
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    for count in counts:
+        db = SessionLocal()
+        project_id = new_id()
+        try:
+            db.add(Project(id=project_id, name="bench-image-lookup", created_at=utc_now(), updated_at=utc_now()))
+            db.commit()
+            started = time.perf_counter()
+            image_ids = _seed(db, project_id, count)
+            seed_s = time.perf_counter() - started
+            scan_ms = _time(_legacy_find_image, db, image_ids, 3)
+            indexed_ms = _time(_find_image, db, image_ids, 200)
+            print(
+                f"packages={count} seed_s={seed_s:.1f} scan_p50_ms={scan_ms:.1f} "
+                f"indexed_p50_ms={indexed_ms:.2f} speedup={scan_ms / indexed_ms:.0f}x",
+                flush=True,
+            )
+        finally:
+            db.rollback()
+            _cleanup(db, project_id)
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
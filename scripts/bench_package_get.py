@@ -0,0 +1,158 @@
+"""Compare GET /material-packages/{id} latency on the async and sync DB paths.
+
+Starts the API in a child process on a local port with one extra route that
+serves the same package through the sync engine and threadpool (the
+pre-async handler), then drives each route with C concurrent clients for R
+requests apiece and prints p50/p95/p99 latency and the failure reasons.
+
+    DATABASE_URL=postgresql+psycopg2://... PYTHONPATH=backend \\
+        python scripts/bench_package_get.py 200 20
+"""
+
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Dict
+
+if not os.getenv("DATABASE_URL"):
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+
+import httpx
+import uvicorn
+from fastapi import Depends
+from sqlalchemy.orm import Session
+
+from app.api.v1.deps import get_current_user
+from app.api.v1.material_packages import _require_package_manage
+from app.api.v1.response import ok
+from app.db.base import Base
+from app.db.migrations import run_migrations
+from app.db.session import SessionLocal, engine, get_db
+from app.main import app
+from app.repositories import material_packages as package_repo
+from app.repositories import projects as project_repo
+from app.repositories import users as user_repo
+from app.services.session_store import get_session_store
+from app.store import new_id
+
+HOST = "127.0.0.1"
+PORT = int(os.getenv("BENCH_PORT", "8766"))
+BASE_URL = f"http://{HOST}:{PORT}"
+IMAGES = 20
+
+
+@app.get("/bench/sync/material-packages/{package_id}")
+def _sync_get_material_package(
+    package_id: str,
+    current_user: object = Depends(get_current_user),
+    db: Session = Depends(get_db),
+) -> Dict[str, Any]:
+    return ok(_require_package_manage(db, current_user, package_id))
+
+
+def _seed() -> tuple[str, str]:
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    db = SessionLocal()
+    try:
+        user = user_repo.create_user(db, f"bench-{new_id()[:8]}", "x", "x")
+        project = project_repo.create_project(db, "bench", "personal", None, user["id"], None, "private")
+        images = [
+            {"id": new_id(), "type": "storyboard", "shot_id": f"shot-{i}", "url": f"https://example.invalid/{i}.png"}
+            for i in range(IMAGES)
+        ]
+        package = package_repo.create_package(
+            db, project["id"], "bench", "completed", {"metadata": {"images": images}}
+        )
+    finally:
+        db.close()
+    token = get_session_store().create(user["id"], {})["session_token"]
+    return token, package["id"]
+
+
+def _serve() -> None:
+    uvicorn.run(app, host=HOST, port=PORT, log_level="warning")
+
+
+def _start_server() -> multiprocessing.Process:
+    # A separate process keeps the load generator off the server's GIL.
+    server = multiprocessing.get_context("spawn").Process(target=_serve, daemon=True)
+    server.start()
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"{BASE_URL}/health", timeout=1.0)
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("server did not start")
+
+
+async def _client(client: httpx.AsyncClient, url: str, rounds: int, latencies: list[float], failures: Counter) -> None:
+    for _ in range(rounds):
+        started = time.perf_counter()
+        try:
+            response = await client.get(url)
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - started) * 1000)
+        except httpx.HTTPStatusError as exc:
+            failures[str(exc.response.status_code)] += 1
+        except httpx.HTTPError as exc:
+            failures[type(exc).__name__] += 1
+
+
+def _percentile(samples: list[float], pct: float) -> float | None:
+    if not samples:
+        return None
+    return round(samples[min(len(samples) - 1, int(len(samples) * pct))], 1)
+
+
+async def _run(mode: str, url: str, token: str, clients: int, rounds: int) -> dict:
+    headers = {"Authorization": f"Bearer {token}"}
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    latencies: list[float] = []
+    failures: Counter = Counter()
+    async with httpx.AsyncClient(base_url=BASE_URL, headers=headers, limits=limits, timeout=60.0) as client:
+        await client.get(url)
+        started = time.perf_counter()
+        await asyncio.gather(*(_client(client, url, rounds, latencies, failures) for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "mode": mode,
+        "clients": clients,
+        "ok": len(latencies),
+        "failed": sum(failures.values()),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": _percentile(latencies, 0.50),
+        "p95_ms": _percentile(latencies, 0.95),
+        "p99_ms": _percentile(latencies, 0.99),
+        "errors": ",".join(f"{name}:{count}" for name, count in failures.items()) or "-",
+    }
+
+
+def main() -> None:
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    token, package_id = _seed()
+    server = _start_server()
+    try:
+        for mode, url in (
+            ("sync", f"/bench/sync/material-packages/{package_id}"),
+            ("async", f"/api/v1/material-packages/{package_id}"),
+        ):
+            result = asyncio.run(_run(mode, url, token, clients, rounds))
+            print(" ".join(f"{key}={value}" for key, value in result.items()), flush=True)
+            time.sleep(1)
+    finally:
+        server.terminate()
+        server.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Measure how many generation SSE subscribers one API process can hold.
+
+Starts the API in-process on a local port, opens N concurrent
+/api/v1/generation/stream connections, then checks that ordinary sync
+endpoints still answer and that every subscriber receives a published event.
+
+    PYTHONPATH=backend python scripts/bench_sse_subscribers.py 10 50 100 200
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+
+if not os.getenv("DATABASE_URL"):
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+
+import httpx
+import uvicorn
+
+from app.db.base import Base
+from app.db.migrations import run_migrations
+from app.db.session import SessionLocal, engine
+from app.main import app
+from app.repositories import projects as project_repo
+from app.repositories import users as user_repo
+from app.services.generation_events import publish_generation_event
+from app.services.session_store import get_session_store
+from app.store import new_id
+
+HOST = "127.0.0.1"
+PORT = int(os.getenv("BENCH_PORT", "8765"))
+BASE_URL = f"http://{HOST}:{PORT}"
+
+
+def _seed() -> tuple[str, str]:
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    db = SessionLocal()
+    try:
+        user = user_repo.create_user(db, f"bench-{new_id()[:8]}", "x", "x")
+        project = project_repo.create_project(db, "bench", "personal", None, user["id"], None, "private")
+    finally:
+        db.close()
+    token = get_session_store().create(user["id"], {})["session_token"]
+    return token, project["id"]
+
+
+def _start_server() -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, host=HOST, port=PORT, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def _subscriber(client: httpx.AsyncClient, url: str, ready: asyncio.Event, marker: str) -> bool:
+    async with client.stream("GET", url) as response:
+        ready.set()
+        async for line in response.aiter_lines():
+            if marker in line:
+                return True
+    return False
+
+
+async def _run(count: int, token: str, project_id: str) -> dict:
+    headers = {"Authorization": f"Bearer {token}"}
+    limits = httpx.Limits(max_connections=count + 20, max_keepalive_connections=count + 20)
+    timeout = httpx.Timeout(10.0)
+    marker = f"bench-{new_id()}"
+    async with httpx.AsyncClient(base_url=BASE_URL, headers=headers, limits=limits, timeout=timeout) as client:
+        readies = [asyncio.Event() for _ in range(count)]
+        url = f"/api/v1/generation/stream/{project_id}"
+        tasks = [asyncio.create_task(_subscriber(client, url, ready, marker)) for ready in readies]
+        try:
+            await asyncio.wait_for(asyncio.gather(*(ready.wait() for ready in readies)), timeout=10)
+        except asyncio.TimeoutError:
+            pass
+        connected = sum(1 for ready in readies if ready.is_set())
+
+        latencies = []
+        failures = 0
+        for _ in range(10):
+            started = time.perf_counter()
+            try:
+                response = await client.get(f"/api/v1/projects/{project_id}", timeout=2.0)
+                response.raise_for_status()
+                latencies.append((time.perf_counter() - started) * 1000)
+            except httpx.HTTPError:
+                failures += 1
+
+        publish_generation_event(project_id, {"type": "bench", "marker": marker})
+        done, pending = await asyncio.wait(tasks, timeout=5)
+        received = sum(1 for task in done if not task.exception() and task.result())
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    latencies.sort()
+    return {
+        "subscribers": count,
+        "connected": connected,
+        "received": received,
+        "sync_ok": len(latencies),
+        "sync_failed": failures,
+        "sync_p50_ms": round(latencies[len(latencies) // 2], 1) if latencies else None,
+        "sync_max_ms": round(latencies[-1], 1) if latencies else None,
+    }
+
+
+def main() -> None:
+    counts = [int(arg) for arg in sys.argv[1:]] or [10, 50, 100]
+    token, project_id = _seed()
+    server = _start_server()
+    try:
+        for count in counts:
+            result = asyncio.run(_run(count, token, project_id))
+            print(" ".join(f"{key}={value}" for key, value in result.items()), flush=True)
+            time.sleep(1)
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ import logging
 from app.db.base import Base
 from app.db.session import engine
 from app.db import models  # noqa: F401
+from app.db.migrations import run_migrations
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
 logger = logging.getLogger("init_db")
@@ -10,6 +11,7 @@ logger = logging.getLogger("init_db")
 
 def main() -> None:
     Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
     logger.info("Database schema initialized.")
 
 
@@ -0,0 +1,60 @@
+"""Move images, videos and audios out of material package JSON into package_assets.
+
+Packages are also migrated lazily when they are read, so this only needs to
+run once to finish the job for packages nobody has opened.
+
+    PYTHONPATH=backend python scripts/migrate_package_assets.py
+"""
+
+import logging
+
+from sqlalchemy import select
+
+from app.db.base import Base
+from app.db.migrations import run_migrations
+from app.db.models import MaterialPackage
+from app.db.session import SessionLocal, engine
+from app.repositories import package_assets as asset_repo
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+logger = logging.getLogger("migrate_package_assets")
+
+BATCH_SIZE = 200
+
+
+def main() -> None:
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    db = SessionLocal()
+    migrated = 0
+    scanned = 0
+    last_id = ""
+    try:
+        while True:
+            packages = (
+                db.execute(
+                    select(MaterialPackage)
+                    .where(MaterialPackage.id > last_id)
+                    .order_by(MaterialPackage.id)
+                    .limit(BATCH_SIZE)
+                )
+                .scalars()
+                .all()
+            )
+            if not packages:
+                break
+            for package in packages:
+                if asset_repo.migrate_package(db, package):
+                    migrated += 1
+            db.commit()
+            scanned += len(packages)
+            last_id = packages[-1].id
+            db.expunge_all()
+            logger.info("scanned=%s migrated=%s", scanned, migrated)
+    finally:
+        db.close()
+    logger.info("Package asset migration finished. scanned=%s migrated=%s", scanned, migrated)
+
+
+if __name__ == "__main__":
+    main()
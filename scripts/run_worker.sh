@@ -2,7 +2,7 @@
 set -euo pipefail
 
 ROOT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/.." && pwd)"
-export PYTHONPATH="$ROOT_DIR/worker"
+export PYTHONPATH="$ROOT_DIR/worker:$ROOT_DIR/backend"
 
-# Placeholder for local worker development.
+# Drains the jobs table; run alongside scripts/run_backend.sh.
 python "$ROOT_DIR/worker/worker.py"
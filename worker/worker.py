@@ -1,21 +1,157 @@
+import asyncio
 import logging
+import multiprocessing
 import os
-import time
+import signal
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core.config import parse_int_map, settings
+from app.db.session import SessionLocal
+from app.repositories import jobs as job_repo
+from app.services.job_queue import (
+    WORKER_STAGES,
+    default_worker_id,
+    kinds_for_stages,
+    run_claimed_job,
+    stage_for_kind,
+)
+
+# LLM streaming, Seedream calls and Vidu polling have very different latency
+# and quota profiles, so each stage is capped separately per process.
+DEFAULT_STAGE_CONCURRENCY = {
+    "script": 2,
+    "visual": 2,
+    "render": 1,
+    "image": 4,
+    "video": 2,
+}
+
+
+def _stage_limits() -> dict[str, int]:
+    limits = dict(DEFAULT_STAGE_CONCURRENCY)
+    limits.update(parse_int_map(os.getenv("WORKER_STAGE_CONCURRENCY", "")))
+    return {stage: max(0, limits.get(stage, 0)) for stage in WORKER_STAGES}
+
+
+def _claim(worker_id: str, kinds: list[str]) -> dict | None:
+    db = SessionLocal()
+    try:
+        return job_repo.claim_next_job(
+            db, worker_id, settings.job_visibility_timeout_seconds, kinds=kinds
+        )
+    except SQLAlchemyError:
+        db.rollback()
+        logging.exception("Job claim failed")
+        return None
+    finally:
+        db.close()
+
+
+async def _run_process(index: int, limits: dict[str, int], poll_interval: float) -> None:
+    loop = asyncio.get_running_loop()
+    worker_id = default_worker_id(f"worker-{index}")
+    executor = ThreadPoolExecutor(
+        max_workers=max(1, sum(limits.values())), thread_name_prefix="job"
+    )
+    in_flight = {stage: 0 for stage in limits}
+    running: set[asyncio.Task] = set()
+    stopping = asyncio.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stopping.set)
+
+    async def _run_job(job: dict, stage: str) -> None:
+        try:
+            await loop.run_in_executor(executor, run_claimed_job, job, worker_id)
+        finally:
+            in_flight[stage] -= 1
+
+    logging.info("ZFlow worker process started worker_id=%s limits=%s", worker_id, limits)
+    while not stopping.is_set():
+        free_stages = [stage for stage, limit in limits.items() if in_flight[stage] < limit]
+        kinds = kinds_for_stages(free_stages)
+        job = await loop.run_in_executor(None, _claim, worker_id, kinds) if kinds else None
+        if job:
+            stage = stage_for_kind(job["kind"])
+            in_flight[stage] += 1
+            logging.info(
+                "Job claimed job_id=%s kind=%s stage=%s attempt=%s",
+                job["id"],
+                job["kind"],
+                stage,
+                job["attempts"],
+            )
+            task = loop.create_task(_run_job(job, stage))
+            running.add(task)
+            task.add_done_callback(running.discard)
+            continue
+        # Idle or saturated: wake up on the poll interval, when a job finishes
+        # (freeing a stage slot), or on shutdown.
+        stop_waiter = loop.create_task(stopping.wait())
+        await asyncio.wait(
+            {stop_waiter, *running},
+            timeout=poll_interval,
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+        stop_waiter.cancel()
+
+    if running:
+        logging.info("Waiting for %s running jobs worker_id=%s", len(running), worker_id)
+        await asyncio.gather(*running, return_exceptions=True)
+    executor.shutdown(wait=True)
+    logging.info("ZFlow worker process stopped worker_id=%s", worker_id)
+
+
+def _process_main(index: int, limits: dict[str, int], poll_interval: float) -> None:
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "info").upper(),
+        format="%(asctime)s %(levelname)s %(processName)s %(name)s %(message)s",
+    )
+    asyncio.run(_run_process(index, limits, poll_interval))
 
 
 def main() -> None:
     logging.basicConfig(
         level=os.getenv("LOG_LEVEL", "info").upper(),
-        format="%(asctime)s %(levelname)s %(name)s %(message)s",
+        format="%(asctime)s %(levelname)s %(processName)s %(name)s %(message)s",
     )
-    poll_interval = int(os.getenv("WORKER_POLL_INTERVAL_SECONDS", "2"))
+    poll_interval = float(os.getenv("WORKER_POLL_INTERVAL_SECONDS", "2"))
+    process_count = max(1, int(os.getenv("WORKER_PROCESSES", "2")))
+    limits = _stage_limits()
+
+    logging.info("ZFlow worker started processes=%s", process_count)
+    if process_count == 1:
+        _process_main(0, limits, poll_interval)
+        return
+
+    # Spawn rather than fork so no process inherits the parent's DB pool.
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(
+            target=_process_main,
+            args=(index, limits, poll_interval),
+            name=f"worker-{index}",
+        )
+        for index in range(process_count)
+    ]
+    for process in processes:
+        process.start()
 
-    logging.info("ZFlow worker started")
+    def _forward(signum, _frame) -> None:
+        for process in processes:
+            if process.is_alive():
+                os.kill(process.pid, signum)
 
-    while True:
-        # TODO: fetch next task from queue and run pipeline stages.
-        logging.debug("Worker idle")
-        time.sleep(poll_interval)
+    signal.signal(signal.SIGTERM, _forward)
+    signal.signal(signal.SIGINT, _forward)
+    for process in processes:
+        process.join()
+    logging.info("ZFlow worker stopped")
 
 
 if __name__ == "__main__":